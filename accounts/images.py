@@ -0,0 +1,170 @@
+"""
+Downscaled WebP and JPEG variants of company logos and profile pictures
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# bounding boxes, images are only ever scaled down
+IMAGE_VARIANTS = {
+    "thumbnail": (96, 96),
+    "medium": (480, 480),
+}
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+# (model label, image field), each field stores its variants in <field>_variants
+IMAGE_FIELDS = [
+    ("accounts.CompanyDetails", "logo"),
+    ("accounts.CoderSkillsExperience", "profile_picture"),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(name, variant, extension):
+    # the whole source name, extension included, is unique in the storage, so variants of logo.png and logo.jpg
+    # never share a name
+    path = PurePosixPath(name)
+    return str(path.parent / "variants" / f"{path.name}.{variant}.{extension}")
+
+
+def render_variants(source):
+    """
+    Encoded bytes of every variant and format of an image file, as (variant, extension, content)
+    """
+    with Image.open(source) as image:
+        # lets JPEG decode at a fraction of its size, a no-op for other formats
+        image.draft("RGB", max(IMAGE_VARIANTS.values()))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        for extension, (image_format, options) in VARIANT_FORMATS.items():
+            encoded = resized
+            if image_format == "JPEG" and has_alpha:
+                encoded = Image.new("RGB", resized.size, "white")
+                encoded.paste(resized, mask=resized.getchannel("A"))
+            buffer = io.BytesIO()
+            encoded.save(buffer, image_format, **options)
+            yield variant, extension, buffer.getvalue()
+
+
+def generate_variants(model_label, field_name, name):
+    """
+    Write the variants of one stored image next to it and return what to keep in <field>_variants.
+    - Runs in thread and process pools, so it only touches the storage, never the database
+    - Existing files are never overwritten, the storage picks a free name and the name it saved under is kept
+    """
+    storage = apps.get_model(model_label)._meta.get_field(field_name).storage
+    variants = {"source": name}
+    with storage.open(name, "rb") as source:
+        for variant, extension, content in render_variants(source):
+            target = variant_name(name, variant, extension)
+            variants.setdefault(variant, {})[extension] = storage.save(target, ContentFile(content))
+    return variants
+
+
+def variant_files(variants):
+    return {name for variant in IMAGE_VARIANTS for name in variants.get(variant, {}).values()}
+
+
+def delete_variant_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("could not delete image variant %s", name, exc_info=True)
+
+
+def save_variants(model_label, pk, field_name, name, variants):
+    """
+    Record the variants of an image and delete the files of the variants they replace.
+    - Matched on the image too, a newer upload must not get the variants of the one it replaced; variants that
+      arrive too late are deleted instead
+    """
+    model = apps.get_model(model_label)
+    rows = model.objects.filter(pk=pk, **{field_name: name})
+    with transaction.atomic():
+        previous = rows.select_for_update().values_list(f"{field_name}_variants", flat=True).first()
+        if previous is not None:
+            rows.update(**{f"{field_name}_variants": variants})
+    if previous is None:
+        stale = variant_files(variants)
+    else:
+        stale = variant_files(previous) - variant_files(variants)
+    delete_variant_files(model._meta.get_field(field_name).storage, stale)
+
+
+def process_variants(model_label, pk, field_name, name, background=True):
+    try:
+        save_variants(model_label, pk, field_name, name, generate_variants(model_label, field_name, name))
+    except Exception:  # noqa: BLE001 - the original image is still served, the backfill retries
+        logger.exception("image variants of %s %s failed", model_label, name)
+    finally:
+        if background:
+            connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_VARIANT_WORKERS,
+                                           thread_name_prefix="image-variants")
+        return _executor
+
+
+def schedule_variants(instance, field_name):
+    """
+    Generate the variants of a newly saved image once the transaction saving it commits.
+    - Rendered in a background thread pool of IMAGE_VARIANT_WORKERS, or inline when that is 0
+    - Clearing the image clears its variants right away, their files are deleted once the transaction commits
+    """
+    name = getattr(instance, field_name).name
+    variants = getattr(instance, f"{field_name}_variants")
+    model_label = instance._meta.label
+    if not name:
+        if variants:
+            type(instance).objects.filter(pk=instance.pk).update(**{f"{field_name}_variants": {}})
+            storage = instance._meta.get_field(field_name).storage
+            transaction.on_commit(lambda: delete_variant_files(storage, variant_files(variants)))
+        return
+    if variants.get("source") == name:
+        return
+
+    def submit():
+        if settings.IMAGE_VARIANT_WORKERS:
+            get_executor().submit(process_variants, model_label, instance.pk, field_name, name)
+        else:
+            process_variants(model_label, instance.pk, field_name, name, background=False)
+    transaction.on_commit(submit)
+
+
+def variant_urls(field_file, variants, request=None):
+    """
+    URLs of the variants of an image, None until they have been generated for the current image
+    """
+    if not field_file or variants.get("source") != field_file.name:
+        return None
+    urls = {}
+    for variant in IMAGE_VARIANTS:
+        urls[variant] = {}
+        for extension, name in variants.get(variant, {}).items():
+            url = field_file.storage.url(name)
+            urls[variant][extension] = request.build_absolute_uri(url) if request is not None else url
+    return urls
@@ -4,6 +4,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from datetime import datetime
 
+from core.utils import attachment_storage
+
 USER_ROLE_CHOICES = (
     ("CLIENT", "Client"),
     ("CODER", "Coder"),
@@ -127,6 +129,14 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "password"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["role", "is_email_verified"], name="user_role_verified_idx"),
+            # coder listings and recommendations only ever show verified coders
+            models.Index(fields=["id"], condition=models.Q(role="CODER", is_email_verified=True),
+                         name="user_verified_coder_idx"),
+        ]
+
     def __str__(self):
         return str(self.email)
 
@@ -190,6 +200,8 @@ class CompanyDetails(models.Model):
     company_website = models.URLField(blank=True, null=True)
     linkedin_url = models.URLField(blank=True, null=True)
     logo = models.ImageField(upload_to="company_logos/", blank=True, null=True)
+    # names of the downscaled copies of logo, see accounts.images
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
@@ -204,7 +216,8 @@ class CompanyDetails(models.Model):
 class Skill(models.Model):
     pk_id = models.BigAutoField(primary_key=True, editable=False)
     id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skills_of_user')
+    # skill_user_type_idx leads with user, a second index on it would only slow down writes
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skills_of_user', db_index=False)
     technology = models.ForeignKey(Technology, on_delete=models.CASCADE)
     years_of_experience = models.PositiveIntegerField(validators=[MinValueValidator(0), MaxValueValidator(50)])
     skill_type = models.CharField(choices=SKILL_CHOICES, max_length=100, default="PRIMARY")
@@ -212,6 +225,11 @@ class Skill(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "skill_type"], name="skill_user_type_idx"),
+        ]
+
     def __str__(self):
         return str(self.technology.name)
 
@@ -226,6 +244,8 @@ class CoderSkillsExperience(models.Model):
     hourly_rate = models.PositiveIntegerField(validators=[MinValueValidator(5), MaxValueValidator(999)])
     brief_work_experience = models.TextField(validators=[MaxLengthValidator(1000)])  # noqa : E501
     profile_picture = models.ImageField(upload_to="profile_pictures/", blank=True, null=True)
+    # names of the downscaled copies of profile_picture, see accounts.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
@@ -294,7 +314,7 @@ class EducationalQualification(models.Model):
     pk_id = models.BigAutoField(primary_key=True, editable=False)
     id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    resume = models.FileField(upload_to="resume/", blank=True, null=True)
+    resume = models.FileField(upload_to="resume/", storage=attachment_storage, blank=True, null=True)
     portfolio = models.URLField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
@@ -23,6 +23,7 @@ from .models import (
 )  # noqa: E501
 from core.models import JobPost
 from .utils import ValidationUtils
+from .images import variant_urls
 from mysite.settings import MAX_DEGREE, MAX_CERTIFICATE
 from typing import Any, Dict
 from rest_framework_simplejwt.settings import api_settings
@@ -37,6 +38,24 @@ USER_ROLE_CHOICES = (
     ("SUCCESS-MANAGER", "Success Manager"),
 )
 
+
+class ImageVariantsField(serializers.Field):
+    """
+    URLs of the thumbnail and medium WebP/JPEG variants of an image field of the source object,
+    null until they are generated
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs.setdefault("source", "*")
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variant_urls(getattr(value, self.image_field), getattr(value, f"{self.image_field}_variants"),
+                            self.context.get("request"))
+
+
 class AgencySerializer(serializers.ModelSerializer):
     class Meta:
         model = Agency
@@ -326,6 +345,8 @@ class ResendEmailVerificationSerializer(serializers.Serializer):
 
 
 class CompanyDetailsSerializer(serializers.ModelSerializer):
+    logo_variants = ImageVariantsField("logo")
+
     class Meta:
         model = CompanyDetails
         fields = [
@@ -334,6 +355,7 @@ class CompanyDetailsSerializer(serializers.ModelSerializer):
             "company_website",
             "linkedin_url",
             "logo",
+            "logo_variants",
             "created",
             "updated",
         ]
@@ -500,6 +522,7 @@ class SkillSerializer(serializers.ModelSerializer):
 class CoderSkillsExperienceSerializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(slug_field="username", read_only=True)
     skills = serializers.SerializerMethodField()
+    profile_picture_variants = ImageVariantsField("profile_picture")
 
     class Meta:
         model = CoderSkillsExperience
@@ -512,6 +535,7 @@ class CoderSkillsExperienceSerializer(serializers.ModelSerializer):
             "hourly_rate",
             "brief_work_experience",
             "profile_picture",
+            "profile_picture_variants",
             "skills",
             "created",
             "updated",
@@ -897,6 +921,7 @@ class ClientSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source = 'companydetails.company_name')
     company_website = serializers.URLField(source = 'companydetails.company_website')
     logo = serializers.ImageField(source='companydetails.logo')
+    logo_variants = ImageVariantsField('logo', source='companydetails')
     linkedin_url = serializers.URLField(source = 'digitalpresence.linkedin_url')
     glassdoor_url = serializers.URLField(source = 'digitalpresence.glassdoor_url')
     youtube = serializers.CharField(source = 'digitalpresence.youtube_url')
@@ -930,7 +955,7 @@ class ClientSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id','first_name', 'last_name', 'email', 'company_name', 'company_website',
-                  'logo','linkedin_url', 'glassdoor_url', 'youtube', 'careerbliss', 'phone',
+                  'logo', 'logo_variants', 'linkedin_url', 'glassdoor_url', 'youtube', 'careerbliss', 'phone',
                   'country', 'city', 'state', 'role', 'job_posted', 'total_spent', 'average_hourly_rate',
                   'company_size', 'is_payment_method_verified', 'reviews', 'count_of_active_projects',
                   'count_of_hired_coders', 'date_joined']
@@ -3,6 +3,9 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
+from accounts.images import schedule_variants
+from accounts.models import CoderSkillsExperience, CompanyDetails
+
 User = get_user_model()
 
 
@@ -19,3 +22,13 @@ def generate_uuid_and_update_username(sender, instance, created, **kwargs):
 
         instance.username = f"{prefix}_{uuid_str}"
         instance.save()
+
+
+@receiver(post_save, sender=CompanyDetails)
+def generate_logo_variants(sender, instance, **kwargs):
+    schedule_variants(instance, "logo")
+
+
+@receiver(post_save, sender=CoderSkillsExperience)
+def generate_profile_picture_variants(sender, instance, **kwargs):
+    schedule_variants(instance, "profile_picture")
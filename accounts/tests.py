@@ -8,12 +8,19 @@ from .models import (
     Skill,
     CoderSkillsExperience,
     Certification, 
-    Qualification, 
     EducationalQualification,
 )
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.reverse import reverse
 import uuid
+import tempfile
+from io import BytesIO, StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from .images import variant_files
+from .serializers import CompanyDetailsSerializer
 
 
 
@@ -1241,3 +1248,96 @@ class EducationAPITestCase(APITestCase):
         education = EducationalQualification.objects.get(user=self.coder)
         self.assertEqual(education.portfolio, self.education_data['portfolio'])
 
+
+def image_upload(name, mode, size, image_format):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0)
+class ImageVariantsTestCase(APITestCase):
+    """
+    Test logos and profile pictures get downscaled variants on upload and from the backfill
+    """
+
+    def setUp(self) -> None:
+        self.client_user = User.objects.create_user(
+            username="client", email="client@example.com", password="test@12345", role="CLIENT"
+        )
+        self.coder_user = User.objects.create_user(
+            username="coder", email="coder@example.com", password="test@12345", role="CODER"
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(MEDIA_ROOT=directory.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_variants_on_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            details = CompanyDetails.objects.create(
+                user=self.client_user, logo=image_upload("logo.png", "RGBA", (1000, 500), "PNG"))
+        details.refresh_from_db()
+        self.assertEqual(details.logo_variants["source"], details.logo.name)
+        with details.logo.storage.open(details.logo_variants["thumbnail"]["webp"]) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (96, 48))
+        with details.logo.storage.open(details.logo_variants["medium"]["jpeg"]) as medium:
+            self.assertEqual((Image.open(medium).format, Image.open(medium).size), ("JPEG", (480, 240)))
+
+        urls = CompanyDetailsSerializer(details).data["logo_variants"]
+        self.assertTrue(urls["thumbnail"]["webp"].endswith("/logo.png.thumbnail.webp"))
+        details.logo = image_upload("other.png", "RGB", (50, 50), "PNG")
+        self.assertIsNone(CompanyDetailsSerializer(details).data["logo_variants"])
+
+    def test_variant_names_keep_the_source_extension(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            png = CompanyDetails.objects.create(
+                user=self.client_user, logo=image_upload("logo.png", "RGB", (200, 200), "PNG"))
+            jpeg = CompanyDetails.objects.create(
+                user=self.coder_user, logo=image_upload("logo.jpg", "RGB", (300, 100), "JPEG"))
+        png.refresh_from_db()
+        jpeg.refresh_from_db()
+        self.assertNotEqual(png.logo_variants["thumbnail"]["webp"], jpeg.logo_variants["thumbnail"]["webp"])
+        for details, size in [(png, (96, 96)), (jpeg, (96, 32))]:
+            with details.logo.storage.open(details.logo_variants["thumbnail"]["webp"]) as thumbnail:
+                self.assertEqual(Image.open(thumbnail).size, size)
+
+    def test_replaced_variants_are_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            details = CompanyDetails.objects.create(
+                user=self.client_user, logo=image_upload("logo.png", "RGB", (200, 200), "PNG"))
+        storage = details.logo.storage
+        details.refresh_from_db()
+        first = variant_files(details.logo_variants)
+        with self.captureOnCommitCallbacks(execute=True):
+            details.logo = image_upload("logo.png", "RGB", (300, 300), "PNG")
+            details.save()
+        details.refresh_from_db()
+        second = variant_files(details.logo_variants)
+        self.assertFalse(any(storage.exists(name) for name in first))
+        self.assertTrue(all(storage.exists(name) for name in second))
+
+        call_command("backfill_image_variants", "--all", "--workers=1", stdout=StringIO())
+        details.refresh_from_db()
+        third = variant_files(details.logo_variants)
+        self.assertFalse(third & second)
+        self.assertFalse(any(storage.exists(name) for name in second))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            details.logo = None
+            details.save()
+        details.refresh_from_db()
+        self.assertEqual(details.logo_variants, {})
+        self.assertFalse(any(storage.exists(name) for name in third))
+
+    def test_backfill(self):
+        experience = CoderSkillsExperience.objects.create(
+            user=self.coder_user, total_years_of_experience=3, identity="dev", hourly_rate=40,
+            brief_work_experience="work", profile_picture=image_upload("me.jpg", "RGB", (640, 960), "JPEG"))
+        self.assertEqual(experience.profile_picture_variants, {})
+        call_command("backfill_image_variants", "--workers=1", stdout=StringIO())
+        experience.refresh_from_db()
+        self.assertEqual(set(experience.profile_picture_variants), {"source", "thumbnail", "medium"})
+        with experience.profile_picture.storage.open(experience.profile_picture_variants["thumbnail"]["jpeg"]) as image:
+            self.assertEqual(Image.open(image).size, (64, 96))
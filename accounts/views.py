@@ -56,6 +56,7 @@ from .models import (
 )  # noqa: E501
 import jwt
 from mysite.settings import SECRET_KEY
+from mysite.replicas import ReplicaReadMixin
 from . import filters
 from django_filters.rest_framework import DjangoFilterBackend
 from .utils import Util
@@ -257,7 +258,7 @@ class TokenRefreshViewSet(viewsets.ModelViewSet):
         )
 
 
-class TechnologyViewSet(viewsets.ModelViewSet):
+class TechnologyViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     pagination_class = None
     queryset = Technology.objects.all().order_by("name")
     serializer_class = TechnologySerializer
@@ -275,7 +276,7 @@ class TechnologyViewSet(viewsets.ModelViewSet):
         serializer.save(user=user)
 
 
-class RecommendedTechnologyViewSet(viewsets.ModelViewSet):
+class RecommendedTechnologyViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = TechnologySerializer
     http_method_names = ["get", "head", "options"]
     lookup_field = "id"
@@ -528,7 +529,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CoderViewSet(viewsets.ReadOnlyModelViewSet):
+class CoderViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CoderSerializer
     permission_classes = [IsAuthenticated, IsClientOrCoder]
     http_method_names = ["get", "head", "options"]
@@ -4,6 +4,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from accounts.models import User
 from django.contrib.auth import authenticate
 from accounts.serializers import LoginSerializer
+from core.models import QueryFingerprint
 
 
 class DashboardSerializer(serializers.Serializer):
@@ -126,3 +127,15 @@ class AdminLoginSerializer(LoginSerializer):
 
         return validate_data
 
+
+class QueryFingerprintSerializer(serializers.ModelSerializer):
+    """
+    Totals of one normalized statement for one view, times in milliseconds
+    """
+    mean_time = serializers.FloatField(read_only=True)
+    calls_per_request = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = QueryFingerprint
+        fields = ["id", "view", "fingerprint", "sql", "calls", "requests", "calls_per_request",
+                  "total_time", "mean_time", "max_time", "created", "updated"]
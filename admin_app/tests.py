@@ -1,5 +1,8 @@
+from django.test import override_settings
 from rest_framework.test import APITestCase, APIClient
 from accounts.models import User
+from core.models import JobPostV2, JobProposalV2, QueryFingerprint
+from core.query_profiler import query_stats
 from rest_framework.reverse import reverse
 from rest_framework import status
 
@@ -13,4 +16,42 @@ class AdminDashBoardAPITestCase(APITestCase):
         self.client.force_authenticate(self.user_admin)
         url = reverse("dashboard-list")
         response = self.client.get(url)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class QueryFingerprintAPITestCase(APITestCase):
+    """
+    Test query fingerprints gathered by the middleware are listed to admins only
+    """
+
+    def setUp(self):
+        self.client_user = User.objects.create_user(username="client", email="client@example.com",
+                                                    password="password123", role="CLIENT", is_email_verified=True)
+        coder = User.objects.create_user(username="coder", email="coder@example.com", password="password123",
+                                         role="CODER")
+        job_post = JobPostV2.objects.create(user=self.client_user, title="Job", project_size="SMALL",
+                                            budget_type="HOURLY", duration="SHORT_TERM")
+        JobProposalV2.objects.create(user=coder, job_post=job_post, proposal_type="HOURLY", hourly_rate=50,
+                                     availability_per_week=20)
+        self.admin = User.objects.create_user(username="admin", email="admin@example.com", password="password123",
+                                              role="SUPER-ADMIN")
+        query_stats.take()
+        self.addCleanup(query_stats.take)
+
+    @override_settings(QUERY_FINGERPRINTING=True, QUERY_FINGERPRINT_FLUSH_SECONDS=3600, SLOW_QUERY_MS=None)
+    def test_aggregate_flush_and_list(self):
+        self.client.force_authenticate(user=self.client_user)
+        for _ in range(2):
+            self.client.get(reverse("proposal-v2-list"))
+        stats = {key: stat for (view, key), stat in query_stats.stats.items() if view == "proposal-v2-list"}
+        self.assertEqual(len(stats), 2)
+        self.assertTrue(all(stat.calls == 2 and stat.requests == 2 for stat in stats.values()))
+
+        self.assertEqual(self.client.get(reverse("query-fingerprints-list")).status_code, 403)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse("query-fingerprints-list"), {"view": "proposal-v2-list"})
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual({row["fingerprint"] for row in results}, set(stats))
+        self.assertTrue(all(row["calls_per_request"] == 1 for row in results))
+        self.assertEqual(QueryFingerprint.objects.filter(view="proposal-v2-list").count(), 2)
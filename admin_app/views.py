@@ -1,9 +1,15 @@
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Greatest
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
-from .serializers import DashboardSerializer,AdminLoginSerializer
+from rest_framework.filters import OrderingFilter
+from .serializers import DashboardSerializer,AdminLoginSerializer,QueryFingerprintSerializer
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from accounts.permissions import IsAdmin
 from accounts.views import LoginViewSet
+from core.models import QueryFingerprint
+from core.query_profiler import query_stats
 
 
 class AdminDashboardViewSet(viewsets.ReadOnlyModelViewSet):
@@ -31,5 +37,29 @@ class AdminLoginViewSet(LoginViewSet):
     serializer_class = AdminLoginSerializer
     http_method_names = ["post", "head", "options"]
 
-    
-  
\ No newline at end of file
+
+class QueryFingerprintViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Statements costing the most database time, per view, as recorded by QueryFingerprintMiddleware.
+    - Ordered by total_time by default, ?ordering=-calls_per_request surfaces N+1 patterns
+    - ?view=<url name> narrows the list to one endpoint
+    """
+    serializer_class = QueryFingerprintSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+    http_method_names = ["get", "head", "options"]
+    lookup_field = "id"
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ["view", "fingerprint"]
+    ordering_fields = ["total_time", "mean_time", "max_time", "calls", "requests", "calls_per_request"]
+    ordering = ["-total_time"]
+
+    def get_queryset(self):
+        return QueryFingerprint.objects.annotate(
+            mean_time=F("total_time") / Greatest(Cast(F("calls"), FloatField()), 1.0),
+            calls_per_request=Cast(F("calls"), FloatField()) / Greatest(Cast(F("requests"), FloatField()), 1.0),
+        )
+
+    def list(self, request, *args, **kwargs):
+        # include what this process gathered since its last flush
+        query_stats.flush()
+        return super().list(request, *args, **kwargs)
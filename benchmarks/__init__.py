@@ -0,0 +1,3 @@
+"""
+Endpoint benchmarks, run with `python manage.py benchmark_endpoints`
+"""
@@ -0,0 +1,55 @@
+"""
+Per-request connection cost with new, persistent and pooled database connections
+"""
+import time
+
+from django.db import connections
+from django.db.utils import ConnectionHandler
+
+from benchmarks.runner import percentile
+from mysite.db_backends.postgresql_pool.pool import close_pools
+
+POOL_ENGINE = "mysite.db_backends.postgresql_pool"
+
+MODES = {
+    "new connection per request": {"CONN_MAX_AGE": 0},
+    "persistent connections": {"CONN_MAX_AGE": 60},
+    "pooled connections": {"ENGINE": POOL_ENGINE, "CONN_MAX_AGE": 0},
+}
+
+
+def simulate_requests(settings_dict, requests, query):
+    """
+    Latency of requests that each run one query, with Django's request start/finish connection handling.
+    - close_if_unusable_or_obsolete is what close_old_connections runs on request_started/request_finished
+    """
+    connection = ConnectionHandler({"default": settings_dict})["default"]
+    timings = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                cursor.fetchall()
+            connection.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection.close()
+        close_pools()
+    return timings
+
+
+def run(requests=200, query="SELECT 1", alias="default"):
+    base = {**connections[alias].settings_dict}
+    results = []
+    for mode, overrides in MODES.items():
+        timings = simulate_requests({**base, **overrides}, requests, query)
+        results.append({
+            "mode": mode,
+            "requests": requests,
+            "p50_ms": round(percentile(timings, 0.50), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+        })
+    return results
@@ -0,0 +1,144 @@
+"""
+Ramped load test: virtual users running client and coder scenarios against a server on localhost
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.runner import percentile
+from benchmarks.scenarios import PERSONAS
+
+
+class ScenarioAborted(Exception):
+    """
+    A step the rest of the scenario depends on failed, e.g. the login
+    """
+
+
+class VirtualUser:
+    """
+    One simulated user: logs in with its account, then sends the scenario's requests with its token
+    """
+
+    def __init__(self, client, persona, account, record, rng, think_time=0.0):
+        self.client = client
+        self.persona = persona
+        self.account = account
+        self.data = account["data"]
+        self.record = record
+        self.rng = rng
+        self.think_time = think_time
+        self.headers = {}
+
+    def choice(self, items):
+        return self.rng.choice(items)
+
+    async def login(self):
+        role = PERSONAS[self.persona][1]
+        response = await self.post("login", "/api/v1/login/", json={
+            "email": self.account["email"], "password": self.account["password"], "role": role,
+        })
+        if response is None or response.status_code != 200:
+            raise ScenarioAborted
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def get(self, step, path, **kwargs):
+        return await self.request(step, "GET", path, **kwargs)
+
+    async def post(self, step, path, **kwargs):
+        return await self.request(step, "POST", path, **kwargs)
+
+    async def request(self, step, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as exc:
+            response, status = None, type(exc).__name__
+        self.record(self.persona, step, (time.perf_counter() - start) * 1000, status)
+        if self.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.think_time))
+        return response
+
+
+def is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def summarize(samples, elapsed):
+    timings = [ms for ms, _ in samples]
+    errors = sum(1 for _, status in samples if is_error(status))
+    return {
+        "requests": len(samples),
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        "error_rate": round(errors / len(samples), 4),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+    }
+
+
+async def run_stage(base_url, accounts, concurrency, duration, weights, think_time, rng, transport=None):
+    """
+    Keep `concurrency` virtual users running sessions of randomly picked personas for `duration` seconds
+    """
+    samples = defaultdict(list)
+    statuses = defaultdict(int)
+    sessions = defaultdict(int)
+    personas = [persona for persona in weights if accounts.get(persona)]
+
+    def record(persona, step, ms, status):
+        samples[persona, step].append((ms, status))
+        statuses[str(status)] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60, transport=transport) as client:
+        deadline = time.monotonic() + duration
+
+        async def virtual_user(user_rng):
+            while time.monotonic() < deadline:
+                persona = user_rng.choices(personas, [weights[persona] for persona in personas])[0]
+                user = VirtualUser(client, persona, user_rng.choice(accounts[persona]), record, user_rng,
+                                   think_time)
+                try:
+                    await PERSONAS[persona][0](user)
+                except ScenarioAborted:
+                    pass
+                sessions[persona] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(random.Random(rng.random())) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    by_scenario = defaultdict(list)
+    for (persona, _), persona_samples in samples.items():
+        by_scenario[persona].extend(persona_samples)
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        **summarize([sample for values in samples.values() for sample in values], elapsed),
+        "statuses": dict(statuses),
+        "scenarios": {
+            persona: {"sessions": sessions[persona], **summarize(persona_samples, elapsed)}
+            for persona, persona_samples in sorted(by_scenario.items())
+        },
+        "steps": {
+            f"{persona}/{step}": summarize(step_samples, elapsed)
+            for (persona, step), step_samples in sorted(samples.items())
+        },
+    }
+
+
+async def run(base_url, accounts, stages, weights, think_time=0.0, random_seed=0, transport=None):
+    """
+    Ramp through `stages`, a list of (concurrency, seconds), and report each stage.
+    - transport lets the same scenarios run in process, e.g. with httpx.ASGITransport
+    """
+    rng = random.Random(random_seed)
+    return [
+        await run_stage(base_url, accounts, concurrency, duration, weights, think_time, rng, transport)
+        for concurrency, duration in stages
+    ]
@@ -0,0 +1,149 @@
+"""
+Drive every GET route of the API routers through the test client and measure it
+"""
+import math
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from mysite.urls import router, router_v2
+
+ROUTERS = {"api/v1": router, "api/v2": router_v2}
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of values
+    """
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def discover_endpoints():
+    """
+    Named GET routes of every router registration as dicts of name, url name, detail flag and lookup kwarg
+    - List routes come before detail routes so detail ids can be taken from list responses
+    """
+    endpoints = {}
+    for prefix, api_router in ROUTERS.items():
+        for _, viewset, basename in api_router.registry:
+            lookup_field = getattr(viewset, "lookup_field", "pk")
+            for route in api_router.get_routes(viewset):
+                # action routes map methods with a MethodMapper whose .get() is a decorator
+                action = dict.get(route.mapping, "get")
+                if action is None or not hasattr(viewset, action):
+                    continue
+                url_name = route.name.format(basename=basename)
+                endpoints.setdefault(url_name, {
+                    "name": f"{prefix}/{url_name}",
+                    "url_name": url_name,
+                    "basename": basename,
+                    "detail": route.detail,
+                    "lookup_field": lookup_field,
+                    "lookup_url_kwarg": getattr(viewset, "lookup_url_kwarg", None) or lookup_field,
+                })
+    return sorted(endpoints.values(), key=lambda endpoint: endpoint["detail"])
+
+
+def request(client, url):
+    response = client.get(url)
+    if response.streaming:
+        # the test client closes streaming responses once their content is consumed
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def first_lookup(response, lookup_field):
+    data = getattr(response, "data", None)
+    if isinstance(data, dict):
+        data = data.get("results", data)
+    if isinstance(data, list) and data and isinstance(data[0], dict):
+        return data[0].get(lookup_field)
+    return None
+
+
+def measure(client, url, iterations, warmup):
+    """
+    Latency percentiles over timed iterations, then query count and peak memory from separate passes
+    - Queries and memory are measured apart so their instrumentation does not skew the timings
+    """
+    for _ in range(warmup):
+        response = request(client, url)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = request(client, url)
+        timings.append((time.perf_counter() - start) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        request(client, url)
+    # captured queries are read lazily from the connection log, which the next request resets
+    query_count = len(queries)
+    tracemalloc.start()
+    request(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "status": response.status_code,
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "queries": query_count,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run(users, iterations=20, warmup=2, only=None, stdout=None):
+    """
+    Benchmark every discovered endpoint as each of the given {role: user}
+    - Detail routes reuse the first id of the matching list response, they are skipped when it is empty
+    """
+    results = []
+    for role, user in users.items():
+        # endpoints that raise are reported with their 500 status instead of aborting the run
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=user)
+        lookups = {}
+        for endpoint in discover_endpoints():
+            if only and only not in endpoint["name"]:
+                continue
+            kwargs = {}
+            if endpoint["detail"]:
+                lookup = lookups.get(endpoint["basename"])
+                if lookup is None:
+                    continue
+                kwargs = {endpoint["lookup_url_kwarg"]: lookup}
+            url = reverse(endpoint["url_name"], kwargs=kwargs)
+            if endpoint["url_name"] == f"{endpoint['basename']}-list":
+                lookups[endpoint["basename"]] = first_lookup(request(client, url), endpoint["lookup_field"])
+            result = {"endpoint": endpoint["name"], "role": role, "url": url,
+                      **measure(client, url, iterations, warmup)}
+            results.append(result)
+            if stdout is not None:
+                stdout.write(
+                    f"{role:<12} {endpoint['name']:<55} {result['status']} p50 {result['p50_ms']:>8.2f}ms "
+                    f"p95 {result['p95_ms']:>8.2f}ms {result['queries']:>4} queries {result['peak_memory_kb']:>9.1f}KB"
+                )
+    return results
+
+
+def compare(baseline, results):
+    """
+    Per endpoint and role change of p95 latency and query count against a baseline run
+    """
+    previous = {(row["endpoint"], row["role"]): row for row in baseline["results"]}
+    changes = []
+    for row in results:
+        before = previous.get((row["endpoint"], row["role"]))
+        if before is None:
+            continue
+        changes.append({
+            "endpoint": row["endpoint"],
+            "role": row["role"],
+            "p95_ms_change": round(row["p95_ms"] - before["p95_ms"], 3),
+            "queries_change": row["queries"] - before["queries"],
+        })
+    return changes
@@ -0,0 +1,46 @@
+"""
+Client and coder personas for the load test, built from the endpoints their apps call
+"""
+import datetime
+import itertools
+
+# every timesheet submission gets a day of its own so concurrent coders never overlap
+_submission_days = itertools.count(1)
+
+
+async def client_session(user):
+    await user.login()
+    await user.get("job search", "/api/v2/job-posts/", params={"status": "OPEN"})
+    if user.data["jobs"]:
+        job = user.choice(user.data["jobs"])
+        await user.get("job detail", f"/api/v2/job-posts/{job}/")
+        await user.get("proposal summary", f"/api/v2/job-posts/{job}/proposals/summary/")
+    await user.get("ranked proposals", "/api/v2/proposal/", params={"ordering": "score"})
+    params = {"technology": user.choice(user.data["technologies"])} if user.data["technologies"] else {}
+    await user.get("coder search", "/api/v1/coder/", params=params)
+    await user.get("timesheets", "/api/v2/timesheet/")
+
+
+async def coder_session(user):
+    await user.login()
+    await user.get("job search", "/api/v2/job-posts/", params={"budget_type": "HOURLY"})
+    await user.get("recommended jobs", "/api/v1/recommended-jobs/")
+    await user.get("technology dropdown", "/api/v1/technology-dropdown/")
+    await user.get("my proposals", "/api/v2/proposal/")
+    if user.data["contracts"]:
+        day = datetime.date.today() - datetime.timedelta(days=365 + next(_submission_days))
+        await user.post("timesheet submission", "/api/v2/timesheet/", json={
+            "job_contract": str(user.choice(user.data["contracts"])),
+            "date": day.isoformat(),
+            "start_time": "09:00",
+            "end_time": "11:00",
+            "description": "Load test entry",
+        })
+    await user.get("timesheets", "/api/v2/timesheet/")
+
+
+# persona: (scenario, role to log in with)
+PERSONAS = {
+    "client": (client_session, "CLIENT"),
+    "coder": (coder_session, "CODER"),
+}
@@ -0,0 +1,161 @@
+"""
+Synthetic dataset for the endpoint benchmarks
+"""
+import datetime
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Skill, Technology, User
+from core.models import JobContract, JobPostV2, JobProposalV2, MilestoneV2, Timesheet, TimeZone
+from core.pricing import DURATION_WEEKS, fee_breakdown, proposal_fees
+
+BENCHMARK_PASSWORD = "benchmark@12345"
+
+DEFAULT_SIZES = {
+    "clients": 10,
+    "coders": 50,
+    "technologies": 30,
+    "skills_per_coder": 5,
+    "jobs_per_client": 5,
+    "proposals_per_job": 10,
+    "milestones_per_proposal": 3,
+    "timesheets_per_contract": 20,
+}
+
+
+def create_users(prefix, role, count, password):
+    return User.objects.bulk_create([
+        User(username=f"bench_{prefix}_{index}", email=f"bench_{prefix}_{index}@example.com", password=password,
+             first_name=prefix, last_name=str(index), role=role, is_email_verified=True, tc=True)
+        for index in range(count)
+    ])
+
+
+@transaction.atomic
+def seed(sizes=None, random_seed=0):
+    """
+    Insert users, skills, jobs, proposals, milestones, contracts and timesheets with bulk_create.
+    - Returns one user per role for the runner to authenticate as
+    """
+    sizes = {**DEFAULT_SIZES, **(sizes or {})}
+    rng = random.Random(random_seed)
+    password = make_password(BENCHMARK_PASSWORD)
+
+    admin = create_users("admin", "SUPER-ADMIN", 1, password)[0]
+    clients = create_users("client", "CLIENT", sizes["clients"], password)
+    coders = create_users("coder", "CODER", sizes["coders"], password)
+    technologies = Technology.objects.bulk_create([
+        Technology(user=admin, name=f"bench-technology-{index}", is_approved=True)
+        for index in range(sizes["technologies"])
+    ])
+    Skill.objects.bulk_create([
+        Skill(user=coder, technology=technology, years_of_experience=rng.randint(0, 15))
+        for coder in coders
+        for technology in rng.sample(technologies, min(sizes["skills_per_coder"], len(technologies)))
+    ])
+    utc, _ = TimeZone.objects.get_or_create(name="UTC")
+
+    jobs = JobPostV2.objects.bulk_create([
+        JobPostV2(
+            user=client, title=f"Benchmark job {client.pk}-{index}", description="Synthetic benchmark job",
+            project_size="SMALL", budget_type=budget_type, duration=rng.choice(list(DURATION_WEEKS)),
+            preferred_coder_residence="ANYWHERE_IN_THE_WORLD",
+            minimum_hourly_rate=10 if budget_type == "HOURLY" else None,
+            maximum_hourly_rate=80 if budget_type == "HOURLY" else None,
+            maximum_budget=5000 if budget_type == "FIXED" else None,
+        )
+        for client in clients
+        for index, budget_type in zip(range(sizes["jobs_per_client"]), ["HOURLY", "FIXED"] * sizes["jobs_per_client"])
+    ])
+    JobPostV2.technologies.through.objects.bulk_create([
+        JobPostV2.technologies.through(jobpostv2=job, technology=technology)
+        for job in jobs for technology in rng.sample(technologies, min(3, len(technologies)))
+    ])
+    JobPostV2.timezone.through.objects.bulk_create([
+        JobPostV2.timezone.through(jobpostv2=job, timezone=utc) for job in jobs
+    ])
+
+    proposals, milestones = [], []
+    for job in jobs:
+        for coder in rng.sample(coders, min(sizes["proposals_per_job"], len(coders))):
+            if job.budget_type == "HOURLY":
+                hourly_rate = Decimal(rng.randint(10, 120))
+                availability = rng.randint(5, 40)
+                fees = proposal_fees(job, coder, hourly_rate=hourly_rate, availability_per_week=availability)
+            else:
+                hourly_rate, availability = None, None
+                funds = [Decimal(rng.randint(100, 2000)) for _ in range(sizes["milestones_per_proposal"])]
+                milestones += [
+                    MilestoneV2(user=coder, job_post=job, name=f"Milestone {index}", description="Synthetic",
+                                time=rng.randint(1, 20), fund_released=fund)
+                    for index, fund in enumerate(funds)
+                ]
+                fees = fee_breakdown(sum(funds))
+            proposals.append(JobProposalV2(
+                user=coder, job_post=job, proposal_type=job.budget_type, hourly_rate=hourly_rate,
+                availability_per_week=availability, proposal_description="Synthetic proposal", **fees
+            ))
+    JobProposalV2.objects.bulk_create(proposals)
+    MilestoneV2.objects.bulk_create(milestones)
+
+    hired = {}
+    for proposal in proposals:
+        hired.setdefault(proposal.job_post_id, proposal)
+    contracts = JobContract.objects.bulk_create([
+        JobContract(
+            job_proposal=proposal, job_post=proposal.job_post, coder_id=proposal.user, client_id=proposal.job_post.user,
+            name=f"{proposal.job_post.user}_{proposal.user}_{proposal.job_post.title}",
+            hourly_rate=float(proposal.hourly_rate) if proposal.hourly_rate else None,
+            is_hourly_rate=proposal.proposal_type == "HOURLY", rating=rng.choice([None, 3, 4, 5]), feedback="",
+        )
+        for proposal in hired.values()
+    ])
+
+    today = timezone.localdate()
+    timesheets = []
+    for contract in contracts:
+        if not contract.is_hourly_rate:
+            continue
+        for index in range(sizes["timesheets_per_contract"]):
+            start_hour = rng.randint(8, 14)
+            hours = rng.randint(1, 4)
+            timesheets.append(Timesheet(
+                user=contract.coder_id, client=contract.client_id, job_contract=contract,
+                date=today - datetime.timedelta(days=index), start_time=datetime.time(start_hour),
+                end_time=datetime.time(start_hour + hours), total_hours=hours, amount=hours * contract.hourly_rate,
+                timesheet_status=rng.choice(["PENDING", "APPROVED", "REJECTED"]),
+            ))
+    Timesheet.objects.bulk_create(timesheets)
+
+    return {"CLIENT": clients[0], "CODER": coders[0], "SUPER-ADMIN": admin}
+
+
+def persona_accounts():
+    """
+    Seeded logins for the load test personas, with the jobs, contracts and technologies their scenarios use
+    """
+    technologies = list(Technology.objects.values_list("name", flat=True))
+    jobs = defaultdict(list)
+    for user_id, job_id in JobPostV2.objects.filter(user__username__startswith="bench_client_").values_list(
+            "user_id", "id"):
+        jobs[user_id].append(str(job_id))
+    contracts = defaultdict(list)
+    for coder_id, contract_id in JobContract.objects.filter(
+            coder_id__username__startswith="bench_coder_", is_hourly_rate=True).values_list("coder_id", "id"):
+        contracts[coder_id].append(str(contract_id))
+
+    def accounts(prefix, data):
+        return [
+            {"email": email, "password": BENCHMARK_PASSWORD, "data": data(pk)}
+            for pk, email in User.objects.filter(username__startswith=f"bench_{prefix}_").values_list("pk", "email")
+        ]
+
+    return {
+        "client": accounts("client", lambda pk: {"jobs": jobs[pk], "technologies": technologies}),
+        "coder": accounts("coder", lambda pk: {"contracts": contracts[pk], "technologies": technologies}),
+    }
@@ -0,0 +1,123 @@
+"""
+Throughput of the read endpoints under many concurrent connections, gunicorn WSGI workers vs. ASGI workers
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import httpx
+from django.conf import settings
+
+from benchmarks.runner import percentile
+
+MODES = ("wsgi", "asgi")
+
+READ_PATHS = (
+    "/api/v2/job-posts/",
+    "/api/v2/job-posts/{job_post}/",
+    "/api/v1/coder/",
+    "/api/v1/recommended-jobs/",
+    "/api/v1/technology-dropdown/",
+)
+
+
+def start_server(mode, database, port, workers, threads):
+    """
+    Start gunicorn with gunicorn.conf.py in the given SERVER_MODE against the given database
+    """
+    env = {
+        **os.environ,
+        "SERVER_MODE": mode,
+        "DB_NAME": database,
+        "DEBUG": "False",
+        "REQUEST_PROFILING": "False",
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_THREADS": str(threads),
+        "GUNICORN_MAX_REQUESTS": "0",
+    }
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"], env=env,
+                            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/api/v1/recommended-jobs/", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s.")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def load(base_url, paths, headers, concurrency, requests):
+    """
+    Send `requests` GETs, cycling through `paths`, from `concurrency` connections kept busy at once
+    """
+    timings, statuses = [], {}
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            for index in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[index % len(paths)])
+                    status = response.status_code
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                timings.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 500),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+    }
+
+
+@contextmanager
+def serve(mode, database, port=8765, workers=3, threads=1):
+    """
+    Run gunicorn on localhost for the duration of the block and yield its base URL
+    """
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_server(mode, database, port, workers, threads)
+    try:
+        wait_until_ready(base_url)
+        yield base_url
+    finally:
+        stop_server(process)
+
+
+def run(database, paths, headers, concurrency=500, requests=5000, workers=3, threads=1, port=8765, modes=MODES):
+    results = []
+    for mode in modes:
+        with serve(mode, database, port, workers, threads) as base_url:
+            # warm every worker's imports and connections before timing
+            asyncio.run(load(base_url, paths, headers, min(concurrency, workers * 10), workers * 10))
+            result = asyncio.run(load(base_url, paths, headers, concurrency, requests))
+        results.append({"mode": mode, "workers": workers, "threads": threads, **result})
+    return results
@@ -9,7 +9,9 @@ from .models import (
     MilestoneV2,
     JobProposalV2,
     JobContract,
-    Timesheet
+    Timesheet,
+    TimesheetRollup,
+    QueryFingerprint
 )
 
 # Register your models here.
@@ -22,3 +24,5 @@ admin.site.register(Expertise)
 admin.site.register(JobInvitation)
 admin.site.register(JobContract)
 admin.site.register(Timesheet)
+admin.site.register(TimesheetRollup)
+admin.site.register(QueryFingerprint)
@@ -0,0 +1,61 @@
+"""
+Streaming exports for Core Application
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+EXPORT_CHUNK_SIZE = 2000
+
+TIMESHEET_EXPORT_HEADER = [
+    "id", "date", "job_contract", "job_contract_name", "coder", "start_time", "end_time", "total_hours", "amount",
+    "hirecoder_fee", "payment_status", "timesheet_status", "description", "created",
+]
+
+
+class Echo:
+    """
+    Pseudo buffer handing every value written by csv.writer straight back
+    """
+
+    def write(self, value):
+        return value
+
+
+def timesheet_rows(queryset):
+    """
+    Header followed by one row per timesheet.
+    - iterator() reads through a server-side cursor, so memory stays flat however many rows match
+    """
+    yield TIMESHEET_EXPORT_HEADER
+    queryset = queryset.select_related("job_contract", "user").order_by("date", "start_time", "pk_id")
+    for timesheet in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            str(timesheet.id), timesheet.date, str(timesheet.job_contract.id), timesheet.job_contract.name,
+            timesheet.user.username, timesheet.start_time, timesheet.end_time, timesheet.total_hours,
+            timesheet.amount, timesheet.job_contract.hirecoder_fee, timesheet.payment_status,
+            timesheet.timesheet_status, timesheet.description, timesheet.created.replace(tzinfo=None),
+        ]
+
+
+def export_timesheets(queryset, file_format, filename):
+    """
+    Stream timesheets as CSV, or as XLSX built with a write-only workbook
+    """
+    rows = timesheet_rows(queryset)
+    if file_format == "xlsx":
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet("Timesheets")
+        for row in rows:
+            worksheet.append(row)
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=f"{filename}.xlsx")
+
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
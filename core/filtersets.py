@@ -82,6 +82,8 @@ class TimesheetFilter(django_filters.FilterSet):
         method="filter_job_contract", label="job_contract (case-insensitive)"
     )
     date = django_filters.DateFilter(lookup_expr='exact')
+    date__gte = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date__lte = django_filters.DateFilter(field_name='date', lookup_expr='lte')
     description = django_filters.CharFilter(lookup_expr="icontains")
     start_time = django_filters.TimeFilter(lookup_expr="gte")
     end_time = django_filters.TimeFilter(lookup_expr="lte")
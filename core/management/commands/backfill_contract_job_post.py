@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Subquery
+
+from core.models import JobContract, JobProposalV2
+
+
+class Command(BaseCommand):
+    help = "Fill JobContract.job_post from the accepted proposal for contracts created before the column existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Contracts updated per transaction.")
+
+    def handle(self, *args, **options):
+        # older duplicates of a (job post, coder) pair would break the unique constraint, keep the first one only
+        duplicates = (
+            JobContract.objects.values("job_proposal__job_post", "coder_id")
+            .annotate(contracts=Count("pk_id"), first=Min("pk_id"))
+            .filter(contracts__gt=1)
+        )
+        skipped = set()
+        for duplicate in duplicates:
+            others = JobContract.objects.filter(
+                job_proposal__job_post=duplicate["job_proposal__job_post"], coder_id=duplicate["coder_id"]
+            ).exclude(pk_id=duplicate["first"]).filter(job_post__isnull=True)
+            for contract in others:
+                skipped.add(contract.pk_id)
+                self.stdout.write(self.style.WARNING(f"Skipping duplicate contract {contract.id} {contract.name}"))
+
+        proposal_job_post = JobProposalV2.objects.filter(pk_id=OuterRef("job_proposal_id")).values("job_post_id")[:1]
+        updated = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    JobContract.objects.filter(job_post__isnull=True).exclude(pk_id__in=skipped).order_by("pk_id")
+                    .values_list("pk_id", flat=True)[:options["batch_size"]]
+                )
+                if not batch:
+                    break
+                updated += JobContract.objects.filter(pk_id__in=batch).update(job_post_id=Subquery(proposal_job_post))
+            self.stdout.write(f"Backfilled {updated} contracts")
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} contracts backfilled, {len(skipped)} skipped."))
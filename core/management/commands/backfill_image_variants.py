@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from accounts.images import IMAGE_FIELDS, generate_variants, save_variants
+
+
+class Command(BaseCommand):
+    help = "Generate the thumbnail and medium variants of company logos and profile pictures that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Processes rendering images, defaults to the number of CPUs.")
+        parser.add_argument("--all", action="store_true", help="Regenerate every variant, not only missing ones.")
+
+    def handle(self, *args, **options):
+        pending = []
+        for model_label, field_name in IMAGE_FIELDS:
+            rows = apps.get_model(model_label).objects.exclude(**{field_name: ""}).exclude(**{field_name: None})
+            for pk, name, variants in rows.values_list("pk", field_name, f"{field_name}_variants").iterator():
+                if options["all"] or variants.get("source") != name:
+                    pending.append((model_label, pk, field_name, name))
+        self.stdout.write(f"{len(pending)} images to process")
+
+        # the workers never use the database, forked children must not share the parent's connections
+        for connection in connections.all(initialized_only=True):
+            if not connection.in_atomic_block:
+                connection.close()
+        done, failed = 0, 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as pool:
+            futures = {}
+            for row in pending:
+                model_label, _, field_name, name = row
+                futures[pool.submit(generate_variants, model_label, field_name, name)] = row
+            for future in as_completed(futures):
+                model_label, pk, field_name, name = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as exc:  # noqa: BLE001 - one broken image must not stop the backfill
+                    failed += 1
+                    self.stderr.write(f"{model_label} {name}: {exc}")
+                    continue
+                save_variants(model_label, pk, field_name, name, variants)
+                done += 1
+                if done % 100 == 0:
+                    self.stdout.write(f"Processed {done} images")
+        self.stdout.write(self.style.SUCCESS(f"Done, {done} images processed, {failed} failed."))
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from core.models import JobProposalV2, MilestoneV2
+from core.pricing import FEE_FIELDS, proposal_fees
+
+
+class Command(BaseCommand):
+    help = "Compute and store the fee breakdown of proposals that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Proposals priced per batch.")
+        parser.add_argument("--all", action="store_true", help="Reprice every proposal, not only missing ones.")
+
+    def handle(self, *args, **options):
+        proposals = JobProposalV2.objects.select_related("job_post").order_by("pk_id")
+        if not options["all"]:
+            proposals = proposals.filter(total_project_cost__isnull=True)
+
+        last_pk, priced = 0, 0
+        while True:
+            batch = list(proposals.filter(pk_id__gt=last_pk)[:options["batch_size"]])
+            if not batch:
+                break
+            last_pk = batch[-1].pk_id
+            # one grouped query prices every fixed proposal of the batch
+            milestone_totals = {
+                (row["job_post"], row["user"]): row["total"]
+                for row in MilestoneV2.objects.filter(job_post__in={proposal.job_post_id for proposal in batch})
+                .values("job_post", "user").annotate(total=Sum("fund_released"))
+            }
+            updated = []
+            for proposal in batch:
+                fees = proposal_fees(
+                    proposal.job_post, proposal.user_id, hourly_rate=proposal.hourly_rate,
+                    availability_per_week=proposal.availability_per_week,
+                    milestone_total=milestone_totals.get((proposal.job_post_id, proposal.user_id), Decimal("0")),
+                )
+                if fees is None:
+                    continue
+                for field, value in fees.items():
+                    setattr(proposal, field, value)
+                updated.append(proposal)
+            JobProposalV2.objects.bulk_update(updated, FEE_FIELDS)
+            priced += len(updated)
+            self.stdout.write(f"Priced {priced} proposals")
+        self.stdout.write(self.style.SUCCESS(f"Done, {priced} proposals priced."))
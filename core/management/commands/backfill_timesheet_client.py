@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from core.models import JobContract, Timesheet
+
+
+class Command(BaseCommand):
+    help = "Fill Timesheet.client from the owning JobContract for rows created before the column existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Timesheets updated per transaction.")
+
+    def handle(self, *args, **options):
+        contract_client = JobContract.objects.filter(pk_id=OuterRef("job_contract_id")).values("client_id")[:1]
+        updated = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Timesheet.objects.filter(client__isnull=True).order_by("pk_id")
+                    .values_list("pk_id", flat=True)[:options["batch_size"]]
+                )
+                if not batch:
+                    break
+                updated += Timesheet.objects.filter(pk_id__in=batch).update(client_id=Subquery(contract_client))
+            self.stdout.write(f"Backfilled {updated} timesheets")
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} timesheets backfilled."))
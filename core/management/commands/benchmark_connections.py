@@ -0,0 +1,31 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from benchmarks import connections
+from core.management.commands.benchmark_endpoints import RESULTS_DIR, current_commit
+
+
+class Command(BaseCommand):
+    help = "Compare per-request latency with a new, a persistent and a pooled database connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Simulated requests per mode.")
+        parser.add_argument("--query", default="SELECT 1", help="Query each simulated request runs.")
+        parser.add_argument("--output", help="Result file, defaults to benchmarks/results/connections_<time>.json.")
+
+    def handle(self, *args, **options):
+        results = connections.run(options["requests"], options["query"])
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<28} p50 {result['p50_ms']:>8.3f}ms p95 {result['p95_ms']:>8.3f}ms "
+                f"mean {result['mean_ms']:>8.3f}ms"
+            )
+        output = Path(options["output"]) if options["output"] else (
+            RESULTS_DIR / f"connections_{timezone.now():%Y%m%d-%H%M%S}_{current_commit()}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({"commit": current_commit(), "created": timezone.now().isoformat(),
+                                      "results": results}, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Saved {output}."))
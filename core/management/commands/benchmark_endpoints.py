@@ -0,0 +1,73 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from benchmarks import runner, seed
+
+RESULTS_DIR = Path(settings.BASE_DIR) / "benchmarks" / "results"
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=settings.BASE_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Command(BaseCommand):
+    help = ("Seed a synthetic dataset in a throwaway test database, benchmark every GET endpoint of the API "
+            "routers and save p50/p95 latency, query count and peak memory as JSON.")
+
+    def add_arguments(self, parser):
+        for name, default in seed.DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"Synthetic {name.replace('_', ' ')} (default {default}).")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per endpoint and role.")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests before timing.")
+        parser.add_argument("--only", help="Benchmark only endpoints whose name contains this text.")
+        parser.add_argument("--output", help="Result file, defaults to benchmarks/results/<time>_<commit>.json.")
+        parser.add_argument("--compare", help="Earlier result file to report p95 and query count changes against.")
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in seed.DEFAULT_SIZES}
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            users = seed.seed(sizes)
+            results = runner.run(users, options["iterations"], options["warmup"], options["only"], self.stdout)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        commit = current_commit()
+        report = {
+            "commit": commit,
+            "created": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "sizes": sizes,
+            "iterations": options["iterations"],
+            "results": results,
+        }
+        if options["compare"]:
+            report["changes"] = runner.compare(json.loads(Path(options["compare"]).read_text()), results)
+            for change in report["changes"]:
+                self.stdout.write(
+                    f"{change['role']:<12} {change['endpoint']:<55} p95 {change['p95_ms_change']:+9.2f}ms "
+                    f"queries {change['queries_change']:+d}"
+                )
+
+        output = Path(options["output"]) if options["output"] else (
+            RESULTS_DIR / f"{timezone.now():%Y%m%d-%H%M%S}_{commit}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Benchmarked {len(results)} endpoint/role pairs, saved {output}."))
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from benchmarks import seed, servers
+from core.management.commands.benchmark_endpoints import RESULTS_DIR, current_commit
+from core.models import JobPostV2
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway test database, serve it with gunicorn in WSGI and in ASGI mode and compare "
+            "throughput and latency of the read endpoints under many concurrent connections.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=500, help="Connections kept busy at once.")
+        parser.add_argument("--requests", type=int, default=5000, help="Requests per server mode.")
+        parser.add_argument("--workers", type=int, default=3, help="Gunicorn workers per server.")
+        parser.add_argument("--threads", type=int, default=1, help="Threads per WSGI worker.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--mode", choices=servers.MODES, action="append", help="Only run these modes.")
+        parser.add_argument("--output", help="Result file, defaults to benchmarks/results/servers_<time>.json.")
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict["NAME"]
+        database = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            users = seed.seed()
+            # the servers are separate processes, they can only see committed rows
+            job_post = JobPostV2.objects.filter(user=users["CLIENT"]).order_by("created").first()
+            token = RefreshToken.for_user(users["CLIENT"]).access_token
+            paths = [path.format(job_post=job_post.id) for path in servers.READ_PATHS]
+            connection.close()
+            results = servers.run(database, paths, {"Authorization": f"Bearer {token}"},
+                                  concurrency=options["concurrency"], requests=options["requests"],
+                                  workers=options["workers"], threads=options["threads"], port=options["port"],
+                                  modes=options["mode"] or servers.MODES)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<5} {result['requests_per_second']:>8.1f} req/s p50 {result['p50_ms']:>9.2f}ms "
+                f"p95 {result['p95_ms']:>9.2f}ms p99 {result['p99_ms']:>9.2f}ms errors {result['errors']}"
+            )
+        output = Path(options["output"]) if options["output"] else (
+            RESULTS_DIR / f"servers_{timezone.now():%Y%m%d-%H%M%S}_{current_commit()}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({"commit": current_commit(), "created": timezone.now().isoformat(),
+                                      "paths": paths, "results": results}, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Saved {output}."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from mysite import openapi
+
+
+class Command(BaseCommand):
+    help = ("Generate the OpenAPI schema of the current code into OPENAPI_SCHEMA_DIR, so the API docs are served "
+            "from the file instead of being generated on first access.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schema-version",
+                            help="Version to store the schema under, defaults to the current code version.")
+
+    def handle(self, *args, **options):
+        for path in openapi.write_schemas(options["schema_version"]):
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
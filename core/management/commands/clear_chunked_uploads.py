@@ -0,0 +1,24 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ChunkedUpload
+from core.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads that were never finalized, with the chunks they left on disk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+                            help="Clear uploads without a new chunk for this many hours.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(hours=options["hours"])
+        cleared = 0
+        for upload in ChunkedUpload.objects.filter(status="UPLOADING", updated__lt=cutoff).iterator():
+            discard_upload(upload)
+            cleared += 1
+        self.stdout.write(self.style.SUCCESS(f"Done, {cleared} abandoned uploads cleared."))
@@ -0,0 +1,81 @@
+import datetime
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.utils import timezone
+
+from core.models import StoredBlob
+from core.utils import attachment_storage
+from mysite.storage import BLOB_PREFIX, ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = "Reset blob reference counts from the attachment file fields and delete blobs nothing refers to."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-minutes", type=int, default=60,
+                            help="Leave blobs saved more recently alone, their records may not be saved yet.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted.")
+
+    def handle(self, *args, **options):
+        storage = attachment_storage()
+        if not isinstance(storage, ContentAddressedStorage):
+            self.stdout.write("Attachments do not use content addressed storage, nothing to do.")
+            return
+        cutoff = timezone.now() - datetime.timedelta(minutes=options["grace_minutes"])
+        references = self.references(storage)
+
+        recounted, deleted = 0, 0
+        for blob in StoredBlob.objects.filter(updated__lt=cutoff).iterator():
+            count = references[blob.name]
+            if count and count == blob.refcount:
+                continue
+            if options["dry_run"]:
+                deleted += not count
+                continue
+            with transaction.atomic():
+                # skip blobs saved again since they were read
+                blob = StoredBlob.objects.select_for_update().filter(pk=blob.pk, updated__lt=cutoff).first()
+                if blob is None:
+                    continue
+                if count:
+                    blob.refcount = count
+                    blob.save(update_fields=["refcount"])
+                    recounted += 1
+                else:
+                    blob.delete()
+                    storage.delete(blob.name)
+                    deleted += 1
+
+        # files without a row, left by saves interrupted before their transaction committed
+        known = set(StoredBlob.objects.values_list("name", flat=True))
+        for root, _, files in os.walk(storage.path(BLOB_PREFIX)):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+                modified = datetime.datetime.fromtimestamp(os.path.getmtime(path), tz=datetime.timezone.utc)
+                if name in known or references[name] or modified >= cutoff:
+                    continue
+                if not options["dry_run"]:
+                    os.remove(path)
+                deleted += 1
+
+        verb = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(f"Done, {recounted} reference counts fixed, {deleted} blobs {verb}."))
+
+    @staticmethod
+    def references(storage):
+        """
+        How many file field values name each blob, over every model with a field on this storage
+        """
+        references = Counter()
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, models.FileField) or field.storage is not storage:
+                    continue
+                names = model._default_manager.filter(**{f"{field.name}__startswith": f"{BLOB_PREFIX}/"})
+                references.update(names.values_list(field.name, flat=True).iterator())
+        return references
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from benchmarks import load, seed, servers
+from core.management.commands.benchmark_endpoints import RESULTS_DIR, current_commit
+
+
+def parse_stages(value):
+    """
+    "10:30,50:30" -> [(10, 30.0), (50, 30.0)], concurrency and seconds per stage
+    """
+    try:
+        stages = [(int(concurrency), float(seconds))
+                  for concurrency, seconds in (stage.split(":") for stage in value.split(","))]
+    except ValueError:
+        raise CommandError(f"Invalid --stages {value!r}, expected e.g. 10:30,50:30.")
+    if not stages or any(concurrency < 1 or seconds <= 0 for concurrency, seconds in stages):
+        raise CommandError("Every stage needs at least one user and a positive duration.")
+    return stages
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway test database, serve it with gunicorn on localhost and ramp virtual client and "
+            "coder users through their scenarios, reporting throughput, latency and errors per scenario.")
+
+    def add_arguments(self, parser):
+        for name, default in seed.DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"Synthetic {name.replace('_', ' ')} (default {default}).")
+        parser.add_argument("--stages", default="10:30,50:30,100:30",
+                            help="Concurrent users and seconds per stage, e.g. 10:30,50:30,100:30.")
+        parser.add_argument("--client-share", type=float, default=0.4,
+                            help="Share of sessions run by the client persona, the rest are coders.")
+        parser.add_argument("--think-time", type=float, default=0.0,
+                            help="Mean pause in seconds between the requests of a virtual user.")
+        parser.add_argument("--mode", choices=servers.MODES, default="wsgi", help="Server mode to test.")
+        parser.add_argument("--workers", type=int, default=3, help="Gunicorn workers.")
+        parser.add_argument("--threads", type=int, default=1, help="Threads per WSGI worker.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--output", help="Result file, defaults to benchmarks/results/load_<time>.json.")
+
+    def handle(self, *args, **options):
+        stages = parse_stages(options["stages"])
+        if not 0 <= options["client_share"] <= 1:
+            raise CommandError("--client-share must be between 0 and 1.")
+        weights = {"client": options["client_share"], "coder": 1 - options["client_share"]}
+        sizes = {name: options[name] for name in seed.DEFAULT_SIZES}
+
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict["NAME"]
+        database = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            seed.seed(sizes)
+            accounts = seed.persona_accounts()
+            # the server is a separate process, it can only see committed rows
+            connection.close()
+            with servers.serve(options["mode"], database, options["port"], options["workers"],
+                               options["threads"]) as base_url:
+                results = asyncio.run(load.run(base_url, accounts, stages, weights, options["think_time"]))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for stage in results:
+            for scenario, result in [("all", stage), *stage["scenarios"].items()]:
+                self.stdout.write(
+                    f"{stage['concurrency']:>5} users {scenario:<7} {result['requests_per_second']:>8.1f} req/s "
+                    f"p50 {result['p50_ms']:>9.2f}ms p95 {result['p95_ms']:>9.2f}ms p99 {result['p99_ms']:>9.2f}ms "
+                    f"errors {result['error_rate']:>7.2%}"
+                )
+        output = Path(options["output"]) if options["output"] else (
+            RESULTS_DIR / f"load_{timezone.now():%Y%m%d-%H%M%S}_{current_commit()}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "commit": current_commit(), "created": timezone.now().isoformat(), "mode": options["mode"],
+            "workers": options["workers"], "threads": options["threads"], "sizes": sizes, "weights": weights,
+            "think_time": options["think_time"], "stages": results,
+        }, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Saved {output}."))
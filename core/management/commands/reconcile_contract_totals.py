@@ -0,0 +1,76 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Sum
+
+from core.models import JobContract, Timesheet
+
+
+class Command(BaseCommand):
+    help = "Recompute JobContract totals from approved timesheets and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Contracts per chunk.")
+        parser.add_argument("--workers", type=int, default=4, help="Chunks reconciled in parallel.")
+        parser.add_argument("--fix", action="store_true", help="Write the recomputed totals back.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        contract_pks = list(JobContract.objects.order_by("pk_id").values_list("pk_id", flat=True))
+        chunks = [contract_pks[i:i + chunk_size] for i in range(0, len(contract_pks), chunk_size)]
+
+        if options["workers"] > 1:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                results = list(executor.map(lambda chunk: self.reconcile_in_thread(chunk, options["fix"]), chunks))
+        else:
+            results = [self.reconcile_chunk(chunk, options["fix"]) for chunk in chunks]
+
+        drifted = [row for result in results for row in result]
+        for contract, hours, amount in drifted:
+            self.stdout.write(
+                f"{contract.id} {contract.name}: hours {contract.total_hours_worked} -> {hours}, "
+                f"amount {contract.total_amount_earned} -> {amount}"
+            )
+        action = "fixed" if options["fix"] else "drifted"
+        self.stdout.write(self.style.SUCCESS(f"Checked {len(contract_pks)} contracts, {len(drifted)} {action}."))
+
+    def reconcile_in_thread(self, contract_pks, fix):
+        try:
+            return self.reconcile_chunk(contract_pks, fix)
+        finally:
+            # every worker thread opens its own connection
+            connections.close_all()
+
+    @staticmethod
+    def reconcile_chunk(contract_pks, fix):
+        with transaction.atomic():
+            contracts = JobContract.objects.filter(pk_id__in=contract_pks).only(
+                "pk_id", "id", "name", "total_hours_worked", "total_amount_earned")
+            if fix:
+                # approvals block on these locks, so their F() updates land on top of the recomputed totals
+                contracts = contracts.select_for_update()
+            contracts = list(contracts)
+            totals = {
+                row["job_contract"]: row
+                for row in Timesheet.objects.filter(job_contract__in=contract_pks, timesheet_status="APPROVED")
+                .values("job_contract")
+                .annotate(hours=Sum("total_hours"), amount=Sum("amount"))
+            }
+            drifted = []
+            for contract in contracts:
+                row = totals.get(contract.pk_id, {})
+                hours = row.get("hours") or 0.0
+                amount = row.get("amount") or 0.0
+                if math.isclose(contract.total_hours_worked, hours, abs_tol=0.005) and \
+                        math.isclose(contract.total_amount_earned, amount, abs_tol=0.005):
+                    continue
+                drifted.append((contract, hours, amount))
+            if fix and drifted:
+                JobContract.objects.bulk_update(
+                    [JobContract(pk_id=contract.pk_id, total_hours_worked=hours, total_amount_earned=amount)
+                     for contract, hours, amount in drifted],
+                    ["total_hours_worked", "total_amount_earned"],
+                )
+        return drifted
@@ -0,0 +1,175 @@
+"""
+Middleware for Core Application
+"""
+import contextvars
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+from core.query_profiler import RequestQueries, query_stats
+
+logger = logging.getLogger("core.profiling")
+
+request_profile = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """
+    Query count and time spent in the database, serializers and the view during one request
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.view_start = None
+        self.view_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def install_serializer_timing():
+    """
+    Wrap BaseSerializer.data so the outermost serialization of each response is timed.
+    - Installed only when profiling is enabled, nested .data calls are not counted twice
+    """
+    original = BaseSerializer.data
+    if getattr(original.fget, "profiled", False):
+        return
+
+    def data(self):
+        profile = request_profile.get()
+        if profile is None:
+            return original.fget(self)
+        profile.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += time.perf_counter() - start
+
+    data.profiled = True
+    BaseSerializer.data = property(data)
+
+
+class RequestProfilingMiddleware:
+    """
+    Record query count, DB, serializer and view time per request when REQUEST_PROFILING is on.
+    - Timings go out as a Server-Timing header and a JSON log line on the core.profiling logger
+    - Requests running more queries than QUERY_BUDGETS allows for their URL name are logged as warnings
+    - When disabled the middleware removes itself from the chain
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = request_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            request_profile.reset(token)
+        total_time = time.perf_counter() - start
+        if profile.view_start is not None:
+            profile.view_time = time.perf_counter() - profile.view_start
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={profile.db_time * 1000:.2f};desc="{profile.queries} queries"',
+            f"serializer;dur={profile.serializer_time * 1000:.2f}",
+            f"view;dur={profile.view_time * 1000:.2f}",
+            f"total;dur={total_time * 1000:.2f}",
+        ])
+        self.log(request, response, profile, total_time)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = request_profile.get()
+        if profile is not None:
+            profile.view_start = time.perf_counter()
+
+    def log(self, request, response, profile, total_time):
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        budget = settings.QUERY_BUDGETS.get(view_name, settings.DEFAULT_QUERY_BUDGET)
+        over_budget = budget is not None and profile.queries > budget
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": view_name,
+            "status": response.status_code,
+            "queries": profile.queries,
+            "query_budget": budget,
+            "over_budget": over_budget,
+            "db_ms": round(profile.db_time * 1000, 2),
+            "serializer_ms": round(profile.serializer_time * 1000, 2),
+            "view_ms": round(profile.view_time * 1000, 2),
+            "total_ms": round(total_time * 1000, 2),
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+
+
+def view_name_of(request):
+    match = request.resolver_match
+    return match.view_name if match else "<unresolved>"
+
+
+def log_slow_query(view_name, fingerprint, sql, elapsed_ms):
+    # parameters are left out, only the normalized statement is logged
+    logger.warning(json.dumps({
+        "slow_query": fingerprint,
+        "view": view_name,
+        "ms": round(elapsed_ms, 2),
+        "sql": sql,
+    }))
+
+
+class QueryFingerprintMiddleware:
+    """
+    Aggregate query count and time per normalized SQL statement and view when QUERY_FINGERPRINTING is on.
+    - Totals are kept in core.query_profiler.query_stats and added to QueryFingerprint every
+      QUERY_FINGERPRINT_FLUSH_SECONDS, the admin query-fingerprints endpoint lists the worst of them
+    - Queries slower than SLOW_QUERY_MS are logged as warnings on the core.profiling logger
+    - When disabled the middleware removes itself from the chain
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_FINGERPRINTING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        query_stats.flush_interval = settings.QUERY_FINGERPRINT_FLUSH_SECONDS
+
+    def __call__(self, request):
+        queries = RequestQueries(lambda: view_name_of(request), settings.SLOW_QUERY_MS, log_slow_query)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries.record_query))
+            response = self.get_response(request)
+        query_stats.add_request(view_name_of(request), queries)
+        if query_stats.flush_due():
+            try:
+                query_stats.flush()
+            except Exception:  # noqa: BLE001 - profiling must never fail the request
+                logger.exception("query fingerprint flush failed")
+        return response
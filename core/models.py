@@ -4,9 +4,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 import pytz
 from accounts.models import Technology, User
-from core.utils import file_field_validators
-from mysite.settings import HIRECODER_FEE
-from django.core.validators import MinValueValidator
+from core.utils import attachment_storage, file_field_validators
 from mysite.settings import HIRECODER_FEE
 import datetime
 
@@ -102,6 +100,11 @@ PAYMENT_STATUS = {
     ("FAILED", "Failed")
 }
 
+ROLLUP_PERIODS = (
+    ("WEEK", "Week"),
+    ("MONTH", "Month"),
+)
+
 
 class Expertise(models.Model):
     pk_id = models.BigAutoField(primary_key=True, editable=False)
@@ -149,18 +152,21 @@ class JobPost(models.Model):
     timezone = models.ManyToManyField(TimeZone, max_length=30, blank=False)
     attachment_1 = models.FileField(
         upload_to="jobpost/attachments",
+        storage=attachment_storage,
         blank=True,
         null=True,
         validators=file_field_validators(),
     )
     attachment_2 = models.FileField(
         upload_to="jobpost/attachments",
+        storage=attachment_storage,
         blank=True,
         null=True,
         validators=file_field_validators(),
     )
     attachment_3 = models.FileField(
         upload_to="jobpost/attachments",
+        storage=attachment_storage,
         blank=True,
         null=True,
         validators=file_field_validators(),
@@ -184,7 +190,8 @@ class JobPost(models.Model):
 class JobInvitation(models.Model):
     pk_id = models.BigAutoField(primary_key=True, editable=False)
     id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
-    coder = models.ForeignKey(User, on_delete=models.CASCADE, related_name="coder")
+    # invitation_coder_status_idx leads with coder, a second index on it would only slow down writes
+    coder = models.ForeignKey(User, on_delete=models.CASCADE, related_name="coder", db_index=False)
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name="client")
     jobpost = models.ForeignKey(JobPost, on_delete=models.CASCADE)
     status = models.CharField(
@@ -197,6 +204,9 @@ class JobInvitation(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['coder', 'client', 'jobpost'], name='unique_job_invitation')
         ]
+        indexes = [
+            models.Index(fields=['coder', 'status'], name='invitation_coder_status_idx'),
+        ]
 
 
 class JobPostV2(models.Model):
@@ -213,9 +223,12 @@ class JobPostV2(models.Model):
     expertise_is_expert = models.BooleanField(default=False)
     duration = models.CharField(choices=DURATION, max_length=30)
     timezone = models.ManyToManyField(TimeZone, max_length=30, blank=False)
-    attachment_1 = models.FileField(blank=True, null=True, validators=file_field_validators())
-    attachment_2 = models.FileField(blank=True, null=True, validators=file_field_validators())
-    attachment_3 = models.FileField(blank=True, null=True, validators=file_field_validators())
+    attachment_1 = models.FileField(blank=True, null=True, storage=attachment_storage,
+                                    validators=file_field_validators())
+    attachment_2 = models.FileField(blank=True, null=True, storage=attachment_storage,
+                                    validators=file_field_validators())
+    attachment_3 = models.FileField(blank=True, null=True, storage=attachment_storage,
+                                    validators=file_field_validators())
     status = models.CharField(choices=JOB_STATUS_CHOICES, max_length=50, default="OPEN")
     maximum_budget = models.PositiveIntegerField(null=True, blank=True)
     maximum_hourly_rate = models.PositiveIntegerField(null=True, blank=True)
@@ -224,6 +237,13 @@ class JobPostV2(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-created'], name='jobpostv2_status_created_idx'),
+            # most listings only want open jobs, newest first
+            models.Index(fields=['-created'], condition=models.Q(status='OPEN'), name='jobpostv2_open_created_idx'),
+        ]
+
     def __str__(self):
         return str(self.title)
 
@@ -237,7 +257,8 @@ class MilestoneV2(models.Model):
     time = models.PositiveIntegerField()
     fund_released = models.DecimalField(max_digits=14, decimal_places=2)
     milestone_status = models.CharField(choices=MILESTONE_STATUS, default="PROPOSED")
-    file = models.FileField(blank=True, null=True, validators=file_field_validators())
+    file = models.FileField(blank=True, null=True, storage=attachment_storage,
+                            validators=file_field_validators())
     completed_date = models.DateTimeField(blank=True, null=True)
     completed_description = models.TextField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
@@ -250,15 +271,19 @@ class JobProposalV2(models.Model):
     pk_id = models.BigAutoField(primary_key=True, editable=False)
     id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    job_post = models.ForeignKey(JobPostV2, on_delete=models.CASCADE)
+    # proposalv2_post_status_idx leads with job_post, a second index on it would only slow down writes
+    job_post = models.ForeignKey(JobPostV2, on_delete=models.CASCADE, db_index=False)
     proposal_description = models.TextField(blank=True, null=True)
     proposal_type = models.CharField(choices=JOB_PROPOSAL_TYPE)
     hourly_rate = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True,
                                       validators=[MinValueValidator(Decimal("1.00"))])
     availability_per_week = models.PositiveIntegerField(blank=True, null=True)
-    attachment_1 = models.FileField(blank=True, null=True, validators=file_field_validators())
-    attachment_2 = models.FileField(blank=True, null=True, validators=file_field_validators())
-    attachment_3 = models.FileField(blank=True, null=True, validators=file_field_validators())
+    attachment_1 = models.FileField(blank=True, null=True, storage=attachment_storage,
+                                    validators=file_field_validators())
+    attachment_2 = models.FileField(blank=True, null=True, storage=attachment_storage,
+                                    validators=file_field_validators())
+    attachment_3 = models.FileField(blank=True, null=True, storage=attachment_storage,
+                                    validators=file_field_validators())
     coder_fee = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
     platform_fee = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
     platform_fee_percentage = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True,
@@ -270,6 +295,11 @@ class JobProposalV2(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['job_post', 'status'], name='proposalv2_post_status_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"<JobProposal> {self.job_post} {self.user}"
 
@@ -281,6 +311,8 @@ class JobContract(models.Model):
     pk_id = models.BigAutoField(primary_key=True, editable=False)
     id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     job_proposal = models.ForeignKey(JobProposalV2, on_delete=models.CASCADE, blank=False, null=False)
+    # copy of job_proposal.job_post, one contract per job post and coder
+    job_post = models.ForeignKey(JobPostV2, on_delete=models.CASCADE, null=True, blank=True)
     coder_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="coder_c")
     client_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="client_c")
     name = models.CharField(max_length=100)
@@ -290,13 +322,18 @@ class JobContract(models.Model):
     rating = models.IntegerField(choices=RATING_CHOICES, null=True)
     feedback = models.TextField()
     total_amount_earned = models.FloatField(default=0.0)
-    total_hours_worked = models.IntegerField(default=0)
+    total_hours_worked = models.FloatField(default=0.0)
     hourly_rate = models.FloatField(blank=True, null=True)
-    hirecoder_fee = models.FloatField(default=HIRECODER_FEE)
+    hirecoder_fee = models.FloatField(default=float(HIRECODER_FEE))
     is_hourly_rate = models.BooleanField(default=True)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
-    
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job_post', 'coder_id'], name='unique_job_contract')
+        ]
+
     def __str__(self) -> str:
         return f"<JobContract> {self.name}"
 
@@ -305,7 +342,12 @@ class Timesheet(models.Model):
     id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField(default=datetime.date.today)
-    job_contract = models.ForeignKey(JobContract, on_delete=models.CASCADE)
+    # timesheet_contract_date_idx leads with job_contract, a second index on it would only slow down writes
+    job_contract = models.ForeignKey(JobContract, on_delete=models.CASCADE, db_index=False)
+    # copy of job_contract.client_id so client listings avoid the join up to the job post,
+    # timesheet_client_date_idx leads with it so it needs no index of its own
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name="client_timesheets", null=True,
+                               blank=True, db_index=False)
     start_time = models.TimeField(blank=True, null=True)
     end_time = models.TimeField(blank=True, null=True)
     total_hours = models.FloatField(default = 0.0)
@@ -316,6 +358,112 @@ class Timesheet(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'date'], name='timesheet_client_date_idx'),
+            models.Index(fields=['job_contract', 'date'], name='timesheet_contract_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.client_id is None and self.job_contract_id is not None:
+            self.client_id = self.job_contract.client_id_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str("Timesheet_" + self.job_contract.name + "_" +str(self.date) +
                    "_" + str(self.user.username) + "_" + str(self.created))
+
+
+class TimesheetRollup(models.Model):
+    """
+    Approved hours and amount of a contract for one closed week or month.
+    - Filled lazily by the timesheet summary so closed periods are never rescanned
+    """
+    pk_id = models.BigAutoField(primary_key=True, editable=False)
+    id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    job_contract = models.ForeignKey(JobContract, on_delete=models.CASCADE)
+    period = models.CharField(choices=ROLLUP_PERIODS, max_length=10)
+    period_start = models.DateField()
+    total_hours = models.FloatField(default=0.0)
+    total_amount = models.FloatField(default=0.0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job_contract', 'period', 'period_start'], name='unique_timesheet_rollup')
+        ]
+
+    def __str__(self):
+        return f"<TimesheetRollup> {self.job_contract_id} {self.period} {self.period_start}"
+
+
+UPLOAD_STATUS = (
+    ("UPLOADING", "Uploading"),
+    ("COMPLETE", "Complete"),
+)
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file sent in fixed size chunks and attached to a file field of `target` once complete.
+    - Chunks are kept under CHUNKED_UPLOAD_DIR until finalized, see core.uploads
+    """
+    pk_id = models.BigAutoField(primary_key=True, editable=False)
+    id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    target = models.CharField(max_length=30)
+    field = models.CharField(max_length=30)
+    object_id = models.UUIDField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(choices=UPLOAD_STATUS, max_length=30, default="UPLOADING")
+    file = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"<ChunkedUpload> {self.filename}"
+
+class StoredBlob(models.Model):
+    """
+    One file kept by mysite.storage.ContentAddressedStorage and the number of saves referring to it
+    """
+    pk_id = models.BigAutoField(primary_key=True, editable=False)
+    id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"<StoredBlob> {self.name} ({self.refcount})"
+
+class QueryFingerprint(models.Model):
+    """
+    Aggregated timings of one normalized SQL statement run by one view.
+    - Written periodically by core.middleware.QueryFingerprintMiddleware when QUERY_FINGERPRINTING is on
+    - calls / requests well above 1 points at a query running once per row (N+1)
+    """
+    pk_id = models.BigAutoField(primary_key=True, editable=False)
+    id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    view = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=32)
+    sql = models.TextField()
+    calls = models.PositiveBigIntegerField(default=0)
+    requests = models.PositiveBigIntegerField(default=0)
+    total_time = models.FloatField(default=0.0)
+    max_time = models.FloatField(default=0.0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['view', 'fingerprint'], name='unique_query_fingerprint')
+        ]
+
+    def __str__(self):
+        return f"<QueryFingerprint> {self.view} {self.fingerprint}"
@@ -0,0 +1,24 @@
+"""
+Parsers for Core Application
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+
+from core.upload_handlers import ValidatingUploadHandler
+
+
+class ValidatingMultiPartParser(MultiPartParser):
+    """
+    MultiPartParser checking files with ValidatingUploadHandler while they stream in, answering 400 with its errors.
+    - The handler is only added to the requests this parser reads, admin and Django form uploads keep the
+      default FILE_UPLOAD_HANDLERS
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        validator = ValidatingUploadHandler(request._request)
+        request._request.upload_handlers.insert(0, validator)
+        data_and_files = super().parse(stream, media_type, parser_context)
+        if validator.errors:
+            raise ValidationError(validator.errors)
+        return data_and_files
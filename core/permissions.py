@@ -16,6 +16,11 @@ class IsClientOrReadOnly(permissions.BasePermission):
         return True
 
 
+class IsClient(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.role == "CLIENT"
+
+
 class CustomMilestonePermission(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == "GET":
@@ -0,0 +1,67 @@
+"""
+Proposal pricing for Core Application
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Sum
+
+from core.models import JobProposalV2, MilestoneV2
+from core.services import invalidate_proposal_summary
+from mysite.settings import HIRECODER_FEE
+
+CENTS = Decimal("0.01")
+
+FEE_FIELDS = ["coder_fee", "platform_fee", "platform_fee_percentage", "total_project_cost"]
+
+# weeks of work assumed for each job duration when pricing hourly proposals
+DURATION_WEEKS = {
+    "SHORT_TERM": 4,
+    "MEDIUM_TERM": 12,
+    "LONG_TERM": 26,
+}
+
+
+def to_cents(value):
+    return Decimal(value).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def fee_breakdown(coder_fee, fee_rate=HIRECODER_FEE):
+    """
+    Split what the client pays into the coder fee and the platform fee
+    """
+    coder_fee = to_cents(coder_fee)
+    platform_fee = to_cents(coder_fee * fee_rate)
+    return {
+        "coder_fee": coder_fee,
+        "platform_fee": platform_fee,
+        "platform_fee_percentage": to_cents(fee_rate * 100),
+        "total_project_cost": coder_fee + platform_fee,
+    }
+
+
+def proposal_fees(job_post, coder, hourly_rate=None, availability_per_week=None, milestone_total=None):
+    """
+    Fee fields of a proposal, None when an hourly proposal lacks rate or availability
+    - FIXED jobs are priced from the coder's milestones on the job
+    - HOURLY jobs from hourly rate x availability per week x weeks of the job duration
+    """
+    if job_post.budget_type == "FIXED":
+        if milestone_total is None:
+            milestone_total = MilestoneV2.objects.filter(job_post=job_post, user=coder).aggregate(
+                total=Sum("fund_released"))["total"]
+        return fee_breakdown(milestone_total or Decimal("0"))
+
+    if hourly_rate is None or availability_per_week is None:
+        return None
+    weeks = DURATION_WEEKS[job_post.duration]
+    return fee_breakdown(Decimal(hourly_rate) * availability_per_week * weeks)
+
+
+def reprice_fixed_proposals(job_post, coder):
+    """
+    Store fresh fees on the coder's proposals for a fixed job after its milestones change
+    """
+    fees = proposal_fees(job_post, coder)
+    if JobProposalV2.objects.filter(job_post=job_post, user=coder).update(**fees):
+        # queryset updates skip the post_save signal that keeps the summary fresh
+        invalidate_proposal_summary(job_post.pk_id)
@@ -0,0 +1,151 @@
+"""
+SQL fingerprints aggregated per view, for finding the queries worth optimizing
+"""
+import hashlib
+import re
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROW_LIST = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """
+    SQL with literals and parameter lists collapsed, so every run of the same statement reads the same.
+    - IN (%s, %s, %s) and multi-row VALUES lists of any length become (...)
+    """
+    sql = sql.replace("%s", "?")
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = _ROW_LIST.sub(r"\1", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize(sql)
+    return hashlib.md5(normalized.encode(), usedforsecurity=False).hexdigest(), normalized
+
+
+class QueryStat:
+    __slots__ = ("sql", "calls", "requests", "total_time", "max_time")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, elapsed_ms, calls=1):
+        self.calls += calls
+        self.total_time += elapsed_ms
+        self.max_time = max(self.max_time, elapsed_ms)
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.requests += other.requests
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+
+
+class RequestQueries:
+    """
+    Fingerprints of the queries one request ran, kept apart until the request ends
+    """
+
+    def __init__(self, view_name, slow_query_ms=None, on_slow_query=None):
+        self.view_name = view_name
+        self.slow_query_ms = slow_query_ms
+        self.on_slow_query = on_slow_query
+        self.stats = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            key, normalized = fingerprint(sql)
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = QueryStat(normalized)
+            stat.add(elapsed_ms)
+            if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms and self.on_slow_query:
+                self.on_slow_query(self.view_name(), key, normalized, elapsed_ms)
+
+
+class QueryStats:
+    """
+    Process wide aggregate by (view, fingerprint), written to QueryFingerprint every flush_interval seconds
+    """
+
+    def __init__(self, flush_interval=60):
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.last_flush = time.monotonic()
+
+    def add_request(self, view, request_queries):
+        with self.lock:
+            for key, stat in request_queries.stats.items():
+                total = self.stats.get((view, key))
+                if total is None:
+                    total = self.stats[view, key] = QueryStat(stat.sql)
+                stat.requests = 1
+                total.merge(stat)
+
+    def flush_due(self):
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def take(self):
+        with self.lock:
+            stats, self.stats = self.stats, {}
+            self.last_flush = time.monotonic()
+        return stats
+
+    def restore(self, stats):
+        """
+        Put back aggregates a failed flush took, merged with the ones gathered since
+        """
+        with self.lock:
+            for key, stat in stats.items():
+                newer = self.stats.get(key)
+                if newer is not None:
+                    stat.merge(newer)
+                self.stats[key] = stat
+
+    def flush(self):
+        """
+        Add the aggregates gathered since the last flush to the QueryFingerprint rows.
+        - When the write fails they are kept for the next flush and the error is raised
+        """
+        from core.models import QueryFingerprint
+
+        stats = self.take()
+        try:
+            with transaction.atomic():
+                for (view, key), stat in stats.items():
+                    QueryFingerprint.objects.get_or_create(view=view[:255], fingerprint=key,
+                                                           defaults={"sql": stat.sql})
+                    QueryFingerprint.objects.filter(view=view[:255], fingerprint=key).update(
+                        calls=F("calls") + stat.calls,
+                        requests=F("requests") + stat.requests,
+                        total_time=F("total_time") + stat.total_time,
+                        max_time=Greatest(F("max_time"), Value(stat.max_time)),
+                    )
+        except Exception:
+            self.restore(stats)
+            raise
+        return len(stats)
+
+
+query_stats = QueryStats()
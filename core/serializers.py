@@ -1,10 +1,12 @@
 """
 Serializers for Core Application
 """
+import datetime as dt
 from datetime import datetime
 from collections import OrderedDict
 import pytz
 import uuid
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -19,11 +21,21 @@ from core.models import (
     JobPostV2,
     CODER_RESIDE,
     JobContract,
-    Timesheet)
+    Timesheet,
+    ChunkedUpload)
 
 from accounts.serializers import (
     UserSerializer,
 )
+from core.pricing import proposal_fees, reprice_fixed_proposals
+from core.upload_handlers import file_extension, size_limit_message
+from core.uploads import UPLOAD_TARGETS, chunk_count, received_chunks, target_queryset, upload_rule
+from core.services import (
+    apply_timesheet_status_change,
+    create_contract_for_proposal,
+    find_overlaps,
+    timesheet_hours_and_amount,
+)
 
 
 class ExpertiseSerializer(serializers.ModelSerializer):
@@ -307,6 +319,20 @@ class JobPostV2Serializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class MilestoneProgressSerializer(serializers.Serializer):
+    total_milestones = serializers.IntegerField()
+    completed_milestones = serializers.IntegerField()
+    funds_released = serializers.DecimalField(max_digits=14, decimal_places=2)
+    funds_pending = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class JobPostV2DetailSerializer(JobPostV2Serializer):
+    milestone_progress = MilestoneProgressSerializer(read_only=True)
+
+    class Meta(JobPostV2Serializer.Meta):
+        fields = JobPostV2Serializer.Meta.fields + ["milestone_progress"]
+
+
 class JobPostV2UpdateSerializer(JobPostV2Serializer):
     technologies = TechnologySlugSerializer(many=True, slug_field="name", read_only=True)
     timezone = TimezoneSlugSerializer(many=True, slug_field="name", read_only=True)
@@ -333,6 +359,12 @@ class MilestoneV2Serializer(serializers.ModelSerializer):
             raise ValidationError("Milestone cannot be added for Hourly Job Type.")
         return job_post
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            milestone = super().create(validated_data)
+            reprice_fixed_proposals(milestone.job_post, milestone.user)
+        return milestone
+
 
 class MilestoneV2UpdateClientSerializer(serializers.ModelSerializer):
     MILESTONE_STATUS = (
@@ -370,13 +402,14 @@ class MilestoneV2UpdateCoderSerializer(serializers.ModelSerializer):
 class ProposalV2Serializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(slug_field="username", read_only=True)
     job_post = serializers.SlugRelatedField(slug_field="id", queryset=JobPostV2.objects.all())
+    score = serializers.FloatField(read_only=True)
 
     class Meta:
         model = JobProposalV2
         fields = ["id", "user", "job_post", "proposal_description", "proposal_type", "hourly_rate",
                   "availability_per_week", "attachment_1", "attachment_2", "attachment_3", "coder_fee",
                   "platform_fee", "platform_fee_percentage", "total_project_cost", "is_submitted", "estimate_time",
-                  "status", "created", "updated"]
+                  "status", "score", "created", "updated"]
         read_only_fields = ["proposal_type", "coder_fee", "platform_fee", "platform_fee_percentage",
                             "total_project_cost", "is_submitted", "estimate_time", "status", "created", "updated"]
 
@@ -388,8 +421,19 @@ class ProposalV2Serializer(serializers.ModelSerializer):
             if validated_data['proposal_type'] == "FIXED":
                 validated_data['hourly_rate'] = None
                 validated_data['availability_per_week'] = None
+            validated_data.update(self.get_fees(job_post, validated_data['user'], validated_data))
         return super().create(validated_data)
 
+    @staticmethod
+    def get_fees(job_post, coder, data):
+        """
+        Coder fee, platform fee and total cost stored with the proposal so listings never recompute them
+        """
+        return proposal_fees(
+            job_post, coder, hourly_rate=data.get('hourly_rate'),
+            availability_per_week=data.get('availability_per_week')
+        ) or {}
+
     def validate(self, attrs):
         job_post = attrs.get("job_post", None)
         proposal_type = job_post.budget_type
@@ -426,6 +470,13 @@ class ProposalV2UpdateCoderSerializer(serializers.ModelSerializer):
                             "platform_fee_percentage", "total_project_cost", "estimate_time", "status", "created",
                             "updated"]
 
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if instance.status == "ACCEPTED_BY_CODER":
+                create_contract_for_proposal(instance)
+        return instance
+
 
 class ProposalV2UpdateClientSerializer(serializers.ModelSerializer):
     JOB_PROPOSAL_STATUS = (
@@ -459,6 +510,13 @@ class JobContractSerializer(serializers.ModelSerializer):
                   'feedback', 'total_amount_earned', 'total_hours_worked', 'hourly_rate', 'hirecoder_fee', 
                   'created', 'updated']
 
+
+class JobContractDetailSerializer(JobContractSerializer):
+    milestone_progress = MilestoneProgressSerializer(read_only=True)
+
+    class Meta(JobContractSerializer.Meta):
+        fields = JobContractSerializer.Meta.fields + ['milestone_progress']
+
 class TimesheetCoderSerializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(slug_field="username", read_only=True)
     job_contract = serializers.SlugRelatedField(slug_field="id", queryset=JobContract.objects.all())
@@ -467,7 +525,8 @@ class TimesheetCoderSerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         coder_id = self.context['request'].user
-        self.fields['job_contract'].queryset = JobContract.objects.filter(coder_id=coder_id)
+        self.fields['job_contract'].queryset = JobContract.objects.filter(
+            coder_id=coder_id).select_related('job_proposal__job_post__user')
 
     def validate(self, data):
         job_contract = data['job_contract']
@@ -484,13 +543,13 @@ class TimesheetCoderSerializer(serializers.ModelSerializer):
         if budget_type == "FIXED":
             raise ValidationError("Timesheet submission is only permitted for HOURLY budget jobs")
         elif budget_type == "HOURLY":
-            print("Start time")
-            print(data['date'])
-            start_hours = start_time.hour + start_time.minute/60
-            end_hours = end_time.hour + end_time.minute/60
-            total_hours = end_hours - start_hours
-            total_hours = round(total_hours, 2)
-            amount = total_hours * job_contract.hourly_rate
+            date = data.get('date', dt.date.today())
+            overlapping = Timesheet.objects.filter(
+                user=self.context['request'].user, date=date, start_time__lt=end_time, end_time__gt=start_time
+            ).exclude(timesheet_status="REJECTED")
+            if overlapping.exists():
+                raise ValidationError("Timesheet overlaps an existing entry on the same date")
+            total_hours, amount = timesheet_hours_and_amount(start_time, end_time, job_contract.hourly_rate)
             data['total_hours'] = total_hours
             data['amount'] = amount
 
@@ -508,6 +567,127 @@ class TimesheetCoderSerializer(serializers.ModelSerializer):
                             'created', 'updated', 'hirecoder_fee']   
         
 
+class TimesheetEntrySerializer(serializers.Serializer):
+    job_contract = serializers.UUIDField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    description = serializers.CharField(max_length=1000, required=False, allow_null=True, allow_blank=True)
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise ValidationError("End time must be after start time")
+        return data
+
+
+class TimesheetBulkCoderSerializer(serializers.Serializer):
+    """
+    Submits a week of timesheet entries, for one or more contracts, in one request
+    - All contracts are resolved with a single query
+    - Entries may not overlap each other or the coder's existing entries
+    """
+    entries = TimesheetEntrySerializer(many=True, allow_empty=False)
+
+    def validate_entries(self, entries):
+        user = self.context['request'].user
+        dates = [entry['date'] for entry in entries]
+        if (max(dates) - min(dates)).days > 6:
+            raise ValidationError("Entries must fall within a single week")
+
+        contract_ids = {entry['job_contract'] for entry in entries}
+        contracts = {
+            contract.id: contract
+            for contract in JobContract.objects.filter(coder_id=user, id__in=contract_ids).select_related(
+                'job_proposal__job_post')
+        }
+        errors = []
+        for index, entry in enumerate(entries):
+            contract = contracts.get(entry['job_contract'])
+            if contract is None:
+                errors.append(f"Entry {index}: job contract {entry['job_contract']} does not exist")
+            elif contract.job_proposal.job_post.budget_type != "HOURLY":
+                errors.append(f"Entry {index}: timesheet submission is only permitted for HOURLY budget jobs")
+            else:
+                entry['job_contract'] = contract
+        if errors:
+            raise ValidationError(errors)
+
+        existing = Timesheet.objects.filter(user=user, date__range=(min(dates), max(dates))).exclude(
+            timesheet_status="REJECTED").values_list('date', 'start_time', 'end_time', 'id')
+        intervals = [(entry['date'], entry['start_time'], entry['end_time'], index)
+                     for index, entry in enumerate(entries)]
+        intervals += [interval for interval in existing if interval[1] is not None and interval[2] is not None]
+        for first, second in find_overlaps(intervals):
+            if not isinstance(first, int) and not isinstance(second, int):
+                # two existing timesheets overlapping each other are not this submission's concern
+                continue
+            if isinstance(first, int) and isinstance(second, int):
+                errors.append(f"Entry {second} overlaps entry {first}")
+            else:
+                index, timesheet_id = (first, second) if isinstance(first, int) else (second, first)
+                errors.append(f"Entry {index} overlaps existing timesheet {timesheet_id}")
+        if errors:
+            raise ValidationError(errors)
+        return entries
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        timesheets = []
+        for entry in validated_data['entries']:
+            contract = entry['job_contract']
+            total_hours, amount = timesheet_hours_and_amount(
+                entry['start_time'], entry['end_time'], contract.hourly_rate)
+            timesheets.append(Timesheet(user=user, client_id=contract.client_id_id, total_hours=total_hours,
+                                        amount=amount, **entry))
+        return Timesheet.objects.bulk_create(timesheets)
+
+
+class TimesheetBulkStatusSerializer(serializers.Serializer):
+    TIMESHEET_STATUS = (
+        ("APPROVED", "Approved"),
+        ("REJECTED", "Rejected"),
+    )
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    timesheet_status = serializers.ChoiceField(choices=TIMESHEET_STATUS)
+
+
+class TimesheetSummaryQuerySerializer(serializers.Serializer):
+    GROUP_BY_CHOICES = (
+        ("week", "Week"),
+        ("month", "Month"),
+    )
+    group_by = serializers.ChoiceField(choices=GROUP_BY_CHOICES, default="week")
+    contract = serializers.UUIDField(required=False)
+
+
+class TimesheetExportQuerySerializer(serializers.Serializer):
+    FILE_FORMAT_CHOICES = (
+        ("csv", "CSV"),
+        ("xlsx", "XLSX"),
+    )
+    file_format = serializers.ChoiceField(choices=FILE_FORMAT_CHOICES, default="csv")
+
+
+class TimesheetSummarySerializer(serializers.Serializer):
+    contract = serializers.UUIDField()
+    contract_name = serializers.CharField()
+    period = serializers.CharField()
+    period_start = serializers.DateField()
+    total_hours = serializers.FloatField()
+    total_amount = serializers.FloatField()
+
+
+class ProposalSummarySerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    min_hourly_rate = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    median_hourly_rate = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    max_hourly_rate = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    min_total_project_cost = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    median_total_project_cost = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    max_total_project_cost = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    status_breakdown = serializers.DictField(child=serializers.IntegerField())
+
+
 class TimesheetClientSerializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(slug_field="username", read_only=True)
     job_contract = serializers.SlugRelatedField(slug_field="id", read_only=True)
@@ -517,11 +697,18 @@ class TimesheetClientSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         if len(validated_data)>1 or 'timesheet_status' not in validated_data:
             raise ValidationError("Client can only update the timesheet status")
-        else:
-            if instance.timesheet_status == "APPROVED":
+        with transaction.atomic():
+            # lock the row so two concurrent approvals cannot both add to the contract totals
+            previous_status, payment_status = Timesheet.objects.select_for_update().values_list(
+                "timesheet_status", "payment_status").get(pk=instance.pk)
+            # an approval can only be taken back by rejecting the timesheet, which reverses the contract totals
+            if previous_status == "APPROVED" and validated_data["timesheet_status"] not in ("APPROVED", "REJECTED"):
                 raise ValidationError("Not permitted to update status of approved timesheet")
-            else:
-                return super().update(instance, validated_data)
+            if previous_status == "APPROVED" and payment_status == "COMPLETED":
+                raise ValidationError("Not permitted to update status of paid timesheet")
+            instance = super().update(instance, validated_data)
+            apply_timesheet_status_change(instance, previous_status)
+        return instance
     
     class Meta:
         model = Timesheet
@@ -530,5 +717,40 @@ class TimesheetClientSerializer(serializers.ModelSerializer):
                   'created', 'updated']
         read_only_fields = ['user', 'job_contract','date','start_time', 'end_time', 
                             'description','total_hours', 'amount', 'payment_status', 
-                            'created', 'updated']  
+                            'created', 'updated']
+
 
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    target = serializers.ChoiceField(choices=list(UPLOAD_TARGETS))
+    chunk_count = serializers.SerializerMethodField()
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ["id", "target", "field", "object_id", "filename", "size", "chunk_size", "chunk_count",
+                  "received_chunks", "status", "file", "created"]
+        read_only_fields = ["chunk_size", "status", "file"]
+
+    def get_chunk_count(self, obj):
+        return chunk_count(obj)
+
+    def get_received_chunks(self, obj):
+        return received_chunks(obj) if obj.status == "UPLOADING" else []
+
+    def validate(self, attrs):
+        """
+        Reject the upload before any chunk is sent: unknown field, someone else's object, bad extension or size.
+        - Extensions and size limits are the field's UPLOAD_FIELD_RULES, e.g. 5 MB for resumes
+        """
+        _, fields = UPLOAD_TARGETS[attrs["target"]]
+        if attrs["field"] not in fields:
+            raise ValidationError({"field": f"Must be one of {', '.join(fields)}."})
+        user = self.context["request"].user
+        if not target_queryset(attrs["target"], user).filter(id=attrs["object_id"]).exists():
+            raise ValidationError({"object_id": "Not found."})
+        max_size, extensions = upload_rule(attrs["field"])
+        if extensions is not None and file_extension(attrs["filename"]) not in extensions:
+            raise ValidationError({"filename": f"Allowed extensions are: {', '.join(extensions)}."})
+        if not 0 < attrs["size"] <= max_size:
+            raise ValidationError({"size": size_limit_message(max_size)})
+        return attrs
@@ -0,0 +1,388 @@
+"""
+Services for Core Application
+"""
+import datetime
+import statistics
+
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Aggregate, Avg, Case, Count, DecimalField, F, FloatField, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from accounts.models import Skill
+from core.models import (
+    JOB_PROPOSAL_STATUS, JobContract, JobPostV2, JobProposalV2, MilestoneV2, Timesheet, TimesheetRollup
+)
+from mysite.settings import HIRECODER_FEE, PROPOSAL_SUMMARY_CACHE_TIMEOUT
+
+ROLLUP_TRUNCATES = {
+    "WEEK": TruncWeek,
+    "MONTH": TruncMonth,
+}
+
+PROPOSAL_SUMMARY_CACHE_KEY = "proposal-summary:{}"
+
+# share of each 0-1 component in the proposal score
+PROPOSAL_SCORE_WEIGHTS = {
+    "rate_fit": 0.4,
+    "skill_match": 0.4,
+    "coder_rating": 0.2,
+}
+
+
+class PercentileCont(Aggregate):
+    """
+    Postgres PERCENTILE_CONT ordered-set aggregate, interpolated percentile of a column
+    """
+    function = "PERCENTILE_CONT"
+    name = "PercentileCont"
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = DecimalField(max_digits=14, decimal_places=2)
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def create_contract_for_proposal(proposal):
+    """
+    Create the contract of a proposal accepted by the coder, or return the existing one.
+    - The proposal row is locked so concurrent accepts queue behind each other
+    - The (job_post, coder) unique constraint keeps retries to the one insert
+    - Contracts created before job_post was copied onto them are found through their proposal and get the copy
+    """
+    with transaction.atomic():
+        proposal = JobProposalV2.objects.select_for_update(of=("self",)).select_related(
+            "job_post__user", "user").get(pk=proposal.pk)
+        job_post = proposal.job_post
+        contract = JobContract.objects.filter(
+            Q(job_post=job_post) | Q(job_post__isnull=True, job_proposal__job_post=job_post),
+            coder_id=proposal.user,
+        ).first()
+        if contract is None:
+            contract = JobContract.objects.create(
+                job_post=job_post,
+                coder_id=proposal.user,
+                job_proposal=proposal,
+                client_id=job_post.user,
+                name=f"{str(job_post.user)}_{str(proposal.user)}_{str(job_post.title)}",
+                end_date=None,
+                hourly_rate=proposal.hourly_rate,
+                hirecoder_fee=HIRECODER_FEE,
+            )
+        elif contract.job_post_id is None:
+            contract.job_post = job_post
+            contract.save(update_fields=["job_post", "updated"])
+    return contract
+
+
+def adjust_contract_totals(contract_pk, hours, amount):
+    """
+    Add hours and amount to the running totals of a contract.
+    - Done with F() expressions so concurrent approvals never overwrite each other
+    - Pass negative values to take an earlier adjustment back out
+    """
+    JobContract.objects.filter(pk_id=contract_pk).update(
+        total_hours_worked=F("total_hours_worked") + hours,
+        total_amount_earned=F("total_amount_earned") + amount,
+    )
+
+
+def apply_timesheet_status_change(timesheet, previous_status):
+    """
+    Keep the contract totals in step with a timesheet status transition.
+    - Moving to APPROVED adds the timesheet hours and amount
+    - Moving away from APPROVED (rejection) reverses them
+    """
+    if previous_status == timesheet.timesheet_status:
+        return
+    if timesheet.timesheet_status == "APPROVED":
+        sign = 1
+    elif previous_status == "APPROVED":
+        sign = -1
+    else:
+        return
+    adjust_contract_totals(timesheet.job_contract_id, sign * timesheet.total_hours, sign * timesheet.amount)
+    refresh_timesheet_rollups(timesheet.job_contract_id, [timesheet.date])
+
+
+def timesheet_hours_and_amount(start_time, end_time, hourly_rate):
+    """
+    Hours between start and end time (2 decimals) and what they earn at the contract rate
+    """
+    start_hours = start_time.hour + start_time.minute/60
+    end_hours = end_time.hour + end_time.minute/60
+    total_hours = round(end_hours - start_hours, 2)
+    return total_hours, total_hours * hourly_rate
+
+
+def find_overlaps(intervals):
+    """
+    Sorted-interval sweep over (date, start_time, end_time, key) tuples.
+    - Returns (key, key) pairs for every interval starting before the furthest
+      reaching interval seen so far on the same date ends
+    """
+    overlaps = []
+    reach = None
+    for interval in sorted(intervals, key=lambda interval: interval[:3]):
+        date, start_time, end_time, key = interval
+        if reach and reach[0] == date and start_time < reach[2]:
+            overlaps.append((reach[3], key))
+        if not reach or reach[0] != date or end_time > reach[2]:
+            reach = interval
+    return overlaps
+
+
+def bulk_update_timesheet_status(timesheets, timesheet_status):
+    """
+    Move every matching timesheet that is not approved yet to timesheet_status with one UPDATE.
+    - Rows are locked first, contract totals and rollups follow in the same transaction
+    - Returns the ids of all matched timesheets and the number actually updated
+    """
+    with transaction.atomic():
+        rows = list(
+            timesheets.select_for_update(of=("self",)).values_list(
+                "pk_id", "id", "job_contract", "date", "total_hours", "amount", "timesheet_status")
+        )
+        pending = [row for row in rows if row[6] != "APPROVED"]
+        Timesheet.objects.filter(pk_id__in=[row[0] for row in pending]).update(
+            timesheet_status=timesheet_status, updated=timezone.now())
+        if timesheet_status == "APPROVED":
+            totals = defaultdict(lambda: [0.0, 0.0, set()])
+            for _, _, contract_pk, date, total_hours, amount, _ in pending:
+                totals[contract_pk][0] += total_hours
+                totals[contract_pk][1] += amount
+                totals[contract_pk][2].add(date)
+            for contract_pk, (hours, amount, dates) in totals.items():
+                adjust_contract_totals(contract_pk, hours, amount)
+                refresh_timesheet_rollups(contract_pk, dates)
+    return {row[1] for row in rows}, len(pending)
+
+
+def period_start(date, period):
+    """
+    First day of the week (Monday) or month containing date
+    """
+    if period == "WEEK":
+        return date - datetime.timedelta(days=date.weekday())
+    return date.replace(day=1)
+
+
+def next_period_start(start, period):
+    if period == "WEEK":
+        return start + datetime.timedelta(days=7)
+    return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def approved_timesheet_totals(condition, period):
+    """
+    Approved hours and amount grouped by contract and period, aggregated in the database
+    """
+    return (
+        Timesheet.objects.filter(condition, timesheet_status="APPROVED")
+        .annotate(period_start=ROLLUP_TRUNCATES[period]("date"))
+        .values("job_contract", "period_start")
+        .annotate(total_hours=Sum("total_hours"), total_amount=Sum("amount"))
+        .order_by()
+    )
+
+
+def materialize_timesheet_rollups(contract_pks, period, current_start):
+    """
+    Store the closed periods of each contract that are not rolled up yet.
+    - Only timesheets after the last stored period of a contract are scanned
+    """
+    last_rolled_up = dict(
+        TimesheetRollup.objects.filter(job_contract__in=contract_pks, period=period)
+        .values("job_contract").annotate(last=Max("period_start")).values_list("job_contract", "last")
+    )
+    condition = Q(job_contract__in=[pk for pk in contract_pks if pk not in last_rolled_up])
+    for contract_pk, last in last_rolled_up.items():
+        condition |= Q(job_contract=contract_pk, date__gte=next_period_start(last, period))
+    TimesheetRollup.objects.bulk_create(
+        [
+            TimesheetRollup(job_contract_id=row["job_contract"], period=period, period_start=row["period_start"],
+                            total_hours=row["total_hours"], total_amount=row["total_amount"])
+            for row in approved_timesheet_totals(condition & Q(date__lt=current_start), period)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def refresh_timesheet_rollups(contract_pk, dates):
+    """
+    Recompute stored rollups covering dates after approvals change inside a closed period.
+    - Periods not rolled up yet are left for the next summary request
+    """
+    today = timezone.localdate()
+    for period in ROLLUP_TRUNCATES:
+        current_start = period_start(today, period)
+        last = TimesheetRollup.objects.filter(job_contract_id=contract_pk, period=period).aggregate(
+            last=Max("period_start"))["last"]
+        for start in {period_start(date, period) for date in dates}:
+            if last is None or start > last or start >= current_start:
+                continue
+            totals = approved_timesheet_totals(
+                Q(job_contract_id=contract_pk, date__gte=start, date__lt=next_period_start(start, period)), period
+            )
+            totals = next(iter(totals), {"total_hours": 0.0, "total_amount": 0.0})
+            TimesheetRollup.objects.update_or_create(
+                job_contract_id=contract_pk, period=period, period_start=start,
+                defaults={"total_hours": totals["total_hours"], "total_amount": totals["total_amount"]},
+            )
+
+
+def timesheet_summary(contracts, period):
+    """
+    Approved hours and amount per contract and week/month, newest period first.
+    - Closed periods come from TimesheetRollup, only the open period reads raw timesheets
+    """
+    contracts = {contract.pk_id: contract for contract in contracts.only("pk_id", "id", "name")}
+    current_start = period_start(timezone.localdate(), period)
+    materialize_timesheet_rollups(list(contracts), period, current_start)
+
+    rows = list(
+        TimesheetRollup.objects.filter(job_contract__in=list(contracts), period=period)
+        .exclude(total_hours=0, total_amount=0)
+        .values("job_contract", "period_start", "total_hours", "total_amount")
+    )
+    rows += list(approved_timesheet_totals(Q(job_contract__in=list(contracts), date__gte=current_start), period))
+    rows.sort(key=lambda row: (row["period_start"], contracts[row["job_contract"]].name), reverse=True)
+    return [
+        {
+            "contract": contracts[row["job_contract"]].id,
+            "contract_name": contracts[row["job_contract"]].name,
+            "period": period,
+            "period_start": row["period_start"],
+            "total_hours": row["total_hours"],
+            "total_amount": row["total_amount"],
+        }
+        for row in rows
+    ]
+
+
+def proposal_summary(job_post):
+    """
+    Proposal count, hourly rate and total cost spread and status breakdown of a job.
+    - Computed with one aggregate query and cached until a proposal of the job changes
+    """
+    key = PROPOSAL_SUMMARY_CACHE_KEY.format(job_post.pk_id)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    proposals = JobProposalV2.objects.filter(job_post=job_post)
+    aggregates = {
+        "count": Count("pk_id"),
+        "min_hourly_rate": Min("hourly_rate"),
+        "max_hourly_rate": Max("hourly_rate"),
+        "min_total_project_cost": Min("total_project_cost"),
+        "max_total_project_cost": Max("total_project_cost"),
+        **{status: Count("pk_id", filter=Q(status=status)) for status, _ in JOB_PROPOSAL_STATUS},
+    }
+    if connection.vendor == "postgresql":
+        aggregates["median_hourly_rate"] = PercentileCont("hourly_rate", 0.5)
+        aggregates["median_total_project_cost"] = PercentileCont("total_project_cost", 0.5)
+    summary = proposals.aggregate(**aggregates)
+    if connection.vendor != "postgresql":
+        for field in ("hourly_rate", "total_project_cost"):
+            values = list(proposals.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True))
+            summary[f"median_{field}"] = statistics.median(values) if values else None
+    summary["status_breakdown"] = {status: summary.pop(status) for status, _ in JOB_PROPOSAL_STATUS}
+
+    cache.set(key, summary, PROPOSAL_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_proposal_summary(job_post_pk):
+    cache.delete(PROPOSAL_SUMMARY_CACHE_KEY.format(job_post_pk))
+
+
+def as_float(expression):
+    return Cast(expression, FloatField())
+
+
+def rank_proposals(proposals):
+    """
+    Annotate proposals with a 0-1 score, computed in the database for every candidate at once.
+    - rate_fit: 1 inside the job's hourly rate range or budget, scaled down above it
+    - skill_match: share of the job technologies the coder has as skills
+    - coder_rating: average rating of the coder's contracts out of 5, 3 when unrated
+    """
+    hourly_rate = as_float("hourly_rate")
+    minimum_rate = as_float("job_post__minimum_hourly_rate")
+    maximum_rate = as_float("job_post__maximum_hourly_rate")
+    total_cost = as_float("total_project_cost")
+    maximum_budget = as_float("job_post__maximum_budget")
+    rate_fit = Case(
+        When(job_post__budget_type="HOURLY", hourly_rate__isnull=True, then=Value(0.0)),
+        When(job_post__budget_type="HOURLY", hourly_rate__gt=F("job_post__maximum_hourly_rate"),
+             then=maximum_rate / hourly_rate),
+        When(job_post__budget_type="HOURLY", hourly_rate__lt=F("job_post__minimum_hourly_rate"),
+             then=hourly_rate / minimum_rate),
+        When(job_post__budget_type="FIXED", total_project_cost__gt=F("job_post__maximum_budget"),
+             then=maximum_budget / total_cost),
+        default=Value(1.0),
+        output_field=FloatField(),
+    )
+
+    matching_skills = (
+        Skill.objects.filter(user=OuterRef("user"), technology__jobpostv2=OuterRef("job_post"))
+        .values("user").annotate(total=Count("technology", distinct=True)).values("total")
+    )
+    job_technologies = (
+        JobPostV2.technologies.through.objects.filter(jobpostv2=OuterRef("job_post"))
+        .values("jobpostv2").annotate(total=Count("technology")).values("total")
+    )
+    skill_match = as_float(Coalesce(Subquery(matching_skills), 0)) / as_float(
+        Greatest(Coalesce(Subquery(job_technologies), 0), 1))
+
+    ratings = (
+        JobContract.objects.filter(coder_id=OuterRef("user"), rating__isnull=False)
+        .values("coder_id").annotate(average=Avg("rating")).values("average")
+    )
+    coder_rating = as_float(Coalesce(Subquery(ratings), Value(3.0), output_field=FloatField())) / 5
+
+    return proposals.annotate(rate_fit=rate_fit, skill_match=skill_match, coder_rating=coder_rating).annotate(
+        score=sum(F(component) * weight for component, weight in PROPOSAL_SCORE_WEIGHTS.items())
+    )
+
+
+def milestone_progress(milestones):
+    """
+    Milestone count, completed count and funds released/pending of milestones, in one aggregate query
+    """
+    progress = milestones.aggregate(
+        total_milestones=Count("pk_id"),
+        completed_milestones=Count("pk_id", filter=Q(milestone_status="COMPLETE")),
+        funds_released=Sum("fund_released", filter=Q(milestone_status="COMPLETE")),
+        funds_pending=Sum("fund_released", filter=~Q(milestone_status="COMPLETE")),
+    )
+    progress["funds_released"] = progress["funds_released"] or 0
+    progress["funds_pending"] = progress["funds_pending"] or 0
+    return progress
+
+
+def job_milestone_progress(job_post, user):
+    """
+    Milestone progress of a job, over the hired coders' milestones for the client or the coder's own
+    """
+    milestones = MilestoneV2.objects.filter(job_post=job_post)
+    if user.role == "CODER":
+        milestones = milestones.filter(user=user)
+    else:
+        # contracts created before job_post was copied onto them only reach the job through their proposal
+        contracts = JobContract.objects.filter(
+            Q(job_post=job_post) | Q(job_post__isnull=True, job_proposal__job_post=job_post)
+        )
+        milestones = milestones.filter(user__in=contracts.values("coder_id"))
+    return milestone_progress(milestones)
+
+
+def contract_milestone_progress(contract):
+    job_post_id = contract.job_post_id or contract.job_proposal.job_post_id
+    return milestone_progress(MilestoneV2.objects.filter(job_post=job_post_id, user=contract.coder_id_id))
@@ -2,12 +2,7 @@ from django.test import TestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
 from accounts.models import User
-from accounts.models import DigitalPresence, Address, Skill, CoderSkillsExperience  
-from core.views import CoderViewSet
-from core.serializers import CoderSerializer
-from rest_framework.authtoken.models import Token
-from rest_framework.permissions import IsAuthenticated
-from accounts.permissions import IsClient  
+from accounts.models import Skill
 from django.urls import reverse
 
 class CoderAPIClientAccessTestCase(APITestCase):
@@ -16,7 +11,7 @@ class CoderAPIClientAccessTestCase(APITestCase):
         self.client.force_authenticate(user=self.client_user)
 
     def test_client_has_access(self):
-        url = reverse("coders-list")
+        url = reverse("coder-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -26,7 +21,7 @@ class CoderAPICoderAccessRestrictedTestCase(APITestCase):
         self.client.force_authenticate(user=self.coder_user)
 
     def test_coder_no_access(self):
-        url = reverse("coders-list")
+        url = reverse("coder-list")
         response = self.client.get(url)  
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 """
@@ -35,8 +30,30 @@ Test Module
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.reverse import reverse
 from rest_framework import status
-from .models import TimeZone
-from accounts.models import User
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from accounts.models import EducationalQualification
+import json
+import datetime
+from decimal import Decimal
+import uuid
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from asgiref.sync import async_to_sync
+import tempfile
+from unittest import mock, skipUnless
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from django.core.management import call_command
+from .models import JobPostV2, JobProposalV2, JobContract, MilestoneV2, Timesheet, TimesheetRollup
+from .models import ChunkedUpload, JobInvitation, JobPost, QueryFingerprint
+from .utils import ALLOWED_FILE_EXTENSIONS
+from .parsers import ValidatingMultiPartParser
+from .upload_handlers import UPLOAD_FIELD_RULES, ValidatingUploadHandler, matches_signature
+from .uploads import finalize_upload
+from .query_profiler import QueryStat, fingerprint, normalize, query_stats
+from accounts.models import Skill, Technology, User
 
 
 class CreateTimzone(APITestCase):
@@ -71,3 +88,843 @@ class CreateTimzone(APITestCase):
         }
         response = self.client.post(self.url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TimesheetContractTestCase(APITestCase):
+    """
+    Base class building a client, a coder and an hourly contract between them
+    """
+
+    def setUp(self) -> None:
+        self.client_user = User.objects.create_user(
+            username="client", email="client@example.com", password="test@12345", role="CLIENT",
+            is_email_verified=True
+        )
+        self.coder_user = User.objects.create_user(
+            username="coder", email="coder@example.com", password="test@12345", role="CODER",
+            is_email_verified=True
+        )
+        self.job_post = JobPostV2.objects.create(
+            user=self.client_user, title="Hourly job", project_size="SMALL", budget_type="HOURLY",
+            duration="SHORT_TERM", preferred_coder_residence="USA_ONLY", minimum_hourly_rate=10,
+            maximum_hourly_rate=60
+        )
+        self.proposal = JobProposalV2.objects.create(
+            user=self.coder_user, job_post=self.job_post, proposal_type="HOURLY", hourly_rate=50,
+            availability_per_week=20
+        )
+        self.contract = JobContract.objects.create(
+            job_proposal=self.proposal, job_post=self.job_post, client_id=self.client_user,
+            coder_id=self.coder_user, name="contract", hourly_rate=50
+        )
+        self.client = APIClient()
+
+    def create_timesheet(self, hours=2, **kwargs):
+        return Timesheet.objects.create(
+            user=self.coder_user, job_contract=self.contract, start_time=datetime.time(9, 0),
+            end_time=datetime.time(9 + hours, 0), total_hours=hours, amount=hours * 50, **kwargs
+        )
+
+
+class TimesheetApprovalTotalsTestCase(TimesheetContractTestCase):
+    """
+    Test contract totals follow timesheet approvals
+    """
+
+    def update_status(self, timesheet, timesheet_status):
+        self.client.force_authenticate(user=self.client_user)
+        url = reverse("timesheet-detail", kwargs={"id": timesheet.id})
+        return self.client.put(url, {"timesheet_status": timesheet_status}, format="json")
+
+    def test_approval_adds_to_contract_totals(self):
+        response = self.update_status(self.create_timesheet(hours=2), "APPROVED")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.update_status(self.create_timesheet(hours=3), "APPROVED")
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.total_hours_worked, 5)
+        self.assertEqual(self.contract.total_amount_earned, 250)
+
+    def test_rejection_leaves_contract_totals(self):
+        self.update_status(self.create_timesheet(hours=2), "REJECTED")
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.total_hours_worked, 0)
+
+    def test_approved_timesheet_is_counted_once(self):
+        timesheet = self.create_timesheet(hours=2)
+        self.update_status(timesheet, "APPROVED")
+        self.update_status(timesheet, "APPROVED")
+        response = self.update_status(timesheet, "PENDING")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.total_hours_worked, 2)
+
+    def test_rejecting_approved_timesheet_reverses_totals(self):
+        timesheet = self.create_timesheet(hours=2)
+        self.update_status(timesheet, "APPROVED")
+        self.update_status(self.create_timesheet(hours=3), "APPROVED")
+        response = self.update_status(timesheet, "REJECTED")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.contract.refresh_from_db()
+        self.assertEqual((self.contract.total_hours_worked, self.contract.total_amount_earned), (3, 150))
+
+    def test_paid_timesheet_cannot_be_rejected(self):
+        timesheet = self.create_timesheet(hours=2)
+        self.update_status(timesheet, "APPROVED")
+        Timesheet.objects.filter(pk=timesheet.pk).update(payment_status="COMPLETED")
+        self.assertEqual(self.update_status(timesheet, "REJECTED").status_code, status.HTTP_400_BAD_REQUEST)
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.total_hours_worked, 2)
+
+    def test_reconcile_command_fixes_drift(self):
+        self.create_timesheet(hours=4, timesheet_status="APPROVED")
+        out = StringIO()
+        call_command("reconcile_contract_totals", "--workers", "1", stdout=out)
+        self.assertIn("1 drifted", out.getvalue())
+        call_command("reconcile_contract_totals", "--workers", "1", "--fix", stdout=StringIO())
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.total_hours_worked, 4)
+        self.assertEqual(self.contract.total_amount_earned, 200)
+
+
+class TimesheetBulkSubmissionTestCase(TimesheetContractTestCase):
+    """
+    Test bulk weekly submission and overlap detection
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.force_authenticate(user=self.coder_user)
+        self.url = reverse("timesheet-bulk")
+
+    def entry(self, date, start, end):
+        return {"job_contract": str(self.contract.id), "date": date, "start_time": start, "end_time": end}
+
+    def test_bulk_submission_creates_all_entries(self):
+        entries = [self.entry("2024-01-01", "09:00", "12:00"), self.entry("2024-01-01", "13:00", "17:30"),
+                   self.entry("2024-01-02", "09:00", "10:00")]
+        response = self.client.post(self.url, {"entries": entries}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(Timesheet.objects.filter(job_contract=self.contract).count(), 3)
+        self.assertEqual(response.data[1]["total_hours"], 4.5)
+        self.assertEqual(response.data[1]["amount"], 225)
+
+    def test_overlapping_entries_are_rejected(self):
+        entries = [self.entry("2024-01-01", "09:00", "12:00"), self.entry("2024-01-01", "11:00", "13:00")]
+        response = self.client.post(self.url, {"entries": entries}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Timesheet.objects.exists())
+
+    def test_overlap_with_existing_entry_is_rejected(self):
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 1))
+        entries = [self.entry("2024-01-01", "10:00", "12:00"), self.entry("2024-01-02", "09:00", "10:00")]
+        response = self.client.post(self.url, {"entries": entries}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Timesheet.objects.count(), 1)
+
+    def test_overlapping_existing_entries_do_not_block_submission(self):
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 1))
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 1))
+        entries = [self.entry("2024-01-01", "14:00", "15:00"), self.entry("2024-01-02", "09:00", "10:00")]
+        response = self.client.post(self.url, {"entries": entries}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Timesheet.objects.count(), 4)
+
+    def test_single_entry_overlap_is_rejected(self):
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 1))
+        data = self.entry("2024-01-01", "10:00", "12:00")
+        response = self.client.post(reverse("timesheet-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TimesheetSummaryTestCase(TimesheetContractTestCase):
+    """
+    Test the weekly/monthly timesheet summary and its rollups
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.today = datetime.date.today()
+        self.last_week = self.today - datetime.timedelta(days=7)
+        self.create_timesheet(hours=2, date=self.last_week, timesheet_status="APPROVED")
+        self.create_timesheet(hours=3, date=self.last_week, timesheet_status="APPROVED")
+        self.create_timesheet(hours=1, date=self.last_week)
+        self.create_timesheet(hours=4, date=self.today, timesheet_status="APPROVED")
+        self.url = reverse("timesheet-summary")
+
+    def test_weekly_summary(self):
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.get(self.url, {"group_by": "week"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["total_hours"] for row in response.data], [4, 5])
+        self.assertEqual(response.data[1]["total_amount"], 250)
+        self.assertEqual(TimesheetRollup.objects.filter(period="WEEK").count(), 1)
+
+    def test_approval_in_closed_period_refreshes_rollup(self):
+        self.client.force_authenticate(user=self.coder_user)
+        self.client.get(self.url, {"group_by": "week", "contract": str(self.contract.id)})
+        self.client.force_authenticate(user=self.client_user)
+        pending = Timesheet.objects.get(timesheet_status="PENDING")
+        self.client.put(reverse("timesheet-detail", kwargs={"id": pending.id}), {"timesheet_status": "APPROVED"},
+                        format="json")
+        rollup = TimesheetRollup.objects.get(period="WEEK")
+        self.assertEqual(rollup.total_hours, 6)
+
+
+class TimesheetExportTestCase(TimesheetContractTestCase):
+    """
+    Test streaming CSV/XLSX timesheet exports
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 1), timesheet_status="APPROVED")
+        self.create_timesheet(hours=3, date=datetime.date(2024, 1, 2))
+        self.client.force_authenticate(user=self.client_user)
+
+    def test_csv_export_honors_filters(self):
+        response = self.client.get(reverse("timesheet-export"), {"timesheet_status": "APPROVED"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,date,job_contract"))
+        self.assertIn("2024-01-01", lines[1])
+
+    def test_contract_xlsx_export(self):
+        url = reverse("contract-export", kwargs={"id": self.contract.id})
+        response = self.client.get(url, {"file_format": "xlsx", "date__gte": "2024-01-02"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(str(self.contract.id), response["Content-Disposition"])
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"PK"))
+
+
+class TimesheetClientDenormalizationTestCase(TimesheetContractTestCase):
+    """
+    Test Timesheet.client is kept from the contract and backfilled
+    """
+
+    def test_client_is_copied_from_contract(self):
+        timesheet = self.create_timesheet(hours=2)
+        self.assertEqual(timesheet.client, self.client_user)
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.get(reverse("timesheet-list"))
+        self.assertEqual(response.data["count"], 1)
+
+    def test_client_sees_rows_not_yet_backfilled(self):
+        timesheet = self.create_timesheet(hours=2)
+        Timesheet.objects.update(client=None)
+        self.client.force_authenticate(user=self.client_user)
+        self.assertEqual(self.client.get(reverse("timesheet-list")).data["count"], 1)
+        response = self.client.put(reverse("timesheet-detail", kwargs={"id": timesheet.id}),
+                                   {"timesheet_status": "APPROVED"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        other = User.objects.create_user(username="other", password="test@12345", role="CLIENT",
+                                         is_email_verified=True)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(reverse("timesheet-list")).data["count"], 0)
+
+    def test_backfill_command(self):
+        self.create_timesheet(hours=2)
+        self.create_timesheet(hours=3)
+        Timesheet.objects.update(client=None)
+        call_command("backfill_timesheet_client", "--batch-size", "1", stdout=StringIO())
+        self.assertFalse(Timesheet.objects.filter(client__isnull=True).exists())
+        self.assertEqual(Timesheet.objects.filter(client=self.client_user).count(), 2)
+
+
+class TimesheetBulkStatusTestCase(TimesheetContractTestCase):
+    """
+    Test clients approving/rejecting timesheets in bulk
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.force_authenticate(user=self.client_user)
+        self.url = reverse("timesheet-bulk-status")
+
+    def test_bulk_approve_skips_approved_and_updates_totals(self):
+        approved = self.create_timesheet(hours=1, timesheet_status="APPROVED")
+        timesheets = [self.create_timesheet(hours=2), self.create_timesheet(hours=3), approved]
+        data = {"ids": [str(timesheet.id) for timesheet in timesheets], "timesheet_status": "APPROVED"}
+        response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"updated": 2, "skipped": 1})
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.total_hours_worked, 5)
+        self.assertEqual(Timesheet.objects.filter(timesheet_status="APPROVED").count(), 3)
+
+    def test_bulk_reject_by_filter(self):
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 1))
+        self.create_timesheet(hours=2, date=datetime.date(2024, 1, 2))
+        response = self.client.put(self.url + "?date=2024-01-01", {"timesheet_status": "REJECTED"}, format="json")
+        self.assertEqual(response.data, {"updated": 1, "skipped": 0})
+        self.assertEqual(Timesheet.objects.get(timesheet_status="REJECTED").date, datetime.date(2024, 1, 1))
+
+    def test_foreign_timesheet_rolls_back(self):
+        timesheet = self.create_timesheet(hours=2)
+        data = {"ids": [str(timesheet.id), str(uuid.uuid4())], "timesheet_status": "APPROVED"}
+        response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        timesheet.refresh_from_db()
+        self.assertEqual(timesheet.timesheet_status, "PENDING")
+
+
+class ProposalAcceptContractTestCase(TimesheetContractTestCase):
+    """
+    Test the contract is created once when the coder accepts a proposal
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.force_authenticate(user=self.coder_user)
+        self.contract.delete()
+        self.url = reverse("proposal-v2-detail", kwargs={"id": self.proposal.id})
+
+    def test_accept_creates_contract_once(self):
+        response = self.client.put(self.url, {"status": "ACCEPTED_BY_CODER"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.put(self.url, {"status": "ACCEPTED_BY_CODER"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        contract = JobContract.objects.get()
+        self.assertEqual(contract.job_post, self.job_post)
+        self.assertEqual(contract.client_id, self.client_user)
+        self.assertEqual(contract.hourly_rate, 50)
+
+    def test_accept_finds_contract_without_job_post_copy(self):
+        JobContract.objects.create(
+            job_proposal=self.proposal, client_id=self.client_user, coder_id=self.coder_user, name="contract"
+        )
+        response = self.client.put(self.url, {"status": "ACCEPTED_BY_CODER"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(JobContract.objects.get().job_post, self.job_post)
+
+    def test_backfill_contract_job_post(self):
+        JobContract.objects.create(
+            job_proposal=self.proposal, client_id=self.client_user, coder_id=self.coder_user, name="contract"
+        )
+        call_command("backfill_contract_job_post", stdout=StringIO())
+        self.assertEqual(JobContract.objects.get().job_post, self.job_post)
+
+
+class ProposalFeesTestCase(TimesheetContractTestCase):
+    """
+    Test proposal fees are priced on create and stored for listings
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.force_authenticate(user=self.coder_user)
+        self.proposal.delete()
+
+    def assert_fees(self, proposal, coder_fee, platform_fee, total_project_cost):
+        self.assertEqual(proposal.coder_fee, Decimal(coder_fee))
+        self.assertEqual(proposal.platform_fee, Decimal(platform_fee))
+        self.assertEqual(proposal.platform_fee_percentage, Decimal("5.00"))
+        self.assertEqual(proposal.total_project_cost, Decimal(total_project_cost))
+
+    def test_hourly_proposal_fees(self):
+        response = self.client.post(reverse("proposal-v2-list"), {
+            "job_post": str(self.job_post.id), "hourly_rate": "50.00", "availability_per_week": 20
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["total_project_cost"], "4200.00")
+        self.assert_fees(JobProposalV2.objects.get(), "4000.00", "200.00", "4200.00")
+
+    def test_fixed_proposal_fees_follow_milestones(self):
+        self.job_post.budget_type = "FIXED"
+        self.job_post.save()
+        MilestoneV2.objects.create(user=self.coder_user, job_post=self.job_post, name="first", description="first",
+                                   time=5, fund_released=1000)
+        response = self.client.post(reverse("proposal-v2-list"), {"job_post": str(self.job_post.id)}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assert_fees(JobProposalV2.objects.get(), "1000.00", "50.00", "1050.00")
+
+        response = self.client.post(reverse("milestone-v2-list"), {
+            "job_post": str(self.job_post.id), "name": "second", "description": "second", "time": 2,
+            "fund_released": "500.00"
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assert_fees(JobProposalV2.objects.get(), "1500.00", "75.00", "1575.00")
+
+    def test_backfill_proposal_fees(self):
+        JobProposalV2.objects.create(user=self.coder_user, job_post=self.job_post, proposal_type="HOURLY",
+                                     hourly_rate=50, availability_per_week=20)
+        call_command("backfill_proposal_fees", "--batch-size", "1", stdout=StringIO())
+        self.assert_fees(JobProposalV2.objects.get(), "4000.00", "200.00", "4200.00")
+
+
+class ProposalSummaryTestCase(TimesheetContractTestCase):
+    """
+    Test the per-job proposal comparison summary
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.proposal.status = "REJECTED_BY_CLIENT"
+        self.proposal.save()
+        for index, hourly_rate in enumerate([20, 30]):
+            coder = User.objects.create_user(
+                username=f"coder{index}", email=f"coder{index}@example.com", password="test@12345", role="CODER",
+                is_email_verified=True
+            )
+            JobProposalV2.objects.create(user=coder, job_post=self.job_post, proposal_type="HOURLY",
+                                         hourly_rate=hourly_rate, availability_per_week=10)
+        self.url = reverse("job-posts-v2-proposals-summary", kwargs={"id": self.job_post.id})
+
+    def test_summary(self):
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(response.data["min_hourly_rate"], "20.00")
+        self.assertEqual(response.data["median_hourly_rate"], "30.00")
+        self.assertEqual(response.data["max_hourly_rate"], "50.00")
+        self.assertEqual(response.data["status_breakdown"]["SENT"], 2)
+        self.assertEqual(response.data["status_breakdown"]["REJECTED_BY_CLIENT"], 1)
+
+    def test_summary_cached_until_proposal_changes(self):
+        self.client.force_authenticate(user=self.client_user)
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        self.proposal.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["median_hourly_rate"], "25.00")
+
+    def test_coder_cannot_view_summary(self):
+        self.client.force_authenticate(user=self.coder_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ProposalRankingTestCase(TimesheetContractTestCase):
+    """
+    Test proposals are ranked by rate fit, skill match and coder rating with ?ordering=score
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        python = Technology.objects.create(user=self.client_user, name="python")
+        django = Technology.objects.create(user=self.client_user, name="django")
+        self.job_post.technologies.set([python, django])
+        self.contract.rating = 5
+        self.contract.save()
+        Skill.objects.create(user=self.coder_user, technology=python, years_of_experience=3)
+
+        self.expert = User.objects.create_user(
+            username="expert", email="expert@example.com", password="test@12345", role="CODER",
+            is_email_verified=True
+        )
+        Skill.objects.create(user=self.expert, technology=python, years_of_experience=8)
+        Skill.objects.create(user=self.expert, technology=django, years_of_experience=8)
+        self.expensive = JobProposalV2.objects.create(user=self.expert, job_post=self.job_post,
+                                                      proposal_type="HOURLY", hourly_rate=120, availability_per_week=10)
+        self.newcomer = User.objects.create_user(
+            username="newcomer", email="newcomer@example.com", password="test@12345", role="CODER",
+            is_email_verified=True
+        )
+        self.unskilled = JobProposalV2.objects.create(user=self.newcomer, job_post=self.job_post,
+                                                      proposal_type="HOURLY", hourly_rate=40, availability_per_week=10)
+        self.client.force_authenticate(user=self.client_user)
+
+    def test_ordering_by_score(self):
+        response = self.client.get(reverse("proposal-v2-list"), {"ordering": "score"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result["id"] for result in results],
+                         [str(self.proposal.id), str(self.expensive.id), str(self.unskilled.id)])
+        self.assertAlmostEqual(results[0]["score"], 0.8)
+        self.assertAlmostEqual(results[1]["score"], 0.72)
+        self.assertAlmostEqual(results[2]["score"], 0.52)
+
+    def test_default_listing_has_no_score(self):
+        response = self.client.get(reverse("proposal-v2-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("score", response.data["results"][0])
+
+
+class MilestoneProgressTestCase(TimesheetContractTestCase):
+    """
+    Test milestone progress on job post and contract detail
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.job_post.budget_type = "FIXED"
+        self.job_post.save()
+        for name, fund_released, milestone_status in [("design", 300, "COMPLETE"), ("build", 700, "ACTIVE"),
+                                                      ("ship", 200, "PROPOSED")]:
+            MilestoneV2.objects.create(user=self.coder_user, job_post=self.job_post, name=name, description=name,
+                                       time=1, fund_released=fund_released, milestone_status=milestone_status)
+        other_coder = User.objects.create_user(
+            username="other", email="other@example.com", password="test@12345", role="CODER", is_email_verified=True
+        )
+        MilestoneV2.objects.create(user=other_coder, job_post=self.job_post, name="other", description="other",
+                                   time=1, fund_released=5000)
+
+    def assert_progress(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["milestone_progress"], {
+            "total_milestones": 3, "completed_milestones": 1, "funds_released": "300.00", "funds_pending": "900.00"
+        })
+
+    def test_job_post_detail_counts_hired_coders(self):
+        self.client.force_authenticate(user=self.client_user)
+        self.assert_progress(self.client.get(reverse("job-posts-v2-detail", kwargs={"id": self.job_post.id})))
+
+    def test_contract_detail(self):
+        self.client.force_authenticate(user=self.coder_user)
+        self.assert_progress(self.client.get(reverse("contract-detail", kwargs={"id": self.contract.id})))
+
+    def test_contract_without_job_post_copy(self):
+        JobContract.objects.filter(pk=self.contract.pk).update(job_post=None)
+        self.client.force_authenticate(user=self.coder_user)
+        self.assert_progress(self.client.get(reverse("contract-detail", kwargs={"id": self.contract.id})))
+        self.client.force_authenticate(user=self.client_user)
+        self.assert_progress(self.client.get(reverse("job-posts-v2-detail", kwargs={"id": self.job_post.id})))
+
+
+class EndpointBenchmarkTestCase(APITestCase):
+    """
+    Test the benchmark runner measures seeded endpoints
+    """
+
+    def test_benchmark_proposal_endpoints(self):
+        from benchmarks import runner, seed
+
+        users = seed.seed({"clients": 1, "coders": 3, "jobs_per_client": 2, "proposals_per_job": 2,
+                           "timesheets_per_contract": 2})
+        results = runner.run({"CLIENT": users["CLIENT"]}, iterations=2, warmup=0, only="proposal-v2")
+        measured = {result["endpoint"]: result for result in results}
+        self.assertEqual(set(measured), {"api/v2/proposal-v2-list", "api/v2/proposal-v2-detail"})
+        self.assertEqual(measured["api/v2/proposal-v2-list"]["status"], status.HTTP_200_OK)
+        self.assertGreater(measured["api/v2/proposal-v2-list"]["queries"], 0)
+        self.assertGreater(measured["api/v2/proposal-v2-list"]["peak_memory_kb"], 0)
+
+
+class LoadTestHarnessTestCase(TransactionTestCase):
+    """
+    Test the persona scenarios run cleanly against the seeded dataset.
+    - The ASGI handler runs every request on a thread of its own, so the seeded rows have to be committed
+    """
+
+    def test_personas_run_without_errors(self):
+        try:
+            import httpx
+        except ImportError:
+            self.skipTest("httpx is only installed for the load tests")
+        from django.core.asgi import get_asgi_application
+        from benchmarks import load, seed
+
+        seed.seed({"clients": 1, "coders": 2, "jobs_per_client": 2, "proposals_per_job": 2,
+                   "timesheets_per_contract": 2})
+        accounts = seed.persona_accounts()
+        timesheets = Timesheet.objects.count()
+        # request threads close their connections when the response is done, not when the test database goes
+        with mock.patch.dict(connections.settings["default"], {"CONN_MAX_AGE": 0}):
+            stages = async_to_sync(load.run)("http://testserver", accounts, [(2, 1.0)],
+                                             {"client": 0.5, "coder": 0.5},
+                                             transport=httpx.ASGITransport(app=get_asgi_application()))
+
+        stage = stages[0]
+        self.assertEqual(set(stage["scenarios"]), {"client", "coder"})
+        self.assertEqual(stage["error_rate"], 0, stage["statuses"])
+        self.assertIn("coder/timesheet submission", stage["steps"])
+        self.assertGreater(Timesheet.objects.count(), timesheets)
+
+
+class RequestProfilingMiddlewareTestCase(TimesheetContractTestCase):
+    """
+    Test per request query count and timings are reported when profiling is enabled
+    """
+
+    def test_disabled_by_default(self):
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.get(reverse("proposal-v2-list"))
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(REQUEST_PROFILING=True, QUERY_BUDGETS={"proposal-v2-list": 1})
+    def test_server_timing_and_budget(self):
+        self.client.force_authenticate(user=self.client_user)
+        with self.assertLogs("core.profiling", "WARNING") as logs:
+            response = self.client.get(reverse("proposal-v2-list"))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="2 queries", serializer;dur=[\d.]+, '
+                                                     r'view;dur=[\d.]+, total;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "proposal-v2-list")
+        self.assertEqual(record["queries"], 2)
+        self.assertTrue(record["over_budget"])
+
+
+class QueryFingerprintTestCase(APITestCase):
+    """
+    Test SQL is normalized into fingerprints, kept when a flush fails and logged when slow
+    """
+
+    def setUp(self) -> None:
+        self.client_user = User.objects.create_user(username="client", password="test@12345", role="CLIENT",
+                                                    is_email_verified=True)
+        query_stats.take()
+        self.addCleanup(query_stats.take)
+
+    def test_normalize(self):
+        first = 'SELECT "a" FROM "t" WHERE "t"."id" IN (%s, %s, %s) AND "t"."name" = \'x\' LIMIT 21'
+        second = 'SELECT "a" FROM "t" WHERE "t"."id" IN (%s) AND "t"."name" = \'it\'\'s\' LIMIT 5'
+        self.assertEqual(normalize(first), 'SELECT "a" FROM "t" WHERE "t"."id" IN (...) AND "t"."name" = ? LIMIT ?')
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertEqual(normalize('INSERT INTO "t2" VALUES (%s, %s), (%s, %s)'), 'INSERT INTO "t2" VALUES (...)')
+
+    def test_failed_flush_keeps_stats(self):
+        first, second = QueryStat("SELECT ?"), QueryStat("SELECT ?")
+        first.add(2.0)
+        first.requests = 1
+        second.add(5.0)
+        second.requests = 1
+        query_stats.stats = {("view", "key"): first}
+        with mock.patch.object(QueryFingerprint.objects, "get_or_create", side_effect=OperationalError("locked")):
+            with self.assertRaises(OperationalError):
+                query_stats.flush()
+        query_stats.stats[("view", "key")].merge(second)
+        self.assertEqual(query_stats.flush(), 1)
+        row = QueryFingerprint.objects.get(view="view", fingerprint="key")
+        self.assertEqual((row.calls, row.requests, row.total_time, row.max_time), (2, 2, 7.0, 5.0))
+
+    @override_settings(QUERY_FINGERPRINTING=True, SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        self.client.force_authenticate(user=self.client_user)
+        with self.assertLogs("core.profiling", "WARNING") as logs:
+            self.client.get(reverse("proposal-v2-list"))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "proposal-v2-list")
+        self.assertNotIn("%s", record["sql"])
+
+
+class ChunkedUploadTestCase(TimesheetContractTestCase):
+    """
+    Test a file sent in chunks, in any order and with retries, ends up in the target field
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(MEDIA_ROOT=directory.name, CHUNKED_UPLOAD_DIR=f"{directory.name}/chunks",
+                                      CHUNKED_UPLOAD_CHUNK_SIZE=4)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client.force_authenticate(user=self.client_user)
+
+    def start(self, **data):
+        data = {"target": "job-post", "field": "attachment_1", "object_id": self.job_post.id,
+                "filename": "brief.txt", "size": 10, **data}
+        return self.client.post(reverse("uploads-list"), data, format="json")
+
+    def put_chunk(self, upload_id, index, content):
+        return self.client.put(reverse("uploads-chunk", kwargs={"id": upload_id, "index": index}), content,
+                               content_type="application/octet-stream")
+
+    def test_upload_resume_and_finalize(self):
+        response = self.start()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.data["id"]
+        self.assertEqual(response.data["chunk_count"], 3)
+
+        self.assertEqual(self.put_chunk(upload_id, 2, b"89").status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.put_chunk(upload_id, 0, b"01234").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.put_chunk(upload_id, 0, b"0123").status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.post(reverse("uploads-finalize", kwargs={"id": upload_id}))
+        self.assertEqual(response.data["missing_chunks"], ["1"])
+
+        detail = self.client.get(reverse("uploads-detail", kwargs={"id": upload_id}))
+        self.assertEqual(detail.data["received_chunks"], [0, 2])
+        self.put_chunk(upload_id, 1, b"4567")
+        response = self.client.post(reverse("uploads-finalize", kwargs={"id": upload_id}))
+        self.assertEqual(response.data["status"], "COMPLETE")
+
+        self.job_post.refresh_from_db()
+        self.assertEqual(self.job_post.attachment_1.name, response.data["file"])
+        with self.job_post.attachment_1.open("rb") as attachment:
+            self.assertEqual(attachment.read(), b"0123456789")
+        self.assertEqual(self.put_chunk(upload_id, 0, b"0123").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_rechecks_status(self):
+        upload_id = self.start(size=4).data["id"]
+        self.put_chunk(upload_id, 0, b"0123")
+        stale = ChunkedUpload.objects.get(id=upload_id)
+        self.assertEqual(self.client.post(reverse("uploads-finalize", kwargs={"id": upload_id})).data["status"],
+                         "COMPLETE")
+        with self.assertRaisesMessage(ValidationError, "Upload is already complete."):
+            finalize_upload(stale)
+
+    def test_resume_limits(self):
+        education = EducationalQualification.objects.create(user=self.client_user)
+        response = self.start(target="resume", field="resume", object_id=education.id, filename="cv.pdf",
+                              size=6 * 1024 * 1024)
+        self.assertEqual(response.data["size"], ["File size must be no more than 5 MB."])
+        response = self.start(target="resume", field="resume", object_id=education.id, filename="cv.zip")
+        self.assertIn("filename", response.data)
+
+    def test_finalize_checks_assembled_size(self):
+        upload_id = self.start().data["id"]
+        for index, content in enumerate([b"0123", b"4567", b"89"]):
+            self.put_chunk(upload_id, index, content)
+        with mock.patch.dict(UPLOAD_FIELD_RULES, {"attachment_1": (8, ALLOWED_FILE_EXTENSIONS)}):
+            response = self.client.post(reverse("uploads-finalize", kwargs={"id": upload_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("size", response.data)
+        self.job_post.refresh_from_db()
+        self.assertFalse(self.job_post.attachment_1)
+
+    def test_rejected_before_upload(self):
+        self.assertIn("filename", self.start(filename="run.exe").data)
+        self.assertIn("size", self.start(size=101 * 1024 * 1024).data)
+        self.assertIn("field", self.start(field="title").data)
+        self.client.force_authenticate(user=self.coder_user)
+        self.assertIn("object_id", self.start().data)
+
+
+class StreamingUploadValidationTestCase(TimesheetContractTestCase):
+    """
+    Test uploads are rejected while streaming on extension, signature and size, with a 400 naming the field
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(MEDIA_ROOT=directory.name, CHUNKED_UPLOAD_DIR=f"{directory.name}/chunks")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client.force_authenticate(user=self.client_user)
+        self.url = reverse("job-posts-v2-detail", kwargs={"id": self.job_post.id})
+
+    def upload(self, name, content):
+        return self.client.patch(self.url, {"attachment_1": SimpleUploadedFile(name, content)}, format="multipart")
+
+    def test_matches_signature(self):
+        self.assertTrue(matches_signature("spec.PDF", b"%PDF-1.7"))
+        self.assertFalse(matches_signature("spec.pdf", b"MZ\x90\x00"))
+        self.assertTrue(matches_signature("logo.webp", b"RIFF\x00\x00\x00\x00WEBPVP8 "))
+        self.assertFalse(matches_signature("notes.txt", b"\x7fELF\x02\x01\x00"))
+        self.assertTrue(matches_signature("notes.txt", "notes".encode("utf-16")))
+
+    def test_rejected_while_streaming(self):
+        response = self.upload("spec.pdf", b"MZ\x90\x00 not a pdf")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["attachment_1"], ["File content does not match its extension."])
+        self.assertIn("Invalid file format", self.upload("run.exe", b"MZ").data["attachment_1"][0])
+        with mock.patch.dict(UPLOAD_FIELD_RULES, {"attachment_1": (1024 * 1024, ALLOWED_FILE_EXTENSIONS)}):
+            response = self.upload("spec.pdf", b"%PDF-" + b"0" * 1024 * 1024)
+        self.assertEqual(response.data["attachment_1"], ["File size must be no more than 1 MB."])
+        self.job_post.refresh_from_db()
+        self.assertFalse(self.job_post.attachment_1)
+
+        self.assertEqual(self.upload("spec.pdf", b"%PDF-1.7 ok").status_code, status.HTTP_200_OK)
+
+    def test_rejected_request_is_drained(self):
+        # the body is read to its end instead of resetting the connection, so the client receives the 400
+        django_request = RequestFactory().post("/", {"attachment_1": SimpleUploadedFile("spec.pdf", b"MZ" * 100000),
+                                                     "title": "after the file"})
+        request = Request(django_request, parsers=[ValidatingMultiPartParser()])
+        with self.assertRaises(ValidationError):
+            request.data
+        self.assertEqual(django_request.read(), b"")
+
+    def test_form_uploads_not_validated(self):
+        request = RequestFactory().post("/admin/", {"attachment_1": SimpleUploadedFile("spec.pdf", b"MZ")})
+        self.assertFalse(any(isinstance(handler, ValidatingUploadHandler) for handler in request.upload_handlers))
+        self.assertIn("attachment_1", request.FILES)
+
+    def test_chunked_upload_sniffed(self):
+        response = self.client.post(reverse("uploads-list"), {
+            "target": "job-post", "field": "attachment_1", "object_id": self.job_post.id, "filename": "spec.pdf",
+            "size": 8}, format="json")
+        chunk_url = reverse("uploads-chunk", kwargs={"id": response.data["id"], "index": 0})
+        response = self.client.put(chunk_url, b"MZ\x90\x00", content_type="application/octet-stream")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == "postgresql", "query plans are checked on PostgreSQL")
+class QueryPlanTestCase(TestCase):
+    """
+    Test the hot filter paths are served by their indexes on a seeded dataset.
+    - Sequential scans are disabled so the planner only falls back to one when no index fits the query
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from benchmarks import seed
+
+        users = seed.seed()
+        cls.coder = users["CODER"]
+        cls.job_post = JobPostV2.objects.filter(user=users["CLIENT"]).first()
+        cls.contract = JobContract.objects.first()
+        job = JobPost.objects.create(user=users["CLIENT"], title="Job", project_size="SMALL", budget_type="FIXED",
+                                     duration="SHORT_TERM")
+        JobInvitation.objects.bulk_create([
+            JobInvitation(coder=coder, client=users["CLIENT"], jobpost=job)
+            for coder in User.objects.filter(role="CODER")
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def hot_queries(self):
+        return {
+            "open jobs": (JobPostV2.objects.filter(status="OPEN").order_by("-created"),
+                          {"jobpostv2_open_created_idx", "jobpostv2_status_created_idx"}),
+            "jobs by status": (JobPostV2.objects.filter(status="CLOSED").order_by("-created"),
+                               {"jobpostv2_status_created_idx"}),
+            "proposals of a job by status": (JobProposalV2.objects.filter(job_post=self.job_post, status="SENT"),
+                                             {"proposalv2_post_status_idx"}),
+            "invitations of a coder by status": (JobInvitation.objects.filter(coder=self.coder, status="SENT"),
+                                                 {"invitation_coder_status_idx", "unique_job_invitation"}),
+            "timesheets of a contract by date": (
+                Timesheet.objects.filter(job_contract=self.contract, date__gte=datetime.date(2020, 1, 1)),
+                {"timesheet_contract_date_idx"}),
+            "skills of a user by type": (Skill.objects.filter(user=self.coder, skill_type="PRIMARY"),
+                                         {"skill_user_type_idx"}),
+            "verified coders": (User.objects.filter(role="CODER", is_email_verified=True),
+                                {"user_verified_coder_idx", "user_role_verified_idx"}),
+        }
+
+    @staticmethod
+    def explain(queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.execute("RESET enable_seqscan")
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+    @classmethod
+    def scans(cls, plan):
+        """
+        (table, node type, indexes) of every scan; bitmap heap scans name their indexes in child nodes
+        """
+        if "Relation Name" in plan:
+            indexes = {plan["Index Name"]} if "Index Name" in plan else set(cls.bitmap_indexes(plan))
+            yield plan["Relation Name"], plan["Node Type"], indexes
+        for child in plan.get("Plans", []):
+            yield from cls.scans(child)
+
+    @classmethod
+    def bitmap_indexes(cls, plan):
+        for child in plan.get("Plans", []):
+            if child["Node Type"] == "Bitmap Index Scan":
+                yield child["Index Name"]
+            yield from cls.bitmap_indexes(child)
+
+    def test_hot_queries_use_indexes(self):
+        for name, (queryset, indexes) in self.hot_queries().items():
+            with self.subTest(name):
+                table = queryset.model._meta.db_table
+                scans = [scan for scan in self.scans(self.explain(queryset)) if scan[0] == table]
+                self.assertTrue(scans)
+                for _, node_type, used in scans:
+                    self.assertNotEqual(node_type, "Seq Scan")
+                    self.assertTrue(used and used <= indexes, f"{name} used {used}")
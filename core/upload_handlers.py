@@ -0,0 +1,101 @@
+"""
+Upload handler validating multipart files while they stream in
+"""
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from core.utils import ALLOWED_FILE_EXTENSIONS, MAX_FILE_SIZE
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_RESUME_SIZE = 5 * 1024 * 1024
+
+# multipart field name to the largest size and the extensions accepted, None accepts any extension
+UPLOAD_FIELD_RULES = {
+    "attachment_1": (MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS),
+    "attachment_2": (MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS),
+    "attachment_3": (MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS),
+    "file": (MAX_FILE_SIZE, ALLOWED_FILE_EXTENSIONS),
+    "resume": (MAX_RESUME_SIZE, ALLOWED_FILE_EXTENSIONS),
+    "logo": (MAX_IMAGE_SIZE, None),
+    "profile_picture": (MAX_IMAGE_SIZE, None),
+}
+DEFAULT_UPLOAD_RULE = (MAX_FILE_SIZE, None)
+
+# extension to the (offset, bytes) signatures its files start with, files of other extensions are not sniffed
+MAGIC_NUMBERS = {
+    "pdf": [(0, b"%PDF-")],
+    "png": [(0, b"\x89PNG\r\n\x1a\n")],
+    "jpg": [(0, b"\xff\xd8\xff")],
+    "jpeg": [(0, b"\xff\xd8\xff")],
+    "gif": [(0, b"GIF87a"), (0, b"GIF89a")],
+    "webp": [(8, b"WEBP")],
+    "bmp": [(0, b"BM")],
+    # Word 97-2003 is an OLE compound file, docx a zip archive
+    "doc": [(0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")],
+    "docx": [(0, b"PK\x03\x04")],
+}
+TEXT_BOMS = (b"\xff\xfe", b"\xfe\xff")
+
+
+def size_limit_message(max_size):
+    return f"File size must be no more than {max_size // (1024 * 1024)} MB."
+
+
+def file_extension(file_name):
+    return file_name.rsplit(".", 1)[-1].lower() if "." in file_name else ""
+
+
+def matches_signature(file_name, head):
+    """
+    Whether the first bytes of a file fit its extension; text files must not hold NUL bytes unless UTF-16
+    """
+    extension = file_extension(file_name)
+    if extension == "txt":
+        return head.startswith(TEXT_BOMS) or b"\x00" not in head
+    signatures = MAGIC_NUMBERS.get(extension)
+    if signatures is None:
+        return True
+    return any(head[offset:offset + len(signature)] == signature for offset, signature in signatures)
+
+
+class ValidatingUploadHandler(FileUploadHandler):
+    """
+    Put in front of the request's upload handlers by core.parsers.ValidatingMultiPartParser, checks each file
+    before the next handlers buffer it.
+    - The extension is checked when the file starts, its signature on the first chunk and its size on every
+      chunk, against UPLOAD_FIELD_RULES for its field name
+    - A failing file stops the upload: the rest of the request is read and discarded without being buffered or
+      written, so the client gets the 400 instead of a reset connection; the errors are kept in `errors` for
+      the parser to report
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = {}
+        self.max_size = None
+
+    def reject(self, message):
+        self.errors[self.field_name] = [message]
+        raise StopUpload(connection_reset=False)
+
+    def new_file(self, field_name, file_name, content_type, content_length, *args, **kwargs):
+        super().new_file(field_name, file_name, content_type, content_length, *args, **kwargs)
+        self.max_size, extensions = UPLOAD_FIELD_RULES.get(field_name, DEFAULT_UPLOAD_RULE)
+        if extensions is not None and file_extension(file_name) not in extensions:
+            self.reject(f"Invalid file format. Allowed formats: {', '.join(extensions)}.")
+        # few clients send a size per part, when one does an oversized file is refused before any byte
+        if content_length is not None and content_length > self.max_size:
+            self.reject_size()
+
+    def reject_size(self):
+        self.reject(size_limit_message(self.max_size))
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.reject_size()
+        if start == 0 and not matches_signature(self.file_name, raw_data):
+            self.reject("File content does not match its extension.")
+        return raw_data
+
+    def file_complete(self, file_size):
+        # the next handlers build the uploaded file
+        return None
@@ -0,0 +1,156 @@
+"""
+Resumable chunked uploads for the file fields of jobs, proposals, milestones and resumes
+"""
+import math
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import EducationalQualification
+from core.models import ChunkedUpload, JobPostV2, JobProposalV2, MilestoneV2
+from core.upload_handlers import DEFAULT_UPLOAD_RULE, UPLOAD_FIELD_RULES, matches_signature, size_limit_message
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+# target name to the model and the file fields a chunked upload may fill, rows are looked up among the user's own
+UPLOAD_TARGETS = {
+    "job-post": (JobPostV2, ("attachment_1", "attachment_2", "attachment_3")),
+    "proposal": (JobProposalV2, ("attachment_1", "attachment_2", "attachment_3")),
+    "milestone": (MilestoneV2, ("file",)),
+    "resume": (EducationalQualification, ("resume",)),
+}
+
+
+class AssembledFile(File):
+    """
+    The assembled upload on local disk, moved rather than copied into FileSystemStorage like a temporary upload
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def target_queryset(target, user):
+    model, _ = UPLOAD_TARGETS[target]
+    return model.objects.filter(user=user)
+
+
+def upload_rule(field):
+    """
+    Largest size and accepted extensions of a field, the same UPLOAD_FIELD_RULES multipart uploads are checked against
+    """
+    return UPLOAD_FIELD_RULES.get(field, DEFAULT_UPLOAD_RULE)
+
+
+def chunk_count(upload):
+    return max(math.ceil(upload.size / upload.chunk_size), 1)
+
+
+def upload_dir(upload):
+    return Path(settings.CHUNKED_UPLOAD_DIR) / str(upload.id)
+
+
+def chunk_path(upload, index):
+    return upload_dir(upload) / f"{index:06d}.part"
+
+
+def expected_chunk_size(upload, index):
+    if index < chunk_count(upload) - 1:
+        return upload.chunk_size
+    return upload.size - upload.chunk_size * index
+
+
+def received_chunks(upload):
+    directory = upload_dir(upload)
+    if not directory.exists():
+        return []
+    return sorted(int(path.stem) for path in directory.glob("*.part"))
+
+
+def write_chunk(upload, index, stream):
+    """
+    Copy one chunk from the request stream to disk without holding it in memory.
+    - A chunk is only kept when it has exactly its expected size, sending it again replaces it, so a client
+      resumes by sending the chunks missing from received_chunks()
+    - The first chunk must start with the signature of the file's extension
+    """
+    if upload.status != "UPLOADING":
+        raise ValidationError({"detail": "Upload is already complete."})
+    if not 0 <= index < chunk_count(upload):
+        raise ValidationError({"detail": f"Chunk index must be between 0 and {chunk_count(upload) - 1}."})
+    expected = expected_chunk_size(upload, index)
+    path = chunk_path(upload, index)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".tmp")
+    written, mislabelled = 0, False
+    with open(partial, "wb") as output:
+        while written <= expected:
+            block = stream.read(min(COPY_BUFFER_SIZE, expected - written + 1))
+            if not block:
+                break
+            if index == 0 and not written and not matches_signature(upload.filename, block):
+                mislabelled = True
+                break
+            written += len(block)
+            output.write(block)
+    if mislabelled:
+        partial.unlink()
+        raise ValidationError({"detail": "File content does not match its extension."})
+    if written != expected:
+        partial.unlink()
+        raise ValidationError({"detail": f"Chunk {index} must be exactly {expected} bytes."})
+    os.replace(partial, path)
+    # keeps the upload from being cleared as abandoned while chunks still arrive
+    ChunkedUpload.objects.filter(pk=upload.pk).update(updated=timezone.now())
+
+
+def finalize_upload(upload):
+    """
+    Join the chunks and attach the file to the target field.
+    - Every chunk must be present and the assembled file within the field's UPLOAD_FIELD_RULES size
+    - The file is saved through the field, so upload_to and the field's storage apply as for a form upload
+    - The upload row stays locked until it is marked complete, so a concurrent finalize waits and then finds it
+      complete instead of assembling the file a second time
+    """
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != "UPLOADING":
+            raise ValidationError({"detail": "Upload is already complete."})
+        missing = sorted(set(range(chunk_count(upload))) - set(received_chunks(upload)))
+        if missing:
+            raise ValidationError({"missing_chunks": missing})
+        instance = target_queryset(upload.target, upload.user).filter(id=upload.object_id).first()
+        if instance is None:
+            raise ValidationError({"object_id": "The upload target no longer exists."})
+
+        directory = upload_dir(upload)
+        assembled = directory / "assembled"
+        with open(assembled, "wb") as output:
+            for index in range(chunk_count(upload)):
+                with open(chunk_path(upload, index), "rb") as part:
+                    shutil.copyfileobj(part, output, COPY_BUFFER_SIZE)
+        max_size, _ = upload_rule(upload.field)
+        if assembled.stat().st_size > max_size:
+            assembled.unlink()
+            raise ValidationError({"size": size_limit_message(max_size)})
+
+        field_file = getattr(instance, upload.field)
+        with open(assembled, "rb") as content:
+            field_file.save(upload.filename, AssembledFile(content, name=upload.filename), save=False)
+        instance.save(update_fields=[upload.field, "updated"])
+        upload.status = "COMPLETE"
+        upload.file = field_file.name
+        upload.save(update_fields=["status", "file", "updated"])
+    shutil.rmtree(directory, ignore_errors=True)
+    return upload
+
+
+def discard_upload(upload):
+    shutil.rmtree(upload_dir(upload), ignore_errors=True)
+    upload.delete()
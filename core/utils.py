@@ -1,13 +1,14 @@
 from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
 from django.core.validators import FileExtensionValidator
 
 
 ALLOWED_FILE_EXTENSIONS = ["pdf", "doc", "docx", "txt", "jpg", "jpeg", "png"]
+MAX_FILE_SIZE = 100 * 1024 * 1024  # 100 MB
 
 
 def validate_file_size(value):
-    max_size = 100 * 1024 * 1024  # 100 MB
-    if value.size > max_size:
+    if value.size > MAX_FILE_SIZE:
         raise ValidationError("File size must be no more than 100 MB.")
 
 
@@ -16,3 +17,10 @@ def file_field_validators():
         FileExtensionValidator(allowed_extensions=ALLOWED_FILE_EXTENSIONS),
         validate_file_size,
     ]
+
+
+def attachment_storage():
+    """
+    Storage of job, proposal, milestone and resume files, STORAGES["attachments"] in settings
+    """
+    return storages["attachments"]
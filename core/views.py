@@ -2,18 +2,27 @@
 Views for Core Application
 """
 # System level imports
+import io
+
+from django.conf import settings
+from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import Q
 from django.db.utils import IntegrityError
 
 # Application level imports
 
 from core.models import TimeZone, JobPost, JobInvitation, JobPostV2
 from core.models import TimeZone, JobPost, JobPostV2, JobInvitation,MilestoneV2, JobProposalV2, JobContract, Timesheet
+from core.models import ChunkedUpload
 
 
 from core.filtersets import JobPostFilter, JobPostFilterV2, TimesheetFilter
@@ -25,10 +34,20 @@ from .serializers import (
     JobPostV2Serializer, JobPostV2UpdateSerializer, MilestoneV2Serializer,
     ProposalV2Serializer, MilestoneV2UpdateClientSerializer, MilestoneV2UpdateCoderSerializer,
     ProposalV2UpdateCoderSerializer, ProposalV2UpdateClientSerializer, JobContractSerializer,
-    TimesheetCoderSerializer, TimesheetClientSerializer
+    TimesheetCoderSerializer, TimesheetClientSerializer, TimesheetBulkCoderSerializer,
+    TimesheetSummaryQuerySerializer, TimesheetSummarySerializer, TimesheetExportQuerySerializer,
+    TimesheetBulkStatusSerializer, ProposalSummarySerializer, JobPostV2DetailSerializer, JobContractDetailSerializer,
+    ChunkedUploadSerializer
+)
+from core.exports import export_timesheets
+from core.uploads import finalize_upload, write_chunk
+from core.services import (
+    bulk_update_timesheet_status, contract_milestone_progress, job_milestone_progress, proposal_summary,
+    rank_proposals, timesheet_summary
 )
 
 from core.permissions import (
+    IsClient,
     IsClientOrReadOnly,
     IsAuthenticatedAndEmailVerified,
     HasJobInvitationEditPermission,
@@ -37,6 +56,8 @@ from core.permissions import (
 )
 
 
+from accounts.models import User
+from mysite.replicas import ReplicaReadMixin
 from accounts.permissions import (
     IsClientOrCoderPermission
 )
@@ -72,7 +93,7 @@ class JobPostViewset(viewsets.ModelViewSet):
 
 
 # Create your views here.
-class TimeZoneViewSet(viewsets.ModelViewSet):
+class TimeZoneViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     pagination_class = None
     queryset = TimeZone.objects.all()
     lookup_field = "id"
@@ -138,13 +159,15 @@ class JobInvitationViewSet(viewsets.ModelViewSet):
         return self.update(request, *args, **kwargs)    
 
 
-class JobPostV2Viewset(viewsets.ModelViewSet):
+class JobPostV2Viewset(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = JobPostV2Serializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = JobPostFilterV2
     permission_classes = [IsAuthenticatedAndEmailVerified, IsClientOrReadOnly]
     http_method_names = ["get", "post", "patch", "put", "head", "options"]
     lookup_field = "id"
+    # the summary is cached until the next proposal write, a lagging replica would cache stale numbers
+    primary_read_actions = ("proposals_summary",)
 
     def get_queryset(self):
         user = self.request.user
@@ -160,12 +183,27 @@ class JobPostV2Viewset(viewsets.ModelViewSet):
             return JobPostV2Serializer
         elif self.request.method in ["PUT", "PATCH"]:
             return JobPostV2UpdateSerializer
+        elif self.action == "retrieve":
+            return JobPostV2DetailSerializer
         else:
             return super(JobPostV2Viewset, self).get_serializer_class()
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.with_milestone_progress(self.get_object())).data)
+
+    def with_milestone_progress(self, job_post):
+        job_post.milestone_progress = job_milestone_progress(job_post, self.request.user)
+        return job_post
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=["get"], url_path="proposals/summary",
+            permission_classes=[IsAuthenticatedAndEmailVerified, IsClient])
+    def proposals_summary(self, request, *args, **kwargs):
+        """Compare the proposals of a job: count, hourly rate and cost spread and status breakdown."""
+        return Response(ProposalSummarySerializer(proposal_summary(self.get_object())).data)
+
 class MilestoneV2Viewset(viewsets.ModelViewSet):
     serializer_class = MilestoneV2Serializer
     # filter_backends = [DjangoFilterBackend]
@@ -195,6 +233,9 @@ class MilestoneV2Viewset(viewsets.ModelViewSet):
         else:
             return super(MilestoneV2Viewset, self).get_serializer_class()
 
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
 
 class ProposalV2Viewset(viewsets.ModelViewSet):
     serializer_class = ProposalV2Serializer
@@ -207,10 +248,15 @@ class ProposalV2Viewset(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.role == "CODER":
-            return JobProposalV2.objects.filter(user=user)
+            proposals = JobProposalV2.objects.filter(user=user)
         elif user.role == "CLIENT":
-            return JobProposalV2.objects.filter(job_post__user=user)
-        return JobProposalV2.objects.none()
+            proposals = JobProposalV2.objects.filter(job_post__user=user)
+        else:
+            return JobProposalV2.objects.none()
+        proposals = proposals.select_related("user", "job_post")
+        if self.action == "list" and self.request.query_params.get("ordering") == "score":
+            return rank_proposals(proposals).order_by("-score", "-created")
+        return proposals.order_by("-created")
 
     def get_serializer_class(self):
         """allocates different serializers for Create and update."""
@@ -244,6 +290,31 @@ class ContractViewSet(viewsets.ModelViewSet):
         else:
             return JobContract.objects.none()
 
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return JobContractDetailSerializer
+        return super().get_serializer_class()
+
+    def retrieve(self, request, *args, **kwargs):
+        contract = self.get_object()
+        contract.milestone_progress = contract_milestone_progress(contract)
+        return Response(self.get_serializer(contract).data)
+
+    @action(detail=True, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        """Stream the timesheets of this contract, narrowed by the timesheet filters."""
+        contract = self.get_object()
+        query = TimesheetExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filterset = TimesheetFilter(
+            request.query_params, queryset=Timesheet.objects.filter(job_contract=contract), request=request
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return export_timesheets(
+            filterset.qs, query.validated_data["file_format"], f"timesheets_{contract.id}"
+        )
+
 class TimesheetViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, HasTimesheetGetUpdatePermission]
     filter_backends = [DjangoFilterBackend]
@@ -253,7 +324,9 @@ class TimesheetViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.role == 'CLIENT':
-            return Timesheet.objects.filter(job_contract__job_proposal__job_post__user_id=user.id)
+            # rows created before Timesheet.client existed reach the client through the contract until
+            # backfill_timesheet_client has filled them in
+            return Timesheet.objects.filter(Q(client=user) | Q(client__isnull=True, job_contract__client_id=user))
         elif user.role == 'CODER':
             return Timesheet.objects.filter(user=user)
 
@@ -269,14 +342,106 @@ class TimesheetViewSet(viewsets.ModelViewSet):
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        """Submit a week of entries, across one or more contracts, in one transaction."""
+        with transaction.atomic():
+            # serialize submissions of the same coder so the overlap check cannot race
+            User.objects.select_for_update().filter(pk=request.user.pk).first()
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            timesheets = serializer.save()
+        return Response(
+            TimesheetCoderSerializer(timesheets, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=["put"], url_path="bulk-status")
+    def bulk_status(self, request, *args, **kwargs):
+        """Approve or reject the listed timesheets, or every timesheet matching the filters."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get("ids")
+        if ids is None and not any(name in request.query_params for name in TimesheetFilter.base_filters):
+            raise ValidationError({"ids": "Provide timesheet ids or at least one filter."})
+
+        timesheets = self.filter_queryset(self.get_queryset())
+        if ids is not None:
+            timesheets = timesheets.filter(id__in=ids)
+        with transaction.atomic():
+            matched, updated = bulk_update_timesheet_status(
+                timesheets, serializer.validated_data["timesheet_status"])
+            missing = set(ids or []) - matched
+            if missing:
+                raise ValidationError({"ids": [f"Timesheet {timesheet_id} not found." for timesheet_id in missing]})
+        return Response({"updated": updated, "skipped": len(matched) - updated})
+
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request, *args, **kwargs):
+        """Approved hours and amount per contract, grouped by week or month."""
+        query = TimesheetSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        user = request.user
+        if user.role == 'CLIENT':
+            contracts = JobContract.objects.filter(client_id=user)
+        else:
+            contracts = JobContract.objects.filter(coder_id=user)
+        if "contract" in query.validated_data:
+            contracts = contracts.filter(id=query.validated_data["contract"])
+        summary = timesheet_summary(contracts, query.validated_data["group_by"].upper())
+        return Response(TimesheetSummarySerializer(summary, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        """Stream every timesheet matching the timesheet filters as CSV or XLSX."""
+        query = TimesheetExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return export_timesheets(
+            self.filter_queryset(self.get_queryset()), query.validated_data["file_format"], "timesheets"
+        )
 
-        
     def get_serializer_class(self):
         if getattr(self, 'swagger_fake_view', False):
             return TimesheetClientSerializer
+        if self.action == "bulk":
+            return TimesheetBulkCoderSerializer
+        if self.action == "summary":
+            return TimesheetSummarySerializer
+        if self.action == "bulk_status":
+            return TimesheetBulkStatusSerializer
         user = self.request.user
         if user.role == 'CLIENT':
             return TimesheetClientSerializer
         elif user.role == 'CODER':
             return TimesheetCoderSerializer
-        
\ No newline at end of file
+
+
+class ChunkedUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable upload of a file for a job post, proposal, milestone or resume field.
+    - POST declares the file and its target, PUT chunks/<index>/ sends each chunk as the raw request body
+    - GET lists the chunks received so far so an interrupted upload resumes where it stopped
+    - POST finalize/ joins the chunks and attaches the file to the target field
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [IsAuthenticatedAndEmailVerified]
+    http_method_names = ["get", "post", "put", "head", "options"]
+    lookup_field = "id"
+
+    def get_queryset(self):
+        return ChunkedUpload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, chunk_size=settings.CHUNKED_UPLOAD_CHUNK_SIZE)
+
+    @action(detail=True, methods=["put"], url_path=r"chunks/(?P<index>\d+)")
+    def chunk(self, request, *args, **kwargs):
+        upload = self.get_object()
+        # read straight from the request, request.data would buffer the whole chunk
+        write_chunk(upload, int(kwargs["index"]), request.stream or io.BytesIO())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, *args, **kwargs):
+        upload = finalize_upload(self.get_object())
+        return Response(self.get_serializer(upload).data)
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings, read from the environment so the database pool can be sized to match
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 3))
+# each thread holds at most one database connection, DB_POOL_MAX_SIZE defaults to this value
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+# SERVER_MODE=asgi runs uvicorn workers, each serving many requests on one event loop, see mysite.async_views
+server_mode = os.environ.get("SERVER_MODE", "wsgi")
+if server_mode == "asgi":
+    wsgi_app = "mysite.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "mysite.wsgi:application"
+    worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# restart workers now and then so recycled pools and leaked memory do not pile up
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
@@ -3,6 +3,7 @@ from datetime import datetime
 from rest_framework import serializers
 from core.models import JobPost, TimeZone, Expertise
 from accounts.models import User, Technology, Skill, CoderSkillsExperience, Address
+from accounts.serializers import ImageVariantsField
 from .models import TermsAndConditions
 
 
@@ -10,6 +11,7 @@ class RecommendedJobsSerializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(slug_field="username", read_only=True)
     company_name = serializers.SerializerMethodField()
     company_logo = serializers.SerializerMethodField()
+    company_logo_variants = ImageVariantsField("logo", source="user.companydetails")
     
 
     class Meta:
@@ -35,7 +37,8 @@ class RecommendedJobsSerializer(serializers.ModelSerializer):
             "created",
             "updated",
             'company_name',
-            'company_logo'
+            'company_logo',
+            'company_logo_variants'
         ]
         read_only_fields = fields
 
@@ -83,10 +86,12 @@ class UserSkillSerializer(serializers.ModelSerializer):
 
 class UserSkillsExperienceSerializer(serializers.ModelSerializer):
     skills = serializers.SerializerMethodField()
+    profile_picture_variants = ImageVariantsField("profile_picture")
     
     class Meta:
         model = CoderSkillsExperience
-        fields = ['skills', 'hourly_rate', 'identity', "total_years_of_experience", "profile_picture",]
+        fields = ['skills', 'hourly_rate', 'identity', "total_years_of_experience", "profile_picture",
+                  "profile_picture_variants"]
         
     def get_skills(self, instance):
         skills_queryset = Skill.objects.filter(user=instance.user)
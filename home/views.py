@@ -13,11 +13,12 @@ from accounts.models import User
 from django.db.models.functions import Random
 from .models import TermsAndConditions
 from accounts.permissions import IsAdmin
+from mysite.replicas import ReplicaReadMixin
 
 # Create your views here.
 
 
-class RecommendedJobsViewset(viewsets.ModelViewSet):
+class RecommendedJobsViewset(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = RecommendedJobsSerializer
     permission_classes = [AllowAny]
     http_method_names = ["get", "head", "options"]
@@ -30,14 +31,14 @@ class RecommendedJobsViewset(viewsets.ModelViewSet):
         return queryset
 
 
-class RecommendedCoderViewSet(viewsets.ModelViewSet):
+class RecommendedCoderViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = User.objects.filter(role="CODER", is_email_verified=True).order_by(Random())[:5]
     serializer_class = RecommendedCoderSerializer
     permission_classes = [AllowAny]
     http_method_names = ["get", "head", "options"]
 
 
-class TermsAndConditionsViewSet(viewsets.ModelViewSet):
+class TermsAndConditionsViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = TermsAndConditions.objects.all()
     serializer_class = TermsAndConditionsSerializer
     http_method_names = ["get", "post", "put", "patch", "head", "options"]
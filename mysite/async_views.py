@@ -0,0 +1,179 @@
+"""
+Async read views served in the ASGI deployment
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from mysite.replicas import read_from_replica
+
+
+def release_connections():
+    """
+    Hand pooled connections back to the pool between the steps of an async request.
+    - Each ASGI request runs its queries on a thread of its own and would otherwise hold its connection until
+      the response is sent, so a pool of a few connections could only serve as many requests at once
+    """
+    for connection in connections.all(initialized_only=True):
+        if hasattr(connection, "get_pool") and not connection.in_atomic_block:
+            connection.close()
+
+
+async def run_sync(func, *args):
+    def call():
+        try:
+            return func(*args)
+        finally:
+            release_connections()
+    return await sync_to_async(call)()
+
+
+async def run_query(awaitable):
+    """
+    Await an async ORM call, then release its connection the same way run_sync() does
+    """
+    try:
+        return await awaitable
+    finally:
+        await sync_to_async(release_connections)()
+
+
+class AsyncReadView:
+    """
+    GET list/retrieve of a DRF viewset with the async ORM, other methods go to the regular viewset view.
+    - Authentication, permissions, filtering and serialization reuse the viewset behind sync_to_async
+    - Counting and fetching the rows use the async ORM so the event loop serves other requests meanwhile
+    - prepare_object names a viewset method run on a retrieved object before serialization
+    """
+
+    def __init__(self, viewset, actions, prepare_object=None, **initkwargs):
+        self.viewset = viewset
+        self.action = actions["get"]
+        self.prepare_object = prepare_object
+        self.initkwargs = initkwargs
+        self.sync_view = viewset.as_view(actions, **initkwargs)
+
+    def as_view(self):
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+            # ReplicaReadMixin.initial() sets this, reset it the way the mixin's dispatch() does
+            token = read_from_replica.set(False)
+            try:
+                return await self.get(request, *args, **kwargs)
+            finally:
+                read_from_replica.reset(token)
+
+        # csrf_exempt() only wraps sync views before Django 5.0, DRF views are exempt the same way
+        view.csrf_exempt = True
+        return view
+
+    async def get(self, request, *args, **kwargs):
+        view, drf_request = self.initialize(request, args, kwargs)
+        try:
+            queryset = await run_sync(self.get_queryset, view)
+            if self.action == "list":
+                produce = await self.list(view, queryset)
+            else:
+                produce = await self.retrieve(view, queryset)
+        except Exception as exc:  # noqa: BLE001 - rendered the way the viewset renders it
+            return await run_sync(self.finalize, view, drf_request, exc)
+        return await run_sync(self.render, view, drf_request, produce)
+
+    def initialize(self, request, args, kwargs):
+        """
+        Set the viewset up the way as_view() does before dispatch
+        """
+        view = self.viewset(**self.initkwargs)
+        view.action_map = {"get": self.action}
+        view.action = self.action
+        view.args, view.kwargs = args, kwargs
+        view.format_kwarg = None
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        return view, drf_request
+
+    @staticmethod
+    def get_queryset(view):
+        view.initial(view.request)
+        return view.filter_queryset(view.get_queryset())
+
+    async def list(self, view, queryset):
+        paginator = view.paginator
+        if paginator is None:
+            rows = await run_query(self.fetch(queryset))
+            return lambda: view.get_serializer(rows, many=True).data
+
+        request = view.request
+        page_size = paginator.get_page_size(request)
+        count = await run_query(queryset.acount())
+        total_pages = max(math.ceil(count / page_size), 1)
+        page_number = request.query_params.get(paginator.page_query_param, 1)
+        if page_number in paginator.last_page_strings:
+            page_number = total_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            page_number = 0
+        if not 1 <= page_number <= total_pages:
+            raise NotFound(paginator.invalid_page_message.format(
+                page_number=request.query_params.get(paginator.page_query_param), message="Invalid page."))
+        offset = (page_number - 1) * page_size
+        rows = await run_query(self.fetch(queryset[offset:offset + page_size]))
+
+        url = request.build_absolute_uri()
+        next_link = replace_query_param(url, paginator.page_query_param, page_number + 1) \
+            if page_number < total_pages else None
+        previous_link = None
+        if page_number == 2:
+            previous_link = remove_query_param(url, paginator.page_query_param)
+        elif page_number > 2:
+            previous_link = replace_query_param(url, paginator.page_query_param, page_number - 1)
+        # same shape as accounts.paginations.CustomPagination
+        return lambda: {
+            "count": count,
+            "total_pages": total_pages,
+            "next": next_link,
+            "previous": previous_link,
+            "results": view.get_serializer(rows, many=True).data,
+        }
+
+    async def retrieve(self, view, queryset):
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            obj = await run_query(queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]}))
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        prepare = getattr(view, self.prepare_object) if self.prepare_object else None
+
+        def produce():
+            view.check_object_permissions(view.request, obj)
+            return view.get_serializer(prepare(obj) if prepare else obj).data
+        return produce
+
+    @staticmethod
+    async def fetch(queryset):
+        return [row async for row in queryset]
+
+    @classmethod
+    def render(cls, view, drf_request, produce):
+        try:
+            response = Response(produce())
+        except Exception as exc:  # noqa: BLE001
+            return cls.finalize(view, drf_request, exc)
+        response = view.finalize_response(drf_request, response)
+        response.render()
+        return response
+
+    @staticmethod
+    def finalize(view, drf_request, exc):
+        response = view.finalize_response(drf_request, view.handle_exception(exc))
+        response.render()
+        return response
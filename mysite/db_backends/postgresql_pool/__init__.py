@@ -0,0 +1,3 @@
+"""
+PostgreSQL backend handing out connections from a per-process pool
+"""
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+
+from django.db.backends.postgresql.base import Database
+
+
+class PoolTimeout(Database.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of psycopg2 connections.
+    - At most max_size connections exist, callers wait up to timeout seconds for a free one
+    - Connections older than recycle seconds are replaced, idle ones are pinged before reuse when pre_ping is set
+    """
+
+    def __init__(self, connect, max_size, timeout, recycle, pre_ping):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.idle = []
+        self.created = {}
+        self.condition = threading.Condition()
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                connection, placeholder = self.take(deadline)
+            if connection is None:
+                return self.open(placeholder)
+            # the connection is already taken out of the pool, so its ping never holds up other threads
+            if self.is_healthy(connection):
+                return connection
+            with self.condition:
+                self.discard(connection)
+                self.condition.notify()
+
+    def take(self, deadline):
+        """
+        An idle connection, or a reserved slot for a new one when none is idle; called with the lock held
+        """
+        while not self.idle and len(self.created) >= self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.condition.wait(remaining):
+                raise PoolTimeout(
+                    f"No database connection available within {self.timeout}s (pool size {self.max_size})."
+                )
+        if self.idle:
+            return self.idle.pop(), None
+        # reserve the slot before connecting outside the lock
+        placeholder = object()
+        self.created[id(placeholder)] = None
+        return None, placeholder
+
+    def open(self, placeholder):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                del self.created[id(placeholder)]
+                self.condition.notify()
+            raise
+        with self.condition:
+            del self.created[id(placeholder)]
+            self.created[id(connection)] = time.monotonic()
+        return connection
+
+    def putconn(self, connection):
+        with self.condition:
+            if connection.closed or not self.reset(connection):
+                self.discard(connection)
+            else:
+                self.idle.append(connection)
+            self.condition.notify()
+
+    def is_healthy(self, connection):
+        if connection.closed:
+            return False
+        if self.recycle and time.monotonic() - self.created[id(connection)] > self.recycle:
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except Database.Error:
+            return False
+        return True
+
+    @staticmethod
+    def reset(connection):
+        """
+        Roll back anything left open so the next user starts outside a transaction
+        """
+        if connection.info.transaction_status == Database.extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        try:
+            connection.rollback()
+        except Database.Error:
+            return False
+        return connection.info.transaction_status == Database.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                self.discard(self.idle.pop())
+
+    def discard(self, connection):
+        self.created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect, options):
+    """
+    Pool of the current process for a database alias.
+    - Keyed by pid so forked gunicorn workers never share sockets inherited from the master
+    """
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                connect,
+                max_size=options.get("MAX_SIZE", 5),
+                timeout=options.get("TIMEOUT", 10),
+                recycle=options.get("RECYCLE", 1800),
+                pre_ping=options.get("PRE_PING", True),
+            )
+        return _pools[key]
+
+
+def close_pools():
+    """
+    Close the idle connections of every pool of this process and forget the pools
+    """
+    with _pools_lock:
+        pools = [pool for (_, pid), pool in _pools.items() if pid == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        pool.close()
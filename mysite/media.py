@@ -0,0 +1,202 @@
+"""
+Permission checked media downloads, handed to the front proxy when one is configured
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from functools import reduce
+from operator import or_
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Exists, Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.views import APIView
+
+from core.utils import attachment_storage
+from mysite.async_views import release_connections
+
+# images shown on listings, served to anyone
+PUBLIC_MEDIA_PREFIXES = ("company_logos/", "profile_pictures/")
+
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def owned_or_all_for_coders(user):
+    # same rows as JobPostViewset and JobPostV2Viewset list
+    if user.role == "CLIENT":
+        return Q(user=user)
+    if user.role == "CODER":
+        return Q()
+    return None
+
+
+def owned_or_for_own_jobs(user):
+    # proposals and milestones: the coder who sent them and the client of the job
+    if user.role == "CODER":
+        return Q(user=user)
+    if user.role == "CLIENT":
+        return Q(job_post__user=user)
+    return None
+
+
+def owned_or_all_for_clients(user):
+    # resumes are linked from the coder directory that clients browse
+    if user.role == "CLIENT":
+        return Q()
+    return Q(user=user)
+
+
+# model label, file fields and the rows of it a user may download files of
+PROTECTED_MEDIA = [
+    ("core.JobPost", ("attachment_1", "attachment_2", "attachment_3"), owned_or_all_for_coders),
+    ("core.JobPostV2", ("attachment_1", "attachment_2", "attachment_3"), owned_or_all_for_coders),
+    ("core.JobProposalV2", ("attachment_1", "attachment_2", "attachment_3"), owned_or_for_own_jobs),
+    ("core.MilestoneV2", ("file",), owned_or_for_own_jobs),
+    ("accounts.EducationalQualification", ("resume",), owned_or_all_for_clients),
+]
+
+
+def can_download(user, name):
+    """
+    Whether any row the user may see holds the file, in a single query.
+    - A content addressed file can be attached to rows of several models, any of them grants access
+    """
+    if user.is_superuser or user.role == "SUPER-ADMIN":
+        return True
+    checks = []
+    for model_label, fields, visible in PROTECTED_MEDIA:
+        condition = visible(user)
+        if condition is None:
+            continue
+        holds_file = reduce(or_, [Q(**{field: name}) for field in fields])
+        checks.append(Exists(apps.get_model(model_label).objects.filter(condition, holds_file)))
+    if not checks:
+        return False
+    return type(user).objects.filter(pk=user.pk).filter(reduce(or_, checks)).exists()
+
+
+def media_storage(name):
+    return default_storage if name.startswith(PUBLIC_MEDIA_PREFIXES) else attachment_storage()
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single byte range, None to send the whole file, raises ValueError when unsatisfiable
+    - Multiple ranges are answered with the whole file, which clients have to accept
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class FileRange:
+    """
+    At most `length` bytes of a file from `start`.
+    - fileno() is kept so gunicorn still sendfile()s the range, bounded by the Content-Length header
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_response(request, path, name):
+    """
+    FileResponse of a local file, with a 206 partial response for a Range request.
+    - Under gunicorn the wsgi.file_wrapper sends it with sendfile(), without copying it through Python
+    """
+    size = os.path.getsize(path)
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+class ProtectedMediaView(APIView):
+    """
+    Serve a file under MEDIA_URL once the user is allowed to see it.
+    - Logos and profile pictures are public, attachments and resumes need a row of the user's holding them
+    - MEDIA_DELIVERY picks who sends the bytes: x-accel-redirect (nginx) or x-sendfile (Apache, lighttpd)
+      let the proxy send them and free the worker at once, django streams them with a FileResponse
+    - Storages without local paths redirect to the storage URL
+    """
+    permission_classes = []
+    swagger_schema = None
+
+    def get(self, request, name):
+        # the storage collapses "..", so company_logos/../resume/cv.pdf would pass as public and then serve the resume
+        if name.startswith("/") or ".." in name.split("/") or posixpath.normpath(name) != name:
+            raise Http404
+        if not name.startswith(PUBLIC_MEDIA_PREFIXES):
+            if not request.user.is_authenticated:
+                raise NotAuthenticated
+            if not can_download(request.user, name):
+                # same answer as a missing file, existence of private files is not disclosed
+                raise Http404
+        storage = media_storage(name)
+        try:
+            path = storage.path(name)
+        except SuspiciousFileOperation:
+            raise Http404
+        except NotImplementedError:
+            return HttpResponseRedirect(storage.url(name))
+        # nothing below needs the database, hand pooled connections back before the transfer
+        release_connections()
+        if not os.path.isfile(path):
+            raise Http404
+
+        if settings.MEDIA_DELIVERY == "x-accel-redirect":
+            response = HttpResponse()
+            # nginx types the file from its extension
+            del response["Content-Type"]
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+        elif settings.MEDIA_DELIVERY == "x-sendfile":
+            response = HttpResponse(content_type=mimetypes.guess_type(name)[0] or "application/octet-stream")
+            response["X-Sendfile"] = path
+        else:
+            response = file_response(request, path, name)
+        if not name.startswith(PUBLIC_MEDIA_PREFIXES):
+            response["Cache-Control"] = "private"
+        return response
@@ -0,0 +1,136 @@
+"""
+OpenAPI schema generated once per code version and served as a static document
+"""
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+import django
+import drf_yasg
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_safe
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import SwaggerJSONRenderer, SwaggerUIRenderer, SwaggerYAMLRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+API_VERSION = "v2"
+API_INFO = openapi.Info(
+    title="This is the new Repo for the restructured API's",
+    default_version=API_VERSION,
+    description="This repo is under development.",
+)
+
+SCHEMA_FORMATS = {
+    "json": SwaggerJSONRenderer,
+    "yaml": SwaggerYAMLRenderer,
+}
+SCHEMA_CACHE_KEY = "openapi-schema:{version}:{format}"
+
+# documents already loaded by this process, by (version, format)
+_schemas = {}
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """
+    OPENAPI_SCHEMA_VERSION if set, else a digest of the project's Python sources and the schema libraries
+    """
+    if settings.OPENAPI_SCHEMA_VERSION:
+        return settings.OPENAPI_SCHEMA_VERSION
+    digest = hashlib.sha256(f"{django.__version__}:{rest_framework.__version__}:{drf_yasg.__version__}".encode())
+    base_dir = Path(settings.BASE_DIR).resolve()
+    roots = {Path(__file__).resolve().parent}
+    for app in apps.get_app_configs():
+        if base_dir in Path(app.path).resolve().parents:
+            roots.add(Path(app.path).resolve())
+    for root in sorted(roots):
+        for source in sorted(root.rglob("*.py")):
+            digest.update(str(source.relative_to(base_dir)).encode())
+            digest.update(source.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(version, schema_format):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"openapi-{version}.{schema_format}"
+
+
+def generate_schemas():
+    """
+    Introspect every viewset once and encode the schema in each format.
+    - Views are inspected with an anonymous mock request; host and schemes are left out so the document
+      works for whichever host serves it
+    """
+    request = Request(APIRequestFactory().get("/"))
+    swagger = OpenAPISchemaGenerator(API_INFO).get_schema(request=request, public=True)
+    swagger.pop("host", None)
+    swagger.pop("schemes", None)
+    return {schema_format: renderer().render(swagger) for schema_format, renderer in SCHEMA_FORMATS.items()}
+
+
+def write_schemas(version=None):
+    version = version or code_version()
+    paths = []
+    for schema_format, document in generate_schemas().items():
+        path = schema_path(version, schema_format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(document)
+        paths.append(path)
+    return paths
+
+
+def get_schema(schema_format):
+    """
+    The encoded schema of the running code, looked up in this process, the schema file written at build time
+    and the shared cache, in that order, and generated (and cached) only when none has it
+    """
+    version = code_version()
+    document = _schemas.get((version, schema_format))
+    if document is None:
+        path = schema_path(version, schema_format)
+        if path.exists():
+            document = path.read_bytes()
+        else:
+            document = cache.get(SCHEMA_CACHE_KEY.format(version=version, format=schema_format))
+        if document is None:
+            documents = generate_schemas()
+            cache.set_many({SCHEMA_CACHE_KEY.format(version=version, format=name): value
+                            for name, value in documents.items()}, settings.OPENAPI_SCHEMA_CACHE_TIMEOUT)
+            document = documents[schema_format]
+        _schemas[version, schema_format] = document
+    return version, document
+
+
+@require_safe
+def schema(request, schema_format):
+    version, document = get_schema(schema_format)
+    etag = f'"{version}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(document, content_type=f"{SCHEMA_FORMATS[schema_format].media_type}; charset=utf-8")
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={settings.OPENAPI_SCHEMA_MAX_AGE}"
+    return response
+
+
+@require_safe
+def swagger_ui(request):
+    """
+    Swagger UI page loading the static schema; ?format=openapi still returns the schema itself
+    """
+    if request.GET.get("format") in ("openapi", ".json"):
+        return schema(request, "json")
+    if request.GET.get("format") == ".yaml":
+        return schema(request, "yaml")
+    renderer = SwaggerUIRenderer()
+    context = {"request": request}
+    renderer.set_context(context)
+    context.update(title=API_INFO.title, version=API_VERSION)
+    return HttpResponse(render_to_string(renderer.template, context, request))
@@ -0,0 +1,112 @@
+"""
+Read replica routing for read heavy viewsets
+"""
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA = "replica"
+PIN_CACHE_KEY = "replica-pin:{}"
+
+read_from_replica = contextvars.ContextVar("read_from_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def pin_to_primary(user):
+    cache.set(PIN_CACHE_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return bool(user and user.is_authenticated and cache.get(PIN_CACHE_KEY.format(user.pk)))
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the replica while a ReplicaReadMixin view is serving a safe request.
+    - Everything else, writes, reads inside a transaction and migrations, stays on the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        if read_from_replica.get() and replica_configured() and not connections["default"].in_atomic_block:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaReadMixin:
+    """
+    Viewset mixin serving GET/HEAD/OPTIONS from the replica.
+    - Authentication still reads the primary, users who wrote recently stay on the primary
+    - Actions listed in primary_read_actions always read the primary
+    """
+    primary_read_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS and getattr(self, "action", None) not in self.primary_read_actions
+                and not is_pinned(request.user)):
+            read_from_replica.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        token = read_from_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_from_replica.reset(token)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pin a user to the primary for REPLICA_PIN_SECONDS after a successful write, so they read their own writes
+    - The pin lives in the cache, which has to be shared by every worker for the next request to see it
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        if not settings.SHARED_CACHE:
+            raise ImproperlyConfigured(
+                "A read replica needs CACHE_URL set to a cache shared by all workers, otherwise users are only "
+                "pinned to the primary in the worker that handled their write"
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # request.user may still need a query to load
+            await sync_to_async(self.pin_after_write)(request, response)
+        return response
+
+    @staticmethod
+    def pin_after_write(request, response):
+        user = getattr(request, "user", None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and user and user.is_authenticated:
+            pin_to_primary(user)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
+from decimal import Decimal
 import environ
 
 
@@ -58,11 +59,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.RequestProfilingMiddleware",
+    "core.middleware.QueryFingerprintMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "mysite.replicas.ReplicaPinningMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -90,6 +94,9 @@ WSGI_APPLICATION = "mysite.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# "wsgi" (gunicorn workers) or "asgi" (uvicorn workers with the async read views), see gunicorn.conf.py
+SERVER_MODE = env.str("SERVER_MODE", default="wsgi")
+
 DATABASES = {}
 DB_TO_USE = env.str("DB_TO_USE", default="postgres")
 if DB_TO_USE == "sqlite":
@@ -102,18 +109,50 @@ if DB_TO_USE == "sqlite":
         }
     )
 elif DB_TO_USE == "postgres":
+    # with DB_POOL connections go back to a per-process pool at the end of each request, so they are not
+    # kept per thread (CONN_MAX_AGE=0); keep workers x DB_POOL_MAX_SIZE below the server's max_connections
+    # under ASGI every in flight request runs its queries on a thread of its own, so the pool is what keeps
+    # hundreds of concurrent requests from opening hundreds of connections
+    DB_POOL = env.bool("DB_POOL", default=SERVER_MODE == "asgi")
     DATABASES.update(
         {
             "default": {
-                "ENGINE": "django.db.backends.postgresql",
+                "ENGINE": "mysite.db_backends.postgresql_pool" if DB_POOL else "django.db.backends.postgresql",
                 "NAME": env.str("DB_NAME"),
                 "USER": env.str("DB_USER"),
                 "PASSWORD": env.str("DB_PASSWORD"),
                 "HOST": env.str("DB_HOST"),
                 "PORT": env.str("DB_PORT"),
+                "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", default=0 if DB_POOL else 60),
+                "CONN_HEALTH_CHECKS": env.bool("DB_CONN_HEALTH_CHECKS", default=True),
+                "POOL": {
+                    # one connection per gunicorn thread is enough, requests never share a connection;
+                    # ASGI workers have no fixed thread count, so their requests queue for a fixed number
+                    "MAX_SIZE": env.int("DB_POOL_MAX_SIZE", default=10 if SERVER_MODE == "asgi" else
+                                        env.int("GUNICORN_THREADS", default=1)),
+                    "TIMEOUT": env.float("DB_POOL_TIMEOUT", default=30.0 if SERVER_MODE == "asgi" else 10.0),
+                    "RECYCLE": env.int("DB_POOL_RECYCLE", default=1800),
+                    "PRE_PING": env.bool("DB_POOL_PRE_PING", default=True),
+                },
             }
         }
     )
+    # reads of the viewsets using ReplicaReadMixin go to this replica when REPLICA_DB_HOST is set, needs a shared
+    # CACHE_URL, see mysite.replicas.ReplicaPinningMiddleware
+    if env.str("REPLICA_DB_HOST", default=""):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": env.str("REPLICA_DB_NAME", default=DATABASES["default"]["NAME"]),
+            "USER": env.str("REPLICA_DB_USER", default=DATABASES["default"]["USER"]),
+            "PASSWORD": env.str("REPLICA_DB_PASSWORD", default=DATABASES["default"]["PASSWORD"]),
+            "HOST": env.str("REPLICA_DB_HOST"),
+            "PORT": env.str("REPLICA_DB_PORT", default=DATABASES["default"]["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+
+DATABASE_ROUTERS = ["mysite.replicas.PrimaryReplicaRouter"]
+# seconds a user keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=5)
 
 
 # Password validation
@@ -163,9 +202,13 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "accounts.paginations.CustomPagination",
+    "DEFAULT_PARSER_CLASSES": (
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "core.parsers.ValidatingMultiPartParser",
+    ),
    
 }
-HIRECODER_FEE = 0.05
 EMAIL_BACKEND = env.str('EMAIL_BACKEND', default="anymail.backends.amazon_ses.EmailBackend")
 DEFAULT_FROM_EMAIL = env.str('DEFAULT_FROM_EMAIL', default="no-reply@hirecoder.info")
 ANYMAIL = {
@@ -198,9 +241,80 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 COMPANY_LOGOS_DIR = "company_logos"
 PROFILE_PICTURES_PATH = os.path.join(MEDIA_ROOT, COMPANY_LOGOS_DIR)
+# job, proposal, milestone and resume files are stored once per distinct content, see mysite.storage
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "attachments": {"BACKEND": env.str("ATTACHMENT_STORAGE", default="mysite.storage.ContentAddressedStorage")},
+}
 CORS_ALLOW_ALL_ORIGINS = env.bool('CORS_ALLOW_ALL_ORIGINS', default=True)
 CORS_ALLOW_CREDENTIALS = env.bool('CORS_ALLOW_CREDENTIALS', default=True)
 MAX_DEGREE = env.int("MAX_DEGREE", default=5)
 MAX_CERTIFICATE = env.int("MAX_CERTIFICATE", default=10)
 DEFAULT_PAGE_SIZE = env.int("DEFAULT_PAGE_SIZE", default=5)
-HIRECODER_FEE = 0.05
+HIRECODER_FEE = Decimal(env.str("HIRECODER_FEE", default="0.05"))
+
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://"),
+}
+# locmem and dummy caches live inside one process: with several gunicorn workers a cache.delete in one worker leaves
+# the others serving what they cached, so anything invalidated on write needs CACHE_URL pointing at redis/memcached
+SHARED_CACHE = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# serve the busiest read endpoints from mysite.async_views, on by default when running under ASGI
+ASYNC_READ_VIEWS = env.bool("ASYNC_READ_VIEWS", default=SERVER_MODE == "asgi")
+
+# the OpenAPI schema is generated once per code version, see mysite.openapi and build_openapi_schema
+OPENAPI_SCHEMA_VERSION = env.str("OPENAPI_SCHEMA_VERSION", default="")
+OPENAPI_SCHEMA_DIR = env.path("OPENAPI_SCHEMA_DIR", default=BASE_DIR / "openapi")
+OPENAPI_SCHEMA_CACHE_TIMEOUT = env.int("OPENAPI_SCHEMA_CACHE_TIMEOUT", default=60 * 60 * 24 * 7)
+OPENAPI_SCHEMA_MAX_AGE = env.int("OPENAPI_SCHEMA_MAX_AGE", default=60 * 60)
+SWAGGER_SETTINGS = {
+    "SPEC_URL": "openapi-schema-json",
+}
+
+# resumable uploads, see core.uploads; keep the directory on the same filesystem as MEDIA_ROOT so finished
+# files are moved, not copied
+CHUNKED_UPLOAD_DIR = env.path("CHUNKED_UPLOAD_DIR", default=BASE_DIR / "chunked_uploads")
+CHUNKED_UPLOAD_CHUNK_SIZE = env.int("CHUNKED_UPLOAD_CHUNK_SIZE", default=5 * 1024 * 1024)
+CHUNKED_UPLOAD_EXPIRY_HOURS = env.int("CHUNKED_UPLOAD_EXPIRY_HOURS", default=24)
+
+# who sends the bytes of /media/ downloads once mysite.media has checked access: "django" streams them with
+# FileResponse, "x-accel-redirect" (nginx) and "x-sendfile" (Apache, lighttpd) hand them to the front proxy
+MEDIA_DELIVERY = env.str("MEDIA_DELIVERY", default="django")
+# internal nginx location aliasing MEDIA_ROOT, used with x-accel-redirect
+MEDIA_ACCEL_REDIRECT_PREFIX = env.str("MEDIA_ACCEL_REDIRECT_PREFIX", default="/protected-media/")
+
+# threads rendering logo and profile picture variants after upload, 0 renders them inline, see accounts.images
+IMAGE_VARIANT_WORKERS = env.int("IMAGE_VARIANT_WORKERS", default=2)
+
+# summaries are invalidated when a proposal changes, which only reaches every worker through a shared cache;
+# without one they are kept for a minute at most
+PROPOSAL_SUMMARY_CACHE_TIMEOUT = env.int("PROPOSAL_SUMMARY_CACHE_TIMEOUT",
+                                         default=60 * 60 * 24 if SHARED_CACHE else 60)
+
+# per request query count and timings, see core.middleware.RequestProfilingMiddleware
+REQUEST_PROFILING = env.bool("REQUEST_PROFILING", default=False)
+# URL name to maximum queries, e.g. QUERY_BUDGETS=coder-list=10,job-posts-list=8
+QUERY_BUDGETS = env.dict("QUERY_BUDGETS", cast={"value": int}, default={})
+DEFAULT_QUERY_BUDGET = env.int("DEFAULT_QUERY_BUDGET", default=None)
+
+# per view SQL fingerprint totals, see core.middleware.QueryFingerprintMiddleware
+QUERY_FINGERPRINTING = env.bool("QUERY_FINGERPRINTING", default=False)
+QUERY_FINGERPRINT_FLUSH_SECONDS = env.int("QUERY_FINGERPRINT_FLUSH_SECONDS", default=60)
+# queries slower than this many milliseconds are logged, unset to log none
+SLOW_QUERY_MS = env.int("SLOW_QUERY_MS", default=200)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.profiling": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
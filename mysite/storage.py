@@ -0,0 +1,104 @@
+"""
+Content addressed file storage, each distinct file is kept once whichever record uploads it
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = "blobs"
+HASH_BUFFER_SIZE = 64 * 1024
+
+
+class TemporaryBlob(File):
+    """
+    Non seekable content spooled to local disk while it is hashed, moved into place like a temporary upload
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+@deconstructible(path="mysite.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage saving every file as blobs/<2>/<2>/<sha256><extension>.
+    - Content is hashed before anything is written, so saving a file that is already stored writes nothing
+    - core.models.StoredBlob counts the saves of each blob; delete() only removes the file with its last
+      reference, and the gc_blobs command reconciles the counts with the file fields that use this storage
+    - Names saved before the switch stay readable and deletable as plain files
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # the final name is the digest, picked in _save()
+        return name
+
+    @staticmethod
+    def blob_name(digest, name):
+        extension = PurePosixPath(name).suffix.lower()
+        return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    @staticmethod
+    def is_blob(name):
+        return name.startswith(f"{BLOB_PREFIX}/")
+
+    def hash_content(self, content):
+        """
+        SHA-256 of the content and a seekable File to save it from
+        - Uploads and local files are read once to hash them, other streams are hashed while spooled to disk
+        """
+        digest = hashlib.sha256()
+        if hasattr(content, "seekable") and content.seekable():
+            for chunk in content.chunks(HASH_BUFFER_SIZE):
+                digest.update(chunk)
+            content.seek(0)
+            return digest.hexdigest(), content, content.size
+        os.makedirs(self.path(f"{BLOB_PREFIX}/tmp"), exist_ok=True)
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.path(f"{BLOB_PREFIX}/tmp"), delete=False) as spool:
+            for chunk in content.chunks(HASH_BUFFER_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), TemporaryBlob(open(spool.name, "rb"), name=content.name), size
+
+    def _save(self, name, content):
+        from core.models import StoredBlob
+
+        digest, content, size = self.hash_content(content)
+        name = self.blob_name(digest, name)
+        try:
+            with transaction.atomic():
+                # the row lock serializes saves, deletes and garbage collection of one blob across processes
+                blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+                    name=name, defaults={"digest": digest, "size": size})
+                if not self.exists(name):
+                    super()._save(name, content)
+                blob.refcount += 1
+                blob.save(update_fields=["refcount", "updated"])
+        finally:
+            if isinstance(content, TemporaryBlob):
+                content.close()
+                if os.path.exists(content.temporary_file_path()):
+                    os.remove(content.temporary_file_path())
+        return name
+
+    def delete(self, name):
+        from core.models import StoredBlob
+
+        if not name or not self.is_blob(name):
+            return super().delete(name)
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.refcount > 1:
+                blob.refcount -= 1
+                blob.save(update_fields=["refcount", "updated"])
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
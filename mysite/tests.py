@@ -0,0 +1,431 @@
+"""
+Test Module
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.views import APIView
+
+from accounts.models import Technology, User
+from accounts.views import TechnologyViewSet
+from core.models import JobPostV2, JobProposalV2, StoredBlob
+from core.utils import attachment_storage
+from core.views import JobPostV2Viewset
+from mysite import openapi
+from mysite.async_views import AsyncReadView
+from mysite.db_backends.postgresql_pool.pool import ConnectionPool, Database, close_pools
+from mysite.replicas import PrimaryReplicaRouter, ReplicaPinningMiddleware, ReplicaReadMixin, read_from_replica
+
+
+REPLICA_DATABASES = {
+    "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": "primary.sqlite3"},
+    "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": "replica.sqlite3"},
+}
+
+
+class ReplicaProbeView(ReplicaReadMixin, APIView):
+    permission_classes = []
+
+    def get(self, request):
+        return Response({"replica": read_from_replica.get()})
+
+    def post(self, request):
+        return Response({"replica": read_from_replica.get()})
+
+
+@override_settings(DATABASES=REPLICA_DATABASES, SHARED_CACHE=True)
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """
+    Test safe requests of replica viewsets read the replica unless the user wrote recently
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.user = User(id=42, role="CLIENT")
+        self.factory = APIRequestFactory()
+
+    def probe(self, method):
+        request = getattr(self.factory, method)("/probe/")
+        force_authenticate(request, user=self.user)
+        return ReplicaProbeView.as_view()(request).data["replica"]
+
+    def test_router(self):
+        self.assertIsNone(self.router.db_for_read(User))
+        token = read_from_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(User), "replica")
+            self.assertEqual(self.router.db_for_write(User), "default")
+        finally:
+            read_from_replica.reset(token)
+        self.assertFalse(self.router.allow_migrate("replica", "core"))
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+
+    def test_safe_requests_read_replica(self):
+        self.assertTrue(self.probe("get"))
+        self.assertFalse(self.probe("post"))
+        self.assertFalse(read_from_replica.get())
+
+    def test_write_pins_user_to_primary(self):
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse(status=201))
+        request = self.factory.post("/job-posts/")
+        request.user = self.user
+        middleware(request)
+        self.assertFalse(self.probe("get"))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_replica_needs_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaPinningMiddleware(lambda request: HttpResponse(status=201))
+
+
+class AsyncReadViewTestCase(APITestCase):
+    """
+    Test the async read views answer like the viewsets they stand in for
+    """
+
+    def setUp(self) -> None:
+        self.client_user = User.objects.create_user(
+            username="client", email="client@example.com", password="test@12345", role="CLIENT",
+            is_email_verified=True
+        )
+        # more than one page of DEFAULT_PAGE_SIZE
+        self.job_post, *_ = [
+            JobPostV2.objects.create(
+                user=self.client_user, title=f"Job {index}", project_size="SMALL", budget_type="FIXED",
+                duration="SHORT_TERM", preferred_coder_residence="USA_ONLY"
+            )
+            for index in range(7)
+        ]
+        self.factory = APIRequestFactory()
+        self.client.force_authenticate(user=self.client_user)
+
+    def async_get(self, viewset, actions, path, detail=False, **kwargs):
+        view = AsyncReadView(viewset, actions, basename="async", detail=detail,
+                             **({"prepare_object": "with_milestone_progress"} if detail else {})).as_view()
+        request = self.factory.get(path)
+        force_authenticate(request, user=self.client_user)
+        response = async_to_sync(view)(request, **kwargs)
+        return response.status_code, json.loads(response.content)
+
+    def test_paginated_list_matches_viewset(self):
+        url = reverse("job-posts-v2-list")
+        for page in ("", "?page=2"):
+            expected = self.client.get(url + page).json()
+            self.assertEqual(self.async_get(JobPostV2Viewset, {"get": "list"}, url + page), (200, expected))
+        self.assertEqual(self.async_get(JobPostV2Viewset, {"get": "list"}, url + "?page=9")[0], 404)
+
+    def test_detail_matches_viewset(self):
+        url = reverse("job-posts-v2-detail", kwargs={"id": self.job_post.id})
+        expected = self.client.get(url).json()
+        self.assertIn("milestone_progress", expected)
+        status_code, data = self.async_get(JobPostV2Viewset, {"get": "retrieve"}, url, detail=True,
+                                           id=str(self.job_post.id))
+        self.assertEqual((status_code, data), (200, expected))
+        status_code, _ = self.async_get(JobPostV2Viewset, {"get": "retrieve"}, url, detail=True, id="missing")
+        self.assertEqual(status_code, 404)
+
+    def test_unpaginated_list_and_writes(self):
+        Technology.objects.create(name="Django", is_approved=True, user=self.client_user)
+        url = reverse("technology-list")
+        actions = {"get": "list", "post": "create"}
+        self.assertEqual(self.async_get(TechnologyViewSet, actions, url), (200, self.client.get(url).json()))
+
+        view = AsyncReadView(TechnologyViewSet, actions, basename="technology", detail=False).as_view()
+        request = self.factory.post(url, {"name": "FastAPI"}, format="json")
+        force_authenticate(request, user=self.client_user)
+        self.assertEqual(async_to_sync(view)(request).status_code, 201)
+        self.assertTrue(Technology.objects.filter(name__iexact="FastAPI").exists())
+
+
+class OpenAPISchemaTestCase(TestCase):
+    """
+    Test the API schema is generated once per code version and served as a static document
+    """
+
+    def setUp(self) -> None:
+        schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_dir.cleanup)
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=schema_dir.name,
+                                              OPENAPI_SCHEMA_VERSION=f"test-{uuid.uuid4().hex}")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        openapi.code_version.cache_clear()
+        self.addCleanup(openapi.code_version.cache_clear)
+        openapi._schemas.clear()
+        self.addCleanup(openapi._schemas.clear)
+
+    def test_schema_generated_once(self):
+        with mock.patch("mysite.openapi.generate_schemas", wraps=openapi.generate_schemas) as generate:
+            response = self.client.get(reverse("openapi-schema-json"))
+            self.assertEqual(response.status_code, 200)
+            document = json.loads(response.content)
+            self.assertIn("/v2/job-posts/", document["paths"])
+            self.assertNotIn("host", document)
+            self.assertEqual(self.client.get(reverse("openapi-schema-yaml")).status_code, 200)
+            self.assertEqual(self.client.get("/", {"format": "openapi"}).content, response.content)
+            # another process finds it in the shared cache
+            openapi._schemas.clear()
+            self.assertEqual(self.client.get(reverse("openapi-schema-json")).content, response.content)
+        self.assertEqual(generate.call_count, 1)
+
+        not_modified = self.client.get(reverse("openapi-schema-json"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_built_schema_file_served(self):
+        call_command("build_openapi_schema", stdout=StringIO())
+        cache.clear()
+        with mock.patch("mysite.openapi.generate_schemas") as generate:
+            response = self.client.get(reverse("openapi-schema-json"))
+            ui = self.client.get(reverse("schema-swagger-ui"))
+        generate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("paths", json.loads(response.content))
+        self.assertEqual(ui.status_code, 200)
+        self.assertContains(ui, reverse("openapi-schema-json"))
+
+
+class FakeConnection:
+    """
+    Stand-in for a psycopg2 connection whose SELECT 1 waits for `answered` and fails when `broken`
+    """
+    closed = False
+    autocommit = True
+
+    def __init__(self, answered=None, broken=False):
+        self.answered = answered
+        self.broken = broken
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        if self.answered is not None:
+            self.answered.wait(5)
+        if self.broken:
+            raise Database.OperationalError("server closed the connection")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    """
+    Test idle connections are pinged outside the pool lock and replaced when the ping fails
+    """
+
+    def pool(self, max_size, *idle):
+        pool = ConnectionPool(FakeConnection, max_size=max_size, timeout=1, recycle=0, pre_ping=True)
+        for connection in idle:
+            pool.created[id(connection)] = time.monotonic()
+            pool.idle.append(connection)
+        return pool
+
+    def test_ping_does_not_block_other_threads(self):
+        answered = threading.Event()
+        slow = FakeConnection(answered)
+        pool = self.pool(2, slow)
+        pinging = threading.Thread(target=pool.getconn)
+        pinging.start()
+        self.addCleanup(pinging.join)
+        self.addCleanup(answered.set)
+        while pool.idle:
+            time.sleep(0.01)
+        started = time.monotonic()
+        self.assertIsNot(pool.getconn(), slow)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_broken_connection_is_replaced(self):
+        broken = FakeConnection(broken=True)
+        pool = self.pool(1, broken)
+        connection = pool.getconn()
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(list(pool.created), [id(connection)])
+
+
+@skipUnless(connection.vendor == "postgresql", "the pooled backend needs PostgreSQL")
+class PooledDatabaseBackendTestCase(SimpleTestCase):
+    """
+    Test the pooled PostgreSQL backend reuses connections and bounds their number
+    """
+
+    def setUp(self) -> None:
+        settings_dict = {**connection.settings_dict, "ENGINE": "mysite.db_backends.postgresql_pool",
+                         "CONN_MAX_AGE": 0, "POOL": {"MAX_SIZE": 1, "TIMEOUT": 0.1}}
+        self.handler = ConnectionHandler({"default": connection.settings_dict, "pooled": settings_dict})
+        self.addCleanup(close_pools)
+        self.addCleanup(self.handler.close_all)
+
+    def backend_pid(self, pooled):
+        with pooled.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    def test_connection_returned_to_pool_and_reused(self):
+        pooled = self.handler["pooled"]
+        first = self.backend_pid(pooled)
+        pooled.close()
+        self.assertEqual(self.backend_pid(pooled), first)
+
+    def test_pool_exhaustion_times_out(self):
+        pooled = self.handler["pooled"]
+        self.backend_pid(pooled)
+        other = self.handler.create_connection("pooled")
+        with self.assertRaises(OperationalError):
+            self.backend_pid(other)
+
+
+class JobProposalTestCase(APITestCase):
+    """
+    Base class building a client's job post and a coder's proposal on it
+    """
+
+    def setUp(self) -> None:
+        self.client_user = User.objects.create_user(
+            username="client", email="client@example.com", password="test@12345", role="CLIENT",
+            is_email_verified=True
+        )
+        self.coder_user = User.objects.create_user(
+            username="coder", email="coder@example.com", password="test@12345", role="CODER",
+            is_email_verified=True
+        )
+        self.job_post = JobPostV2.objects.create(
+            user=self.client_user, title="Job", project_size="SMALL", budget_type="HOURLY",
+            duration="SHORT_TERM", preferred_coder_residence="USA_ONLY"
+        )
+        self.proposal = JobProposalV2.objects.create(
+            user=self.coder_user, job_post=self.job_post, proposal_type="HOURLY", hourly_rate=50,
+            availability_per_week=20
+        )
+
+
+class UnseekableBytes(BytesIO):
+    def seekable(self):
+        return False
+
+
+class ContentAddressedStorageTestCase(JobProposalTestCase):
+    """
+    Test identical attachments are stored once, counted and only removed with their last reference
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(MEDIA_ROOT=directory.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.storage = attachment_storage()
+
+    def test_deduplicate_and_collect(self):
+        self.job_post.attachment_1.save("spec.pdf", ContentFile(b"same spec"))
+        self.proposal.attachment_1.save("copy of spec.PDF", ContentFile(b"same spec"))
+        name = self.storage.save("streamed.pdf", File(UnseekableBytes(b"same spec"), name="streamed.pdf"))
+        digest = hashlib.sha256(b"same spec").hexdigest()
+        self.assertEqual(name, f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.pdf")
+        self.assertEqual({self.job_post.attachment_1.name, self.proposal.attachment_1.name}, {name})
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 3)
+        self.assertEqual(os.listdir(self.storage.path("blobs/tmp")), [])
+
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        call_command("gc_blobs", "--grace-minutes=0", stdout=StringIO())
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 2)
+
+        JobPostV2.objects.filter(pk=self.job_post.pk).update(attachment_1=None)
+        JobProposalV2.objects.filter(pk=self.proposal.pk).update(attachment_1=None)
+        call_command("gc_blobs", "--grace-minutes=0", stdout=StringIO())
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertFalse(self.storage.exists(name))
+
+
+class ProtectedMediaTestCase(JobProposalTestCase):
+    """
+    Test attachments are only served to users who can see a row holding them, with Range and proxy handover
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(MEDIA_ROOT=directory.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.proposal.attachment_1.save("terms.txt", ContentFile(b"0123456789"))
+        self.url = reverse("media", kwargs={"name": self.proposal.attachment_1.name})
+
+    def download(self, user, url=None, **headers):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(url or self.url, headers=headers)
+        # reading the stream to the end closes the file
+        response.body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response
+
+    def test_access(self):
+        self.assertEqual(self.download(None).status_code, status.HTTP_401_UNAUTHORIZED)
+        other = User.objects.create_user(username="other", password="test@12345", role="CODER")
+        self.assertEqual(self.download(other).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(1):
+            response = self.download(self.coder_user)
+        self.assertEqual(response.body, b"0123456789")
+        self.assertEqual((response["Accept-Ranges"], response["Cache-Control"]), ("bytes", "private"))
+
+        default_storage.save("company_logos/logo.png", ContentFile(b"png"))
+        response = self.download(None, reverse("media", kwargs={"name": "company_logos/logo.png"}))
+        self.assertEqual((response.status_code, response.body), (status.HTTP_200_OK, b"png"))
+
+    def test_path_traversal(self):
+        name = default_storage.save("resume/cv.pdf", ContentFile(b"%PDF"))
+        for url in [f"/media/company_logos/../{name}", f"/media/company_logos/%2e%2e/{name}",
+                    f"/media/company_logos/%2E%2E/{self.proposal.attachment_1.name}", f"/media//{name}"]:
+            with self.subTest(url=url):
+                self.assertEqual(self.download(None, url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_range(self):
+        response = self.download(self.client_user, Range="bytes=2-5")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual((response["Content-Range"], response["Content-Length"]), ("bytes 2-5/10", "4"))
+        self.assertEqual(response.body, b"2345")
+        self.assertEqual(self.download(self.client_user, Range="bytes=-3").body, b"789")
+        response = self.download(self.client_user, Range="bytes=20-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */10"))
+
+    def test_proxy_handover(self):
+        name = self.proposal.attachment_1.name
+        with override_settings(MEDIA_DELIVERY="x-accel-redirect"):
+            response = self.download(self.coder_user)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{name}")
+        self.assertNotIn("Content-Type", response)
+        with override_settings(MEDIA_DELIVERY="x-sendfile"):
+            response = self.download(self.coder_user)
+        self.assertEqual(response["X-Sendfile"], attachment_storage().path(name))
@@ -14,10 +14,11 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from accounts.views import (
     TechnologyViewSet,
     LoginViewSet,
@@ -43,18 +44,18 @@ from accounts.views import (
     ClientViewSet
 ) # noqa: E501
 
-from admin_app.views import AdminDashboardViewSet, AdminLoginViewSet
+from admin_app.views import AdminDashboardViewSet, AdminLoginViewSet, QueryFingerprintViewSet
 from home.views import TermsAndConditionsViewSet
 from core.views import TimeZoneViewSet, MilestoneV2Viewset, ProposalV2Viewset, TimesheetViewSet
 from home.views import RecommendedCoderViewSet
 
 from rest_framework.routers import DefaultRouter
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-from core.views import JobPostViewset, JobInvitationViewSet, JobPostV2Viewset, ContractViewSet
+from core.views import JobPostViewset, JobInvitationViewSet, JobPostV2Viewset, ContractViewSet, ChunkedUploadViewSet
 from home.views import RecommendedJobsViewset
+from mysite import openapi
+from mysite.media import ProtectedMediaView
+from mysite.async_views import AsyncReadView
 
 
 router = DefaultRouter()
@@ -66,6 +67,7 @@ router.register("login", LoginViewSet, basename="login")  # noqa : E501
 router.register("admin-dashboard", AdminDashboardViewSet, basename="dashboard")
 router.register("token-refresh", TokenRefreshViewSet, basename="token-refresh")  # noqa : E501
 router.register("admin-login", AdminLoginViewSet, basename="admin-login")
+router.register("query-fingerprints", QueryFingerprintViewSet, basename="query-fingerprints")
 
 router.register(
     "technology-dropdown", TechnologyViewSet, basename="technology"
@@ -110,28 +112,47 @@ router.register("terms-and-condition", TermsAndConditionsViewSet, basename='term
 router.register("client", ClientViewSet, basename="client")
 router_v2.register("contract", ContractViewSet, basename="contract")
 router_v2.register("timesheet", TimesheetViewSet, basename='timesheet')
+router_v2.register("uploads", ChunkedUploadViewSet, basename="uploads")
+
+
+def async_read_paths(prefix, router, basename, viewset, routes=("list", "detail"), **kwargs):
+    """
+    Async paths for the list and/or detail routes of a registered viewset, with the router's method mappings
+    """
+    paths = []
+    for route in router.get_routes(viewset):
+        suffix = route.name.format(basename=basename)[len(basename) + 1:]
+        if suffix not in routes:
+            continue
+        actions = router.get_method_map(viewset, route.mapping)
+        detail = suffix == "detail"
+        lookup = viewset.lookup_url_kwarg or viewset.lookup_field
+        view = AsyncReadView(viewset, actions, basename=basename, detail=detail, **kwargs)
+        paths.append(path(f"{prefix}/<str:{lookup}>/" if detail else f"{prefix}/", view.as_view()))
+    return paths
+
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="This is the new Repo for the restructured API's",
-        default_version="v2",
-        description="This repo is under development.",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/v1/", include(router.urls), name='v1'),
     path("api/v2/", include(router_v2.urls), name='v2'),
-    path(
-        "",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
+    path("openapi.json", openapi.schema, {"schema_format": "json"}, name="openapi-schema-json"),
+    path("openapi.yaml", openapi.schema, {"schema_format": "yaml"}, name="openapi-schema-yaml"),
+    path("", openapi.swagger_ui, name="schema-swagger-ui"),
 ]  # noqa: E501
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )  # noqa: E501
+if settings.ASYNC_READ_VIEWS:
+    # ahead of the routers so these paths resolve to the async views, other methods fall through to the viewsets
+    urlpatterns = [
+        *async_read_paths("api/v2/job-posts", router_v2, "job-posts-v2", JobPostV2Viewset,
+                          prepare_object="with_milestone_progress"),
+        *async_read_paths("api/v1/coder", router, "coder", CoderViewSet, routes=("list",)),
+        *async_read_paths("api/v1/recommended-jobs", router, "recommended-jobs", RecommendedJobsViewset,
+                          routes=("list",)),
+        *async_read_paths("api/v1/technology-dropdown", router, "technology", TechnologyViewSet, routes=("list",)),
+    ] + urlpatterns
+
+# media is served in every environment, attachments and resumes only to users allowed to see them
+urlpatterns += [
+    re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<name>.+)$", ProtectedMediaView.as_view(), name="media"),
+]